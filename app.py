@@ -5,16 +5,23 @@ Streamlit app for exploring different AI agent stages
 
 import streamlit as st
 import os
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-from src.agents.simple_agent import SimpleAgent
-from src.agents.few_shot_agent import FewShotAgent
-from src.agents.memory_agent import MemoryAgent
-from src.agents.tool_agent import ToolAgent
-from src.agents.reasoning_agent import ReasoningAgent
+# Agent modules (and the OpenAI SDK) are imported when an agent is first created
+from src.core.context import RequestContext, RequestCancelled
+from src.core.messages import Message
+from src.core.recording import get_cassette
+from src.core.startup import load_agent_class, warm_up
+from src.core.usage import Budget, UsageTracker
+from src.core.workers import PooledAgent, WorkerPool
 
 # Check if API key is set
 if not os.getenv("OPENAI_API_KEY"):
@@ -34,37 +41,210 @@ AGENT_INFO = {
     "Stage 0: Simple Agent": {
         "key": "simple",
         "description": "Basic prompt-response interaction",
-        "features": ["System prompt", "Single turn"],
-        "class": SimpleAgent
+        "features": ["System prompt", "Single turn"]
     },
     "Stage 1: Few-Shot Agent": {
         "key": "few_shot",
         "description": "Uses examples to guide responses",
-        "features": ["System prompt", "Example-based learning", "Better formatting"],
-        "class": FewShotAgent
+        "features": ["System prompt", "Example-based learning", "Better formatting"]
     },
     "Stage 2: Memory Agent": {
         "key": "memory",
         "description": "Maintains conversation history",
-        "features": ["System prompt", "Multi-turn conversations", "Context awareness"],
-        "class": MemoryAgent
+        "features": ["System prompt", "Multi-turn conversations", "Context awareness"]
     },
     "Stage 3: Tool Agent": {
         "key": "tool",
         "description": "Can use tools to search for information",
-        "features": ["System prompt", "Flight search", "Hotel search", "Weather data"],
-        "class": ToolAgent
+        "features": ["System prompt", "Flight search", "Hotel search", "Weather data"]
     },
     "Stage 4: Reasoning Agent": {
         "key": "reasoning",
         "description": "Advanced agent with planning, reasoning, and retry logic",
-        "features": ["All previous features", "Multi-step reasoning", "Tool chaining", "Failure handling", "Memory"],
-        "class": ReasoningAgent
+        "features": ["All previous features", "Multi-step reasoning", "Tool chaining", "Failure handling", "Memory"]
+    },
+    "Stage 5: Multi-Agent Orchestrator": {
+        "key": "multi_agent",
+        "description": "Parallel specialist agents with a final synthesis step",
+        "features": ["All previous features", "Flight, lodging & weather specialists", "Parallel fan-out", "Per-specialist timeouts", "Partial-result synthesis"]
     }
 }
 
+# Upper bound on how long a single request may take (seconds)
+REQUEST_TIMEOUT = 180
+
+# Messages shown before "Show earlier messages", and how many more each click reveals
+HISTORY_WINDOW = 20
+
+# An assistant message containing these (and a "---") carries a tool/reasoning trace
+TRACE_MARKERS = ("🤔", "🔧", "🔄", "🤖", "💭")
+
+
+@st.cache_resource
+def get_request_pool() -> ThreadPoolExecutor:
+    # Shared across reruns and sessions. A request holds its thread until it is answered, so this
+    # is how many sessions can be answered at once; the rest wait for a free thread.
+    threads = int(os.getenv("AGENT_REQUEST_THREADS", "32"))
+    return ThreadPoolExecutor(max_workers=threads, thread_name_prefix="agent-request")
+
+
+@st.cache_resource
+def get_worker_pool():
+    # With AGENT_WORKERS set, agents run in that many worker processes instead of this one
+    workers = int(os.getenv("AGENT_WORKERS", "0"))
+    return WorkerPool(workers).start() if workers else None
+
+
+@st.cache_resource
+def start_warm_up():
+    # Once per process: build the tool backends and client while the first page renders,
+    # on a thread of its own so no request waits behind it
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="warm-up").submit(warm_up)
+
+
+def start_request() -> RequestContext:
+    # A new message supersedes whatever this session was still working on
+    previous = st.session_state.get("active_request")
+    if previous is not None:
+        previous.cancel("superseded by a new message")
+    # A recorded request gets a seed, so its retry backoff replays the same way
+    cassette = get_cassette()
+    seed = random.randrange(2 ** 31) if cassette is not None and cassette.recording else None
+    context = RequestContext(timeout=REQUEST_TIMEOUT, seed=seed)
+    st.session_state.active_request = context
+    return context
+
+
+def finish_request(context: RequestContext):
+    # Stops any work still running if this script run was interrupted
+    context.cancel("abandoned")
+    if st.session_state.get("active_request") is context:
+        st.session_state.active_request = None
+
+
+def run_cancellable(agent, prompt: str, context: RequestContext) -> str:
+    # Run the agent in the background and keep touching the page, which lets
+    # Streamlit interrupt this run (and cancel the request) on a new message
+    future = get_request_pool().submit(agent.process, prompt, context)
+    ticker = st.empty()
+    started = time.monotonic()
+    while not future.done():
+        ticker.caption(f"⏳ {time.monotonic() - started:.0f}s")
+        time.sleep(0.25)
+    ticker.empty()
+    return future.result()
+
+
+def make_message(role: str, content: str) -> Dict[str, Any]:
+    # Split an agent's reasoning trace from its answer once, instead of on every rerun. The Message is
+    # handed to the agent as history as is, so the app and the agent share one copy of each message.
+    message = {"role": role, "content": content, "trace": None, "answer": content,
+               "message": Message(role, content)}
+    if role == "assistant" and "---" in content and any(marker in content for marker in TRACE_MARKERS):
+        parts = content.split("---")
+        trace = "---".join(parts[:-1])
+        message["trace"] = trace if trace.strip() else None
+        message["answer"] = parts[-1].strip() or content
+    return message
+
+
+def render_message(message: Dict[str, Any]):
+    if message["trace"]:
+        with st.expander("🔍 View Tool Calls", expanded=False):
+            st.markdown(message["trace"], unsafe_allow_html=True)
+    st.markdown(message["answer"], unsafe_allow_html=True)
+
+
+def render_history():
+    # Render only the last history_window messages, from their precomputed trace/answer split, so reruns
+    # don't slow down as the conversation grows. The visible messages are still re-sent on every rerun.
+    messages = st.session_state.messages
+    hidden = max(0, len(messages) - st.session_state.history_window)
+    if hidden:
+        if st.button(f"⬆️ Show earlier messages ({hidden} hidden)", key="show_earlier"):
+            st.session_state.history_window += HISTORY_WINDOW
+            st.rerun()
+    for message in messages[hidden:]:
+        with st.chat_message(message["role"]):
+            render_message(message)
+
+
+def respond(prompt: str):
+    started = time.perf_counter()
+    
+    # Add user message to chat
+    st.session_state.messages.append(make_message("user", prompt))
+    history = [msg["message"] for msg in st.session_state.messages]  # The history the agent is given
+    with st.chat_message("user"):
+        st.markdown(prompt)
+    
+    # Get agent response with streaming and expandable reasoning
+    with st.chat_message("assistant"):
+        try:
+            agent_type = st.session_state.current_agent_type
+            is_tool_agent = "Tool" in agent_type or "Reasoning" in agent_type or "Multi-Agent" in agent_type
+            
+            entry = "process" if is_tool_agent else "process_stream"  # Replays go through the same method
+            if is_tool_agent:
+                # For tool agents, get complete response then format with expandables
+                with st.spinner("Agent is working..."):
+                    # Sync conversation history before processing
+                    if hasattr(st.session_state.agent, 'conversation_history'):
+                        st.session_state.agent.conversation_history = [
+                            msg["message"] for msg in st.session_state.messages
+                        ]
+                    context = start_request()
+                    try:
+                        full_response = run_cancellable(st.session_state.agent, prompt, context)
+                    finally:
+                        finish_request(context)
+                
+                reply = make_message("assistant", full_response)
+                render_message(reply)
+            else:
+                # Non-tool agents: normal streaming
+                message_placeholder = st.empty()
+                full_response = ""
+                
+                # Sync conversation history before processing
+                if hasattr(st.session_state.agent, 'conversation_history'):
+                    st.session_state.agent.conversation_history = [
+                        msg["message"] for msg in st.session_state.messages
+                    ]
+                
+                context = start_request()
+                try:
+                    for chunk in st.session_state.agent.process_stream(prompt, context):
+                        full_response += chunk
+                        message_placeholder.markdown(full_response + "▌", unsafe_allow_html=True)
+                finally:
+                    finish_request(context)
+                
+                message_placeholder.markdown(full_response, unsafe_allow_html=True)
+                reply = make_message("assistant", full_response)
+            
+            # Save to messages, with the trace/answer split worked out once
+            st.session_state.messages.append(reply)
+            
+            # With AGENT_CASSETTE set, every run is recorded for offline replay
+            cassette = get_cassette()
+            if cassette is not None and cassette.recording:
+                cassette.record_run(AGENT_INFO[agent_type]["key"], st.session_state.agent_kwargs, prompt,
+                                    full_response, time.perf_counter() - started, history, entry, context.seed)
+            
+            # Clear agent's conversation history to prevent duplication
+            if hasattr(st.session_state.agent, 'conversation_history'):
+                st.session_state.agent.conversation_history = []
+        except RequestCancelled as e:
+            st.warning(f"⏹️ Stopped: {e}")
+        except Exception as e:
+            st.error(f"Error: {str(e)}")
+            import traceback
+            st.code(traceback.format_exc())
+
 
 def main():
+    start_warm_up()
     st.title("🤖 Bottom-Up AI Agents Explorer")
     st.markdown("---")
     
@@ -97,6 +277,17 @@ def main():
             index=0
         )
         
+        # Tool-using stages can plan with a cheaper model and only synthesize with the main one
+        planning_model = None
+        if agent_info["key"] in ("tool", "reasoning", "multi_agent"):
+            planning_choice = st.selectbox(
+                "Planning model (tool selection):",
+                options=["Same as model", "gpt-4o-mini", "gpt-4o", "gpt-3.5-turbo"],
+                index=0
+            )
+            if planning_choice != "Same as model":
+                planning_model = planning_choice
+        
         temperature = st.slider(
             "Temperature:",
             min_value=0.0,
@@ -105,6 +296,18 @@ def main():
             step=0.1
         )
         
+        # Session budget: calls get cheaper as it runs out and stop once it is spent
+        budget_usd = st.number_input(
+            "Session budget (USD, 0 = unlimited):",
+            min_value=0.0,
+            value=0.0,
+            step=0.01,
+            format="%.2f"
+        )
+        if "usage" not in st.session_state:
+            st.session_state.usage = UsageTracker()
+        st.session_state.usage.budget = Budget(max_cost=budget_usd) if budget_usd > 0 else None
+        
         st.markdown("---")
         
         # Action buttons
@@ -118,13 +321,64 @@ def main():
         with col2:
             if st.button("Reset All", type="secondary"):
                 st.session_state.messages = []
+                st.session_state.history_window = HISTORY_WINDOW
                 if hasattr(st.session_state.agent, 'clear_memory'):
                     st.session_state.agent.clear_memory()
                 st.rerun()
+        
+        # Retry and circuit breaker stats for agents that use the resilience layer
+        resilience = getattr(st.session_state.get("agent"), "resilience", None)
+        if resilience and resilience.stats():
+            with st.expander("🩺 Tool Health", expanded=False):
+                for tool_name, tool_stats in resilience.stats().items():
+                    st.markdown(
+                        f"**{tool_name}** ({tool_stats['circuit']}): "
+                        f"{tool_stats['successes']}/{tool_stats['calls']} ok, "
+                        f"{tool_stats['retries']} retries, {tool_stats['short_circuited']} short-circuited"
+                    )
+        
+        # Shared rate limiter queues across all sessions
+        limiter = getattr(st.session_state.get("agent"), "limiter", None)
+        limiter_stats = limiter.stats() if limiter else {}
+        if limiter_stats:
+            with st.expander("🚦 Rate Limits", expanded=False):
+                for key, key_stats in limiter_stats.items():
+                    st.markdown(
+                        f"**{key}**: {key_stats['admitted']} admitted, {key_stats['shed']} shed, "
+                        f"{key_stats['queued']} queued, {key_stats['waited']:.1f}s waited"
+                    )
+        
+        # Requests waiting and running in each worker process
+        pool = get_worker_pool()
+        if pool is not None:
+            with st.expander("🧵 Workers", expanded=False):
+                for name, depth in pool.queue_depths().items():
+                    st.markdown(f"**{name}**: {depth['active']} running, {depth['queued']} queued")
+                if pool.stats["worker_deaths"]:
+                    st.markdown(f"{pool.stats['worker_deaths']} worker(s) lost, "
+                                f"{pool.stats['retried']} request(s) retried elsewhere")
+        
+        # Token usage and cost for this session
+        usage = st.session_state.usage.summary()
+        if usage["session"]["calls"]:
+            with st.expander("📊 Usage", expanded=False):
+                session = usage["session"]
+                st.markdown(f"**Session:** {session['total_tokens']:,} tokens, ${session['cost']:.4f} "
+                            f"({session['calls']} calls)")
+                if usage["last_request"]:
+                    last = usage["last_request"]
+                    st.markdown(f"**Last request:** {last['total_tokens']:,} tokens, ${last['cost']:.4f}")
+                for stage, stage_usage in usage["by_stage"].items():
+                    st.markdown(f"• {stage}: {stage_usage['total_tokens']:,} tokens, ${stage_usage['cost']:.4f}")
+                if st.session_state.usage.budget:
+                    used = st.session_state.usage.budget.fraction_used(st.session_state.usage.session)
+                    st.progress(min(used, 1.0), text=f"Budget used: {used:.0%}")
     
     # Initialize session state
     if "messages" not in st.session_state:
         st.session_state.messages = []
+    if "history_window" not in st.session_state:
+        st.session_state.history_window = HISTORY_WINDOW
     
     if "current_agent_type" not in st.session_state:
         st.session_state.current_agent_type = selected_agent_name
@@ -133,6 +387,7 @@ def main():
     if st.session_state.current_agent_type != selected_agent_name:
         st.session_state.current_agent_type = selected_agent_name
         st.session_state.messages = []
+        st.session_state.history_window = HISTORY_WINDOW
         # Force recreation of agent
         if "agent" in st.session_state:
             del st.session_state.agent
@@ -140,14 +395,33 @@ def main():
     # Initialize or update agent
     if "agent" not in st.session_state or \
        st.session_state.get("model") != model or \
+       st.session_state.get("planning_model") != planning_model or \
        st.session_state.get("temperature") != temperature:
         
-        agent_class = agent_info["class"]
-        st.session_state.agent = agent_class(
-            model=model,
-            temperature=temperature
-        )
+        # Everything the agent is built with but the session's usage tracker, so a recorded run can rebuild it
+        agent_kwargs = {"model": model, "temperature": temperature}
+        if planning_model:
+            agent_kwargs["planning_model"] = planning_model
+        pool = get_worker_pool()
+        if pool is not None:
+            # The session's agent lives in the worker its session id hashes to
+            st.session_state.setdefault("session_id", uuid.uuid4().hex)
+            st.session_state.agent = PooledAgent(
+                pool,
+                st.session_state.session_id,
+                agent_info["key"],
+                usage=st.session_state.usage,
+                **agent_kwargs
+            )
+        else:
+            agent_class = load_agent_class(agent_info["key"])
+            st.session_state.agent = agent_class(
+                usage=st.session_state.usage,
+                **agent_kwargs
+            )
+        st.session_state.agent_kwargs = agent_kwargs
         st.session_state.model = model
+        st.session_state.planning_model = planning_model
         st.session_state.temperature = temperature
         
         # Clear conversation history for memory-enabled agents
@@ -158,180 +432,16 @@ def main():
     # Main chat interface
     st.header("Conversation")
     
-    # Display chat messages
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            content = message["content"]
-            
-            # Check if this message has reasoning traces (contains tool agent patterns)
-            if message["role"] == "assistant" and any(emoji in content for emoji in ["🤔", "🔧", "🔄", "🤖", "💭"]):
-                # Split reasoning from final content
-                if "---" in content:
-                    parts = content.split("---")
-                    reasoning = "---".join(parts[:-1])
-                    final_content = parts[-1].strip()
-                    
-                    if reasoning.strip():
-                        with st.expander("🔍 View Tool Calls", expanded=False):
-                            st.markdown(reasoning, unsafe_allow_html=True)
-                    
-                    if final_content:
-                        st.markdown(final_content, unsafe_allow_html=True)
-                    else:
-                        st.markdown(content, unsafe_allow_html=True)
-                else:
-                    st.markdown(content, unsafe_allow_html=True)
-            else:
-                st.markdown(content, unsafe_allow_html=True)
+    # Display chat messages (only the most recent ones until older ones are asked for)
+    render_history()
     
     # Handle pending prompt from example buttons
     if "pending_prompt" in st.session_state:
-        prompt = st.session_state.pending_prompt
-        del st.session_state.pending_prompt
-        
-        # Add user message
-        st.session_state.messages.append({"role": "user", "content": prompt})
-        with st.chat_message("user"):
-            st.markdown(prompt)
-        
-        # Get agent response with proper formatting
-        with st.chat_message("assistant"):
-            try:
-                agent_type = st.session_state.current_agent_type
-                is_tool_agent = "Tool" in agent_type or "Reasoning" in agent_type
-                
-                if is_tool_agent:
-                    # For tool agents, get complete response then format with expandables
-                    with st.spinner("Agent is working..."):
-                        # Sync conversation history before processing
-                        if hasattr(st.session_state.agent, 'conversation_history'):
-                            st.session_state.agent.conversation_history = []
-                            for msg in st.session_state.messages:
-                                st.session_state.agent.conversation_history.append({
-                                    "role": msg["role"],
-                                    "content": msg["content"]
-                                })
-                        full_response = st.session_state.agent.process(prompt)
-                    
-                    # Split reasoning from final content
-                    if "---" in full_response:
-                        parts = full_response.split("---")
-                        reasoning = "---".join(parts[:-1])
-                        final_content = parts[-1].strip()
-                        
-                        if reasoning.strip():
-                            with st.expander("🔍 View Tool Calls", expanded=False):
-                                st.markdown(reasoning, unsafe_allow_html=True)
-                        
-                        if final_content:
-                            st.markdown(final_content, unsafe_allow_html=True)
-                        else:
-                            st.markdown(full_response, unsafe_allow_html=True)
-                    else:
-                        st.markdown(full_response, unsafe_allow_html=True)
-                else:
-                    # Non-tool agents: normal streaming
-                    message_placeholder = st.empty()
-                    full_response = ""
-                    
-                    # Sync conversation history before processing
-                    if hasattr(st.session_state.agent, 'conversation_history'):
-                        st.session_state.agent.conversation_history = []
-                        for msg in st.session_state.messages:
-                            st.session_state.agent.conversation_history.append({
-                                "role": msg["role"],
-                                "content": msg["content"]
-                            })
-                    
-                    for chunk in st.session_state.agent.process_stream(prompt):
-                        full_response += chunk
-                        message_placeholder.markdown(full_response + "▌", unsafe_allow_html=True)
-                    
-                    message_placeholder.markdown(full_response, unsafe_allow_html=True)
-                
-                # Save to messages
-                st.session_state.messages.append({"role": "assistant", "content": full_response})
-                
-                # Clear agent's conversation history to prevent duplication
-                if hasattr(st.session_state.agent, 'conversation_history'):
-                    st.session_state.agent.conversation_history = []
-            except Exception as e:
-                st.error(f"Error: {str(e)}")
-                import traceback
-                st.code(traceback.format_exc())
+        respond(st.session_state.pop("pending_prompt"))
     
     # Chat input
     if prompt := st.chat_input("Ask about travel plans..."):
-        # Add user message to chat
-        st.session_state.messages.append({"role": "user", "content": prompt})
-        with st.chat_message("user"):
-            st.markdown(prompt)
-        
-        # Get agent response with streaming and expandable reasoning
-        with st.chat_message("assistant"):
-            try:
-                agent_type = st.session_state.current_agent_type
-                is_tool_agent = "Tool" in agent_type or "Reasoning" in agent_type
-                
-                if is_tool_agent:
-                    # For tool agents, get complete response then format with expandables
-                    with st.spinner("Agent is working..."):
-                        # Sync conversation history before processing
-                        if hasattr(st.session_state.agent, 'conversation_history'):
-                            st.session_state.agent.conversation_history = []
-                            for msg in st.session_state.messages:
-                                st.session_state.agent.conversation_history.append({
-                                    "role": msg["role"],
-                                    "content": msg["content"]
-                                })
-                        full_response = st.session_state.agent.process(prompt)
-                    
-                    # Split reasoning from final content
-                    if "---" in full_response:
-                        parts = full_response.split("---")
-                        reasoning = "---".join(parts[:-1])
-                        final_content = parts[-1].strip()
-                        
-                        if reasoning.strip():
-                            with st.expander("🔍 View Tool Calls", expanded=False):
-                                st.markdown(reasoning, unsafe_allow_html=True)
-                        
-                        if final_content:
-                            st.markdown(final_content, unsafe_allow_html=True)
-                        else:
-                            st.markdown(full_response, unsafe_allow_html=True)
-                    else:
-                        st.markdown(full_response, unsafe_allow_html=True)
-                else:
-                    # Non-tool agents: normal streaming
-                    message_placeholder = st.empty()
-                    full_response = ""
-                    
-                    # Sync conversation history before processing
-                    if hasattr(st.session_state.agent, 'conversation_history'):
-                        st.session_state.agent.conversation_history = []
-                        for msg in st.session_state.messages:
-                            st.session_state.agent.conversation_history.append({
-                                "role": msg["role"],
-                                "content": msg["content"]
-                            })
-                    
-                    for chunk in st.session_state.agent.process_stream(prompt):
-                        full_response += chunk
-                        message_placeholder.markdown(full_response + "▌", unsafe_allow_html=True)
-                    
-                    message_placeholder.markdown(full_response, unsafe_allow_html=True)
-                
-                # Save to messages
-                st.session_state.messages.append({"role": "assistant", "content": full_response})
-                
-                # Clear agent's conversation history to prevent duplication
-                if hasattr(st.session_state.agent, 'conversation_history'):
-                    st.session_state.agent.conversation_history = []
-            except Exception as e:
-                st.error(f"Error: {str(e)}")
-                import traceback
-                st.code(traceback.format_exc())
+        respond(prompt)
     
     # Example prompts
     if len(st.session_state.messages) == 0:
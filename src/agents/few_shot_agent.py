@@ -1,31 +1,28 @@
-from typing import Iterator
+from typing import Iterator, Optional
 from src.core.base_agent import BaseAgent
+from src.core.context import RequestContext
+from src.core.messages import Message, example_messages
 from src.core.prompts import TRAVEL_AGENT_SYSTEM_PROMPT, TRAVEL_AGENT_FEW_SHOT_EXAMPLES
 
 
+PROMPT_MESSAGES = [Message("system", TRAVEL_AGENT_SYSTEM_PROMPT)] + example_messages(TRAVEL_AGENT_FEW_SHOT_EXAMPLES)
+
+
 class FewShotAgent(BaseAgent):
-    def process(self, user_input: str) -> str:
-        messages = [{"role": "system", "content": TRAVEL_AGENT_SYSTEM_PROMPT}]
-        
-        # Add few-shot examples
-        for example in TRAVEL_AGENT_FEW_SHOT_EXAMPLES:
-            messages.append({"role": "user", "content": example["user"]})
-            messages.append({"role": "assistant", "content": example["assistant"]})
+    def process(self, user_input: str, context: Optional[RequestContext] = None) -> str:
+        # System prompt and few-shot examples, built once and shared by every request
+        messages = list(PROMPT_MESSAGES)
         
         # Add current user input
-        messages.append({"role": "user", "content": user_input})
+        messages.append(Message("user", user_input))
         
-        return self._call_llm(messages)
+        return self._call_llm(messages, context=context)
     
-    def process_stream(self, user_input: str) -> Iterator[str]:
-        messages = [{"role": "system", "content": TRAVEL_AGENT_SYSTEM_PROMPT}]
-        
-        # Add few-shot examples
-        for example in TRAVEL_AGENT_FEW_SHOT_EXAMPLES:
-            messages.append({"role": "user", "content": example["user"]})
-            messages.append({"role": "assistant", "content": example["assistant"]})
+    def process_stream(self, user_input: str, context: Optional[RequestContext] = None) -> Iterator[str]:
+        # System prompt and few-shot examples, built once and shared by every request
+        messages = list(PROMPT_MESSAGES)
         
         # Add current user input
-        messages.append({"role": "user", "content": user_input})
+        messages.append(Message("user", user_input))
         
-        yield from self._call_llm_stream(messages)
\ No newline at end of file
+        yield from self._call_llm_stream(messages, context=context)
\ No newline at end of file
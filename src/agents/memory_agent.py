@@ -1,51 +1,46 @@
-from typing import Iterator
+from typing import Iterator, Optional
 from src.core.base_agent import BaseAgent
+from src.core.context import RequestContext
+from src.core.messages import Message, example_messages
 from src.core.prompts import TRAVEL_AGENT_SYSTEM_PROMPT, TRAVEL_AGENT_FEW_SHOT_EXAMPLES
 
 
+PROMPT_MESSAGES = [Message("system", TRAVEL_AGENT_SYSTEM_PROMPT)] + example_messages(TRAVEL_AGENT_FEW_SHOT_EXAMPLES)
+
+
 class MemoryAgent(BaseAgent):
-    def process(self, user_input: str) -> str:
-        # Build messages with full conversation history
-        messages = [{"role": "system", "content": TRAVEL_AGENT_SYSTEM_PROMPT}]
-        
-        # Add few-shot examples first (before conversation history)
-        for example in TRAVEL_AGENT_FEW_SHOT_EXAMPLES:
-            messages.append({"role": "user", "content": example["user"]})
-            messages.append({"role": "assistant", "content": example["assistant"]})
-        
-        messages.extend(self.conversation_history)
-        messages.append({"role": "user", "content": user_input})
+    def process(self, user_input: str, context: Optional[RequestContext] = None) -> str:
+        # Build messages with full conversation history, after the shared system prompt and few-shot examples
+        messages = list(PROMPT_MESSAGES)
+        messages.extend(self._history_for_prompt())
+        messages.append(Message("user", user_input))
         
         # Get response
-        response = self._call_llm(messages)
+        response = self._call_llm(messages, context=context)
         
         # Update conversation history
-        self.conversation_history.append({"role": "user", "content": user_input})
-        self.conversation_history.append({"role": "assistant", "content": response})
+        self._remember(user_input, response)
         
         return response
     
-    def process_stream(self, user_input: str) -> Iterator[str]:
-        # Build messages with full conversation history
-        messages = [{"role": "system", "content": TRAVEL_AGENT_SYSTEM_PROMPT}]
-        
-        # Add few-shot examples first (before conversation history)
-        for example in TRAVEL_AGENT_FEW_SHOT_EXAMPLES:
-            messages.append({"role": "user", "content": example["user"]})
-            messages.append({"role": "assistant", "content": example["assistant"]})
-        
-        messages.extend(self.conversation_history)
-        messages.append({"role": "user", "content": user_input})
+    def process_stream(self, user_input: str, context: Optional[RequestContext] = None) -> Iterator[str]:
+        # Build messages with full conversation history, after the shared system prompt and few-shot examples
+        messages = list(PROMPT_MESSAGES)
+        messages.extend(self._history_for_prompt())
+        messages.append(Message("user", user_input))
         
         # Stream response and collect it
         full_response = ""
-        for chunk in self._call_llm_stream(messages):
+        for chunk in self._call_llm_stream(messages, context=context):
             full_response += chunk
             yield chunk
         
+        # A cancelled request only produced a partial answer - don't remember it
+        if context is not None and context.cancelled:
+            return
+        
         # Update conversation history with complete response
-        self.conversation_history.append({"role": "user", "content": user_input})
-        self.conversation_history.append({"role": "assistant", "content": full_response})
+        self._remember(user_input, full_response)
     
     def clear_memory(self):
         self.conversation_history = []
\ No newline at end of file
@@ -0,0 +1,216 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from src.core.base_agent import BaseAgent
+from src.core.context import RequestContext, RequestCancelled
+from src.core.messages import Message
+from src.agents.tool_agent import ToolAgent
+from src.core.prompts import (
+    FLIGHT_SPECIALIST_PROMPT,
+    LODGING_SPECIALIST_PROMPT,
+    WEATHER_SPECIALIST_PROMPT,
+    ORCHESTRATOR_SYNTHESIS_PROMPT,
+)
+from src.core.resilience import DEFAULT_EXECUTOR, ResilientExecutor
+from src.core.tools import TRAVEL_REGISTRY
+
+
+# Specialist definitions: each one gets a focused prompt and only the tools it needs
+SPECIALISTS = [
+    {
+        "name": "flights",
+        "label": "✈️ Flight specialist",
+        "system_prompt": FLIGHT_SPECIALIST_PROMPT,
+        "tools": ["search_flights"],
+        "timeout": 45.0,
+    },
+    {
+        "name": "lodging",
+        "label": "🏨 Lodging specialist",
+        "system_prompt": LODGING_SPECIALIST_PROMPT,
+        "tools": ["search_hotels"],
+        "timeout": 45.0,
+    },
+    {
+        "name": "weather",
+        "label": "🌤️ Weather & activities specialist",
+        "system_prompt": WEATHER_SPECIALIST_PROMPT,
+        "tools": ["get_weather_forecast", "get_weather"],
+        "timeout": 45.0,
+    },
+]
+
+
+class SpecialistAgent(ToolAgent):
+    def __init__(self, name: str, label: str, system_prompt: str, tools: List[str],
+                 timeout: float = 45.0, **kwargs):
+        kwargs.setdefault("resilience", DEFAULT_EXECUTOR)
+        super().__init__(tools=[TRAVEL_REGISTRY.get(tool_name) for tool_name in tools], **kwargs)
+        self.name = name
+        self.label = label
+        self.timeout = timeout
+        self.system_prompt = system_prompt
+        self.few_shot_examples = []  # Keep specialist prompts small
+        self.select_tools = False  # Already limited to the specialist's own tools
+        self.show_reasoning = False  # Orchestrator only needs the findings
+        self.enable_memory = True  # History is handed over per request by the orchestrator
+
+
+class MultiAgentOrchestrator(BaseAgent):
+    def __init__(self, specialists: List[Dict[str, Any]] = None, context_messages: int = 6,
+                 planning_model: str = None, resilience: Optional[ResilientExecutor] = None,
+                 wrap_up: float = 2.0, **kwargs):
+        super().__init__(**kwargs)
+        # The specialists' tool executor, shared so its retry and circuit breaker stats cover all of them
+        self.resilience = resilience or DEFAULT_EXECUTOR
+        # Specialists only gather facts, so they run entirely on the planning model;
+        # the orchestrator's own model writes the final plan
+        self.specialists = [
+            SpecialistAgent(**config, model=planning_model or self.model, temperature=self.temperature,
+                            hedger=self.hedger, usage=self.usage, limiter=self.limiter,
+                            coalescer=self.coalescer, resilience=self.resilience)
+            for config in (specialists or SPECIALISTS)
+        ]
+        self.context_messages = context_messages  # Recent turns shared with specialists
+        # Seconds (at most a fifth of its time) a specialist stops before the orchestrator gives up on it,
+        # to hand in partial findings
+        self.wrap_up = wrap_up
+        self.show_reasoning = True
+
+    def process(self, user_input: str, context: Optional[RequestContext] = None) -> str:
+        reasoning_trace = [f"🤖 **Dispatching {len(self.specialists)} specialists in parallel**\n"]
+        reports = []
+
+        for specialist, status, output, elapsed in self._run_specialists(user_input, context):
+            reasoning_trace.append(self._format_status(specialist, status, output, elapsed))
+            reports.append((specialist, status, output))
+
+        reasoning_trace.append("\n💭 **Synthesizing specialist reports into final plan...**\n\n---\n")
+
+        try:
+            final_content = self._call_llm(self._create_synthesis_messages(user_input, reports), context=context,
+                                          stage="synthesis")
+        except RequestCancelled as stop:
+            # No time or budget left to synthesize - hand back the raw specialist reports
+            return "\n".join(reasoning_trace) + "\n" + self._partial_answer(reports, str(stop))
+
+        self._remember(user_input, final_content)
+
+        if self.show_reasoning:
+            return "\n".join(reasoning_trace) + "\n" + final_content
+        return final_content
+
+    def process_stream(self, user_input: str, context: Optional[RequestContext] = None) -> Iterator[str]:
+        if self.show_reasoning:
+            yield f"🤖 **Dispatching {len(self.specialists)} specialists in parallel**\n\n"
+        reports = []
+
+        # Report each specialist as soon as it finishes
+        for specialist, status, output, elapsed in self._run_specialists(user_input, context):
+            if self.show_reasoning:
+                yield self._format_status(specialist, status, output, elapsed) + "\n"
+            reports.append((specialist, status, output))
+
+        if self.show_reasoning:
+            yield "\n💭 **Synthesizing specialist reports into final plan...**\n\n---\n\n"
+
+        final_content = ""
+        try:
+            for chunk in self._call_llm_stream(self._create_synthesis_messages(user_input, reports),
+                                               context=context, stage="synthesis"):
+                final_content += chunk
+                yield chunk
+        except RequestCancelled as stop:
+            yield self._partial_answer(reports, str(stop))
+            return
+
+        if context is not None and context.cancelled:
+            return
+
+        self._remember(user_input, final_content)
+
+    def clear_memory(self):
+        self.conversation_history = []
+
+    def _run_specialists(self, user_input: str, context: Optional[RequestContext] = None
+                         ) -> Iterator[Tuple[SpecialistAgent, str, str, float]]:
+        """Fan out to all specialists and yield (specialist, status, output, elapsed) as each resolves"""
+        history = self.conversation_history[-self.context_messages:] if self.context_messages else []
+        executor = ThreadPoolExecutor(max_workers=len(self.specialists), thread_name_prefix="specialist")
+        started = time.monotonic()
+        pending = {}
+
+        for specialist in self.specialists:
+            specialist.conversation_history = list(history)
+            budget = specialist.timeout
+            if context is not None and context.remaining() is not None:
+                budget = min(budget, context.remaining())
+            # Each specialist gets its own deadline, a little before the orchestrator stops waiting for it,
+            # and is cancelled along with the whole request
+            sub_timeout = budget - min(self.wrap_up, budget / 5)
+            specialist_context = context.child(sub_timeout) if context else RequestContext(sub_timeout)
+            future = executor.submit(specialist.process, user_input, specialist_context)
+            pending[future] = (specialist, specialist_context, time.monotonic() + budget)
+
+        try:
+            while pending:
+                next_deadline = min(give_up_at for _, _, give_up_at in pending.values())
+                done, _ = wait(pending, timeout=max(0.0, next_deadline - time.monotonic()),
+                               return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    specialist, specialist_context, _ = pending.pop(future)
+                    elapsed = time.monotonic() - started
+                    try:
+                        output = future.result()
+                        # A specialist stopped by its deadline still returns its partial findings. Only a
+                        # cancellation that happened counts: one that finished just in time is complete.
+                        stopped = specialist_context.reason is not None
+                        yield specialist, "partial" if stopped else "ok", output, elapsed
+                    except Exception as e:
+                        yield specialist, "error", str(e), elapsed
+
+                # Give up on specialists that ran past their own timeout and stop their work
+                now = time.monotonic()
+                for future, (specialist, specialist_context, give_up_at) in list(pending.items()):
+                    if now >= give_up_at:
+                        del pending[future]
+                        future.cancel()
+                        specialist_context.cancel("timed out")
+                        yield specialist, "timeout", "", now - started
+        finally:
+            # Don't block on stragglers - their results are no longer needed
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _format_status(self, specialist: SpecialistAgent, status: str, output: str, elapsed: float) -> str:
+        if status == "ok":
+            return f"✅ **{specialist.label}** finished in {elapsed:.1f}s"
+        if status == "partial":
+            return f"⏱️ **{specialist.label}** stopped early after {elapsed:.1f}s - using its partial findings"
+        if status == "timeout":
+            return f"⏱️ **{specialist.label}** timed out after {specialist.timeout:g}s - continuing with partial results"
+        return f"❌ **{specialist.label}** failed: {output}"
+
+    def _partial_answer(self, reports: List[Tuple[SpecialistAgent, str, str]], reason: str) -> str:
+        lines = [f"⏹️ I had to stop before writing the full plan ({reason or 'cancelled'}). Here are the specialist reports:\n"]
+        for specialist, status, output in reports:
+            if status in ("ok", "partial") and output:
+                lines.append(f"### {specialist.label}\n{output}\n")
+        return "\n".join(lines)
+
+    def _create_synthesis_messages(self, user_input: str, reports: List[Tuple[SpecialistAgent, str, str]]) -> List[Message]:
+        sections = []
+        # Keep a stable section order regardless of which specialist finished first
+        for specialist, status, output in sorted(reports, key=lambda report: self.specialists.index(report[0])):
+            if status in ("ok", "partial") and output:
+                sections.append(f"### {specialist.label}\n{output}")
+            else:
+                sections.append(f"### {specialist.label}\n(No report - the specialist {'timed out' if status == 'timeout' else 'failed'})")
+
+        messages = [Message("system", ORCHESTRATOR_SYNTHESIS_PROMPT)]
+        messages.extend(self._history_for_prompt())
+        messages.append(Message(
+            "user",
+            f"Traveler request: {user_input}\n\nSpecialist reports:\n\n" + "\n\n".join(sections)
+        ))
+        return messages
@@ -1,114 +1,109 @@
-import json
-from typing import List, Dict, Any, Optional, Iterator
+import uuid
+from typing import List, Dict, Any, Optional, Iterator, Tuple
 from src.agents.tool_agent import ToolAgent
-from src.core.tools import Tool
+from src.core.checkpoints import Checkpoint, CheckpointStore
+from src.core.context import RequestContext, RequestCancelled
+from src.core.messages import Message
+from src.core.prompts import TRAVEL_AGENT_REASONING_SYSTEM_PROMPT
+from src.core.resilience import DEFAULT_EXECUTOR
+from src.core.tools import Tool, ToolResult
 
 
 class ReasoningAgent(ToolAgent):
-    def __init__(self, max_iterations: int = 20, **kwargs):
+    def __init__(self, max_iterations: int = 20, full_output_iterations: Optional[int] = 2,
+                 checkpoints: Optional[CheckpointStore] = None, **kwargs):
+        # Retry failed tools with backoff through the shared circuit breakers
+        kwargs.setdefault("resilience", DEFAULT_EXECUTOR)
         super().__init__(**kwargs)
         self.max_iterations = max_iterations
+        # Tool outputs older than this many iterations are resent as digests (None keeps them all in full)
+        self.full_output_iterations = full_output_iterations
+        # Loop state is saved here after every iteration, so a failed run can resume instead of starting over
+        self.checkpoints = checkpoints
+        self.last_run_id: Optional[str] = None
         self.enable_memory = True
         self.show_reasoning = True  # Always show reasoning for agent loop
-    
-    def process(self, user_input: str) -> str:
         # Initial system prompt with planning capability
-        system_prompt = """You are a helpful travel planning assistant with access to real-time information tools.
-
-        When helping users plan trips, you should:
-        1. Always check the weather forecast for their destination and travel dates first
-        2. Search for flight options and provide specific recommendations with prices
-        3. Look for hotel accommodations that match their preferences
-        4. Consider weather conditions when suggesting activities
-        5. If a tool fails (returns an error message starting with ❌), retry it or try alternative approaches
-        6. Provide comprehensive travel plans with specific flight and hotel recommendations
-        
-        Your goal is to create personalized, weather-aware travel plans with actionable booking information.
-        You can call multiple tools to gather all necessary information. Tools may occasionally fail due to service issues - simply retry them or use alternative approaches if needed."""
-        
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        # Add few-shot examples from parent classes
-        from src.core.prompts import TRAVEL_AGENT_TOOL_FEW_SHOT_EXAMPLES
-        for example in TRAVEL_AGENT_TOOL_FEW_SHOT_EXAMPLES:
-            messages.append({"role": "user", "content": example["user"]})
-            messages.append({"role": "assistant", "content": example["assistant"]})
-        
-        # Add conversation history if memory is enabled
-        if self.enable_memory:
-            messages.extend(self.conversation_history)
-        
-        messages.append({"role": "user", "content": user_input})
-        
-        iterations = 0
+        self.system_prompt = TRAVEL_AGENT_REASONING_SYSTEM_PROMPT
+    
+    def process(self, user_input: str, context: Optional[RequestContext] = None) -> str:
+        # A fresh run, or the state saved after the last finished iteration of this one
+        run = self._start_run(user_input, context)
+        messages = run.messages
+        iterations = run.iterations
         final_response = None
-        reasoning_trace = []
+        reasoning_trace = run.trace
+        findings = run.findings
+        memo = run.memo  # Successful tool results, reused when a later iteration repeats a call
+        tool_turns = run.tool_turns  # Each iteration's tool messages, for digesting later
         
-        reasoning_trace.append(f"🤖 **Agent Loop Starting** (max {self.max_iterations} iterations)\n")
+        low_confidence = run.low_confidence
         
-        while iterations < self.max_iterations:
-            reasoning_trace.append(f"\n🔄 **Iteration {iterations + 1}**")
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=self.temperature,
-                tools=[{"type": "function", "function": tool.to_openai_function()} for tool in self.tools],
-                tool_choice="auto"
-            )
-            
-            response_message = response.choices[0].message
-            messages.append(response_message)
-            
-            # Log the agent's reasoning
-            if response_message.content:
-                reasoning_trace.append(f"💭 **Thinking**: {response_message.content}")
-            
-            # If no tool calls, we have our final answer
-            if not response_message.tool_calls:
-                reasoning_trace.append("✨ **Final response ready!**\n\n---\n")
-                final_response = response_message.content
-                break
-            
-            # Execute all tool calls with immediate retry on failure
-            reasoning_trace.append(f"🔧 **Executing {len(response_message.tool_calls)} tool(s)**:")
-            for tool_call in response_message.tool_calls:
-                tool_name = tool_call.function.name
-                tool_args = json.loads(tool_call.function.arguments)
+        if not reasoning_trace:
+            reasoning_trace.append(f"🤖 **Agent Loop Starting** (max {self.max_iterations} iterations)\n")
+        if iterations:
+            reasoning_trace.append(f"\n⏮️ **Resuming** after iteration {iterations} from a checkpoint")
+        
+        try:
+            while iterations < self.max_iterations:
+                # Stop between iterations if the request was abandoned or ran out of time
+                if context is not None:
+                    context.check()
                 
-                reasoning_trace.append(f"  • {tool_name}({tool_args})")
+                model = self.router.model_for_planning(low_confidence)
+                reasoning_trace.append(f"\n🔄 **Iteration {iterations + 1}**{self._routing_note(model, low_confidence)}")
                 
-                if tool_name in self.tool_map:
-                    # Try the tool, retry once if it fails
-                    result = self.tool_map[tool_name].execute(**tool_args)
-                    
-                    if result.startswith("❌"):
-                        reasoning_trace.append(f"    → ⚠️ Failed: {result}")
-                        reasoning_trace.append(f"    → 🔄 Retrying immediately...")
-                        
-                        # Immediate retry
-                        result = self.tool_map[tool_name].execute(**tool_args)
-                        
-                        if result.startswith("❌"):
-                            reasoning_trace.append(f"    → ❌ Retry failed: {result}")
-                            reasoning_trace.append(f"    → Will continue with partial information")
-                        else:
-                            reasoning_trace.append(f"    → ✅ Retry successful: {result}")
+                response = self._create_completion(
+                    messages,
+                    model=model,
+                    context=context,
+                    stage="planning",
+                    tools=self._tool_schemas(user_input),
+                    tool_choice="auto"
+                )
+                
+                response_message = response.choices[0].message
+                messages.append(Message.from_response(response_message))
+                
+                # Log the agent's reasoning
+                if response_message.content:
+                    reasoning_trace.append(f"💭 **Thinking**: {response_message.content}")
+                
+                # If no tool calls, we have our final answer
+                if not response_message.tool_calls:
+                    if model != self.router.model_for_synthesis():
+                        # Planning is done - hand the gathered context to the synthesis model
+                        messages.pop()
+                        reasoning_trace.append(f"✨ **Ready to answer** - synthesizing with {self.router.model_for_synthesis()}\n\n---\n")
+                        final_response = self._call_llm(messages, model=self.router.model_for_synthesis(),
+                                                        context=context, stage="synthesis")
                     else:
-                        reasoning_trace.append(f"    → ✅ Success: {result}")
-                    
-                    messages.append({
-                        "role": "tool",
-                        "content": result,
-                        "tool_call_id": tool_call.id
-                    })
-            
-            iterations += 1
+                        reasoning_trace.append("✨ **Final response ready!**\n\n---\n")
+                        final_response = response_message.content
+                    break
+                
+                # Execute all tool calls, retrying failures with backoff
+                reasoning_trace.append(f"🔧 **Executing {len(response_message.tool_calls)} tool(s)**:")
+                results = []
+                for line in self._execute_tools(response_message.tool_calls, messages, results, context, memo):
+                    reasoning_trace.append(line)
+                findings.extend(results)
+                tool_turns.append(list(zip(range(len(messages) - len(results), len(messages)), results)))
+                self._digest_old_outputs(messages, tool_turns)
+                
+                # An iteration where every tool call failed escalates the next one
+                low_confidence = not any(result.ok for _, result in results)
+                iterations += 1
+                self._save_checkpoint(run, iterations, low_confidence)
+        except RequestCancelled as stop:
+            reasoning_trace.append(f"\n⏹️ **Stopped early**: {stop}\n\n---\n")
+            return "\n".join(reasoning_trace) + "\n" + self._partial_answer(findings, str(stop))
+        
+        self._finish_run(run)
         
         # Update conversation history if memory is enabled
         if self.enable_memory and final_response:
-            self.conversation_history.append({"role": "user", "content": user_input})
-            self.conversation_history.append({"role": "assistant", "content": final_response})
+            self._remember(user_input, final_response)
         
         full_response = final_response or "I couldn't complete the travel planning. Please try again."
         
@@ -119,114 +114,193 @@ class ReasoningAgent(ToolAgent):
     def clear_memory(self):
         self.conversation_history = []
     
-    def process_stream(self, user_input: str) -> Iterator[str]:
-        # Initial system prompt with planning capability
-        system_prompt = """You are a helpful travel planning assistant with access to real-time information tools.
-
-        When helping users plan trips, you should:
-        1. Always check the weather forecast for their destination and travel dates first
-        2. Search for flight options and provide specific recommendations with prices
-        3. Look for hotel accommodations that match their preferences
-        4. Consider weather conditions when suggesting activities
-        5. If a tool fails (returns an error message starting with ❌), retry it or try alternative approaches
-        6. Provide comprehensive travel plans with specific flight and hotel recommendations
-        
-        Your goal is to create personalized, weather-aware travel plans with actionable booking information.
-        You can call multiple tools to gather all necessary information. Tools may occasionally fail due to service issues - simply retry them or use alternative approaches if needed."""
-        
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        # Add few-shot examples from parent classes
-        from src.core.prompts import TRAVEL_AGENT_TOOL_FEW_SHOT_EXAMPLES
-        for example in TRAVEL_AGENT_TOOL_FEW_SHOT_EXAMPLES:
-            messages.append({"role": "user", "content": example["user"]})
-            messages.append({"role": "assistant", "content": example["assistant"]})
-        
-        # Add conversation history if memory is enabled
-        if self.enable_memory:
-            messages.extend(self.conversation_history)
-        
-        messages.append({"role": "user", "content": user_input})
-        
-        iterations = 0
+    def resume(self, run_id: str, context: Optional[RequestContext] = None) -> str:
+        """Continue a run from its last checkpoint, e.g. after a timeout, a provider error or a restart"""
+        checkpoint = self._load_checkpoint(run_id)
+        return self.process(checkpoint.user_input, RequestContext(parent=context, run_id=run_id))
+    
+    def resume_stream(self, run_id: str, context: Optional[RequestContext] = None) -> Iterator[str]:
+        checkpoint = self._load_checkpoint(run_id)
+        return self.process_stream(checkpoint.user_input, RequestContext(parent=context, run_id=run_id))
+    
+    def _load_checkpoint(self, run_id: str) -> Checkpoint:
+        checkpoint = self.checkpoints.load(run_id) if self.checkpoints is not None else None
+        if checkpoint is None:
+            raise KeyError(f"No checkpoint for run '{run_id}'")
+        return checkpoint
+    
+    def _start_run(self, user_input: str, context: Optional[RequestContext]) -> Checkpoint:
+        # The run id comes from the request, so retrying the same run picks up its checkpoint
+        run_id = context.run_id if context is not None and context.run_id else uuid.uuid4().hex
+        self.last_run_id = run_id
+        if self.checkpoints is not None:
+            checkpoint = self.checkpoints.load(run_id)
+            if checkpoint is not None and checkpoint.user_input == user_input:
+                return checkpoint
+        return Checkpoint(run_id, user_input, self._create_tool_messages(user_input))
+    
+    def _save_checkpoint(self, run: Checkpoint, iterations: int, low_confidence: bool):
+        # The lists in ``run`` are the loop's own, so only the counters need bringing up to date
+        if self.checkpoints is None:
+            return
+        run.iterations, run.low_confidence = iterations, low_confidence
+        self.checkpoints.save(run)
+    
+    def _finish_run(self, run: Checkpoint):
+        if self.checkpoints is not None:
+            self.checkpoints.delete(run.run_id)
+    
+    def _execute_tools(self, tool_calls: List[Any], messages: List[Any], results: List[Tuple[str, ToolResult]],
+                       context: Optional[RequestContext] = None,
+                       memo: Optional[Dict[str, ToolResult]] = None) -> Iterator[str]:
+        """Run tool calls, append their outputs to messages and results, and yield trace lines"""
+        for tool_call in tool_calls:
+            tool_name = tool_call.function.name
+            tool_args = self._parse_arguments(tool_call.function.arguments)
+            
+            yield f"  • {tool_name}({tool_args})"
+            
+            if tool_name in self.tool_map:
+                retry_notes = []
+                
+                def on_retry(failed: ToolResult, attempt: int, delay: float):
+                    retry_notes.append(f"    → ⚠️ Failed: {failed}")
+                    retry_notes.append(f"    → 🔄 Retrying in {delay:.1f}s (attempt {attempt})...")
+                
+                result = self._run_tool(self.tool_map[tool_name], tool_args, on_retry=on_retry, context=context,
+                                        memo=memo)
+                yield from retry_notes
+                
+                if result.reused:
+                    yield f"    → ♻️ Reused earlier result: {result}"
+                elif result.ok:
+                    yield f"    → ✅ {'Retry successful' if result.attempts > 1 else 'Success'}: {result}"
+                elif result.error == "circuit_open":
+                    yield f"    → 🚫 Skipped: {result}"
+                    yield f"    → Will continue with partial information"
+                else:
+                    yield f"    → ❌ {'Retry failed' if result.attempts > 1 else 'Failed'}: {result}"
+                    yield f"    → Will continue with partial information"
+            else:
+                result = ToolResult.failure(f"❌ Unknown tool: {tool_name}", "unknown_tool", retryable=False)
+                yield f"    → {result}"
+            
+            results.append((tool_name, result))
+            messages.append(Message.tool(self.compactor.compact(tool_name, result.output), tool_call.id))
+    
+    def _digest_old_outputs(self, messages: List[Message],
+                            tool_turns: List[List[Tuple[int, Tuple[str, ToolResult]]]]):
+        """Shrink tool messages from older iterations, which are resent with every completion"""
+        if self.full_output_iterations is None or len(tool_turns) <= self.full_output_iterations:
+            return
+        for index, (tool_name, result) in tool_turns[-self.full_output_iterations - 1]:
+            messages[index] = Message.tool(self.compactor.digest(tool_name, result.output),
+                                           messages[index].tool_call_id)
+    
+    def _routing_note(self, model: str, low_confidence: bool) -> str:
+        if not self.router.is_cascade:
+            return ""
+        if low_confidence and model == self.router.model_for_synthesis():
+            return f" ({model}, escalated after failed tools)"
+        return f" ({model})"
+    
+    def process_stream(self, user_input: str, context: Optional[RequestContext] = None) -> Iterator[str]:
+        # A fresh run, or the state saved after the last finished iteration of this one
+        run = self._start_run(user_input, context)
+        messages = run.messages
+        iterations = run.iterations
         final_response = None
+        findings = run.findings
+        memo = run.memo  # Successful tool results, reused when a later iteration repeats a call
+        tool_turns = run.tool_turns  # Each iteration's tool messages, for digesting later
+        
+        low_confidence = run.low_confidence
         
         yield f"🤖 **Agent Loop Starting** (max {self.max_iterations} iterations)\n\n"
+        if iterations:
+            yield f"⏮️ **Resuming** after iteration {iterations} from a checkpoint\n\n"
         
-        while iterations < self.max_iterations:
-            yield f"🔄 **Iteration {iterations + 1}**\n"
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=self.temperature,
-                tools=[{"type": "function", "function": tool.to_openai_function()} for tool in self.tools],
-                tool_choice="auto"
-            )
-            
-            response_message = response.choices[0].message
-            messages.append(response_message)
-            
-            # Stream the agent's reasoning
-            if response_message.content:
-                yield f"💭 **Thinking**: {response_message.content}\n"
-            
-            # If no tool calls, we have the final answer
-            if not response_message.tool_calls:
-                yield "\n✨ **Final response ready!**\n\n---\n\n"
+        try:
+            while iterations < self.max_iterations:
+                # Stop between iterations if the request was abandoned or ran out of time
+                if context is not None:
+                    context.check()
                 
-                # The response_message.content IS the final travel plan
-                final_response = response_message.content
+                model = self.router.model_for_planning(low_confidence)
+                yield f"🔄 **Iteration {iterations + 1}**{self._routing_note(model, low_confidence)}\n"
                 
-                # Stream the final response word by word to simulate streaming
-                words = final_response.split()
-                for i, word in enumerate(words):
-                    if i > 0:
-                        yield " "
-                    yield word
+                response = self._create_completion(
+                    messages,
+                    model=model,
+                    context=context,
+                    stage="planning",
+                    tools=self._tool_schemas(user_input),
+                    tool_choice="auto"
+                )
                 
-                break
-            
-            # Execute all tool calls with immediate retry
-            yield f"\n🔧 **Executing {len(response_message.tool_calls)} tool(s)**:\n"
-            for tool_call in response_message.tool_calls:
-                tool_name = tool_call.function.name
-                tool_args = json.loads(tool_call.function.arguments)
+                response_message = response.choices[0].message
+                messages.append(Message.from_response(response_message))
                 
-                yield f"  • {tool_name}({tool_args})\n"
+                # Stream the agent's reasoning
+                if response_message.content:
+                    yield f"💭 **Thinking**: {response_message.content}\n"
                 
-                if tool_name in self.tool_map:
-                    # Try the tool, retry once if it fails
-                    result = self.tool_map[tool_name].execute(**tool_args)
-                    
-                    if result.startswith("❌"):
-                        yield f"    → ⚠️ Failed: {result}\n"
-                        yield f"    → 🔄 Retrying immediately...\n"
+                # If no tool calls, we have the final answer
+                if not response_message.tool_calls:
+                    if model != self.router.model_for_synthesis():
+                        # Planning is done - stream the answer from the synthesis model
+                        messages.pop()
+                        yield f"\n✨ **Ready to answer** - synthesizing with {self.router.model_for_synthesis()}\n\n---\n\n"
                         
-                        # Immediate retry
-                        result = self.tool_map[tool_name].execute(**tool_args)
-                        
-                        if result.startswith("❌"):
-                            yield f"    → ❌ Retry failed: {result}\n"
-                            yield f"    → Will continue with partial information\n"
-                        else:
-                            yield f"    → ✅ Retry successful: {result}\n"
-                    else:
-                        yield f"    → ✅ Success: {result}\n"
+                        final_response = ""
+                        for chunk in self._call_llm_stream(messages, model=self.router.model_for_synthesis(),
+                                                        context=context, stage="synthesis"):
+                            final_response += chunk
+                            yield chunk
+                        break
                     
-                    messages.append({
-                        "role": "tool",
-                        "content": result,
-                        "tool_call_id": tool_call.id
-                    })
-            
-            yield "\n"
-            iterations += 1
+                    yield "\n✨ **Final response ready!**\n\n---\n\n"
+                    
+                    # The response_message.content IS the final travel plan
+                    final_response = response_message.content
+                    
+                    # Stream the final response word by word to simulate streaming
+                    words = final_response.split()
+                    for i, word in enumerate(words):
+                        if i > 0:
+                            yield " "
+                        yield word
+                    
+                    break
+                
+                # Execute all tool calls, retrying failures with backoff
+                yield f"\n🔧 **Executing {len(response_message.tool_calls)} tool(s)**:\n"
+                results = []
+                for line in self._execute_tools(response_message.tool_calls, messages, results, context, memo):
+                    yield line + "\n"
+                findings.extend(results)
+                tool_turns.append(list(zip(range(len(messages) - len(results), len(messages)), results)))
+                self._digest_old_outputs(messages, tool_turns)
+                
+                # An iteration where every tool call failed escalates the next one
+                low_confidence = not any(result.ok for _, result in results)
+                yield "\n"
+                iterations += 1
+                self._save_checkpoint(run, iterations, low_confidence)
+        except RequestCancelled as stop:
+            yield f"\n⏹️ **Stopped early**: {stop}\n\n---\n\n"
+            yield self._partial_answer(findings, str(stop))
+            return
+        
+        # A synthesis stream cut short by cancellation is only a partial answer
+        if context is not None and context.cancelled:
+            return
+        
+        self._finish_run(run)
         
         # Update conversation history if memory is enabled
         if self.enable_memory and final_response:
-            self.conversation_history.append({"role": "user", "content": user_input})
-            self.conversation_history.append({"role": "assistant", "content": final_response})
+            self._remember(user_input, final_response)
         
         if not final_response:
-            yield "\n⚠️ I couldn't complete the travel planning. Please try again."
\ No newline at end of file
+            yield "\n⚠️ I couldn't complete the travel planning. Please try again."
@@ -1,19 +1,18 @@
-from typing import Iterator
+from typing import Iterator, Optional
 from src.core.base_agent import BaseAgent
+from src.core.context import RequestContext
+from src.core.messages import Message
 from src.core.prompts import TRAVEL_AGENT_SYSTEM_PROMPT
 
 
+SYSTEM_MESSAGE = Message("system", TRAVEL_AGENT_SYSTEM_PROMPT)
+
+
 class SimpleAgent(BaseAgent):
-    def process(self, user_input: str) -> str:
-        messages = [
-            {"role": "system", "content": TRAVEL_AGENT_SYSTEM_PROMPT},
-            {"role": "user", "content": user_input}
-        ]
-        return self._call_llm(messages)
+    def process(self, user_input: str, context: Optional[RequestContext] = None) -> str:
+        messages = [SYSTEM_MESSAGE, Message("user", user_input)]
+        return self._call_llm(messages, context=context)
     
-    def process_stream(self, user_input: str) -> Iterator[str]:
-        messages = [
-            {"role": "system", "content": TRAVEL_AGENT_SYSTEM_PROMPT},
-            {"role": "user", "content": user_input}
-        ]
-        yield from self._call_llm_stream(messages)
\ No newline at end of file
+    def process_stream(self, user_input: str, context: Optional[RequestContext] = None) -> Iterator[str]:
+        messages = [SYSTEM_MESSAGE, Message("user", user_input)]
+        yield from self._call_llm_stream(messages, context=context)
\ No newline at end of file
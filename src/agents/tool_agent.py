@@ -1,178 +1,290 @@
+import copy
 import json
-from typing import List, Dict, Any, Iterator
+from functools import partial
+from typing import List, Dict, Any, Iterator, Callable, Optional, Tuple
 from src.core.base_agent import BaseAgent
+from src.core.coalescing import request_key
+from src.core.compaction import DEFAULT_COMPACTOR, ToolOutputCompactor
+from src.core.context import RequestContext, RequestCancelled, Overloaded
+from src.core.messages import Message, example_messages
+from src.core.recording import get_cassette
 from src.core.prompts import TRAVEL_AGENT_TOOL_SYSTEM_PROMPT, TRAVEL_AGENT_TOOL_FEW_SHOT_EXAMPLES
-from src.core.tools import Tool, TRAVEL_TOOLS
+from src.core.routing import ModelRouter
+from src.core.resilience import ResilientExecutor
+from src.core.tools import Tool, ToolRegistry, ToolResult, TRAVEL_REGISTRY
 
 
 class ToolAgent(BaseAgent):
-    def __init__(self, tools: List[Tool] = None, **kwargs):
+    def __init__(self, tools: List[Tool] = None, planning_model: str = None,
+                 resilience: Optional[ResilientExecutor] = None, compactor: Optional[ToolOutputCompactor] = None,
+                 registry: Optional[ToolRegistry] = None, **kwargs):
         super().__init__(**kwargs)
-        self.tools = tools or TRAVEL_TOOLS
+        self.registry = registry or TRAVEL_REGISTRY
+        self.tools = tools or list(self.registry)
         self.tool_map = {tool.name: tool for tool in self.tools}
+        self.select_tools = True  # Only send the schemas of tools relevant to the request
+        # Tool selection can run on a cheaper model than the final answer
+        self.router = ModelRouter(synthesis_model=self.model, planning_model=planning_model)
+        self.resilience = resilience  # Retries, backoff and circuit breaking around tools
+        self.compactor = compactor or DEFAULT_COMPACTOR  # Trims tool outputs before the model sees them
         self.show_reasoning = True  # Show tool calling process
         self.enable_memory = True  # Enable conversation memory
+        self.system_prompt = TRAVEL_AGENT_TOOL_SYSTEM_PROMPT
+        self.few_shot_examples = TRAVEL_AGENT_TOOL_FEW_SHOT_EXAMPLES
+        self._prompt_cache = None
     
-    def process(self, user_input: str) -> str:
+    def process(self, user_input: str, context: Optional[RequestContext] = None) -> str:
         reasoning_trace = []
-        messages = [{"role": "system", "content": TRAVEL_AGENT_TOOL_SYSTEM_PROMPT}]
+        messages = self._create_tool_messages(user_input)
+        findings = []
+        memo = {}  # Identical tool calls within this request share one result
         
-        # Add few-shot examples
-        for example in TRAVEL_AGENT_TOOL_FEW_SHOT_EXAMPLES:
-            messages.append({"role": "user", "content": example["user"]})
-            messages.append({"role": "assistant", "content": example["assistant"]})
-        
-        # Add conversation history if memory is enabled
-        if self.enable_memory:
-            messages.extend(self.conversation_history)
-        
-        messages.append({"role": "user", "content": user_input})
-        
-        # Call LLM with tools
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            temperature=self.temperature,
-            tools=[{"type": "function", "function": tool.to_openai_function()} for tool in self.tools],
-            tool_choice="auto"
-        )
-        
-        response_message = response.choices[0].message
-        
-        # Check if the model wants to use tools
-        if response_message.tool_calls:
-            reasoning_trace.append("🤔 **Planning to use tools...**\n")
+        try:
+            # Call LLM with tools
+            response = self._create_completion(
+                messages,
+                model=self.router.model_for_planning(),
+                context=context,
+                stage="planning",
+                tools=self._tool_schemas(user_input),
+                tool_choice="auto"
+            )
+            
+            response_message = response.choices[0].message
             
-            # Execute tool calls
-            tool_results = []
-            for tool_call in response_message.tool_calls:
-                tool_name = tool_call.function.name
-                tool_args = json.loads(tool_call.function.arguments)
+            # Check if the model wants to use tools
+            if response_message.tool_calls:
+                reasoning_trace.append("🤔 **Planning to use tools...**\n")
                 
-                reasoning_trace.append(f"🔧 **Calling {tool_name}** with args: {tool_args}")
+                # Execute tool calls
+                tool_results = []
+                for tool_call in response_message.tool_calls:
+                    tool_name = tool_call.function.name
+                    tool_args = self._parse_arguments(tool_call.function.arguments)
+                    
+                    reasoning_trace.append(f"🔧 **Calling {tool_name}** with args: {tool_args}")
+                    
+                    if tool_name in self.tool_map:
+                        result = self._run_tool(self.tool_map[tool_name], tool_args, context=context, memo=memo)
+                        findings.append((tool_name, result))
+                        tool_results.append({
+                            "tool_call_id": tool_call.id,
+                            "output": self.compactor.compact(tool_name, result.output)
+                        })
+                        reasoning_trace.append(f"{'♻️' if result.reused else '✅'} **{tool_name} result**: {result}\n")
                 
-                if tool_name in self.tool_map:
-                    result = self.tool_map[tool_name].execute(**tool_args)
-                    tool_results.append({
-                        "tool_call_id": tool_call.id,
-                        "output": result
-                    })
-                    reasoning_trace.append(f"✅ **{tool_name} result**: {result}\n")
-            
-            # Add tool results to messages and get final response
-            messages.append(response_message)
-            for result in tool_results:
-                messages.append({
-                    "role": "tool",
-                    "content": result["output"],
-                    "tool_call_id": result["tool_call_id"]
-                })
-            
-            reasoning_trace.append("💭 **Synthesizing results into final response...**\n\n---\n")
-            
-            # Get final response with tool results
-            final_response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=self.temperature
-            )
-            
-            final_content = final_response.choices[0].message.content
-        else:
-            final_content = response_message.content
+                # Add tool results to messages and get final response
+                messages.append(Message.from_response(response_message))
+                for result in tool_results:
+                    messages.append(Message.tool(result["output"], result["tool_call_id"]))
+                
+                reasoning_trace.append("💭 **Synthesizing results into final response...**\n\n---\n")
+                
+                # Get final response with tool results
+                final_content = self._call_llm(messages, model=self.router.model_for_synthesis(), context=context,
+                                               stage="synthesis")
+            elif self.router.is_cascade:
+                # The planning model answered directly - let the synthesis model write the answer
+                final_content = self._call_llm(messages, model=self.router.model_for_synthesis(), context=context,
+                                               stage="synthesis")
+            else:
+                final_content = response_message.content
+        except RequestCancelled as stop:
+            # Out of time, over budget or abandoned - return what we have without remembering it
+            if reasoning_trace and not reasoning_trace[-1].endswith("---\n"):
+                reasoning_trace.append("\n---\n")
+            answer = self._partial_answer(findings, str(stop))
+            if self.show_reasoning and reasoning_trace:
+                return "\n".join(reasoning_trace) + "\n" + answer
+            return answer
         
         # Update conversation history if memory is enabled
         if self.enable_memory:
-            self.conversation_history.append({"role": "user", "content": user_input})
-            self.conversation_history.append({"role": "assistant", "content": final_content})
+            self._remember(user_input, final_content)
         
         if self.show_reasoning and reasoning_trace:
             return "\n".join(reasoning_trace) + "\n" + final_content
         return final_content
     
-    def process_stream(self, user_input: str) -> Iterator[str]:
-        messages = [{"role": "system", "content": TRAVEL_AGENT_TOOL_SYSTEM_PROMPT}]
-        
-        # Add few-shot examples
-        for example in TRAVEL_AGENT_TOOL_FEW_SHOT_EXAMPLES:
-            messages.append({"role": "user", "content": example["user"]})
-            messages.append({"role": "assistant", "content": example["assistant"]})
-        
-        # Add conversation history if memory is enabled
-        if self.enable_memory:
-            messages.extend(self.conversation_history)
-        
-        messages.append({"role": "user", "content": user_input})
-        
-        # First, check if tools will be used
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            temperature=self.temperature,
-            tools=[{"type": "function", "function": tool.to_openai_function()} for tool in self.tools],
-            tool_choice="auto"
-        )
-        
-        response_message = response.choices[0].message
-        
+    def process_stream(self, user_input: str, context: Optional[RequestContext] = None) -> Iterator[str]:
+        messages = self._create_tool_messages(user_input)
+        findings = []
+        memo = {}  # Identical tool calls within this request share one result
         final_content = ""
         
-        if response_message.tool_calls:
-            # Stream the reasoning process
-            if self.show_reasoning:
-                yield "🤔 **Planning to use tools...**\n\n"
+        try:
+            # First, check if tools will be used
+            response = self._create_completion(
+                messages,
+                model=self.router.model_for_planning(),
+                context=context,
+                stage="planning",
+                tools=self._tool_schemas(user_input),
+                tool_choice="auto"
+            )
             
-            # Execute tool calls
-            for tool_call in response_message.tool_calls:
-                tool_name = tool_call.function.name
-                tool_args = json.loads(tool_call.function.arguments)
-                
+            response_message = response.choices[0].message
+            
+            if response_message.tool_calls:
+                # Stream the reasoning process
                 if self.show_reasoning:
-                    yield f"🔧 **Calling {tool_name}** with args: {tool_args}\n"
+                    yield "🤔 **Planning to use tools...**\n\n"
                 
-                if tool_name in self.tool_map:
-                    result = self.tool_map[tool_name].execute(**tool_args)
-                    if self.show_reasoning:
-                        yield f"✅ **{tool_name} result**: {result}\n\n"
-            
-            # Prepare for final response
-            messages.append(response_message)
-            for tool_call in response_message.tool_calls:
-                if tool_call.function.name in self.tool_map:
+                # Execute tool calls
+                tool_results = []
+                for tool_call in response_message.tool_calls:
                     tool_name = tool_call.function.name
-                    tool_args = json.loads(tool_call.function.arguments)
-                    result = self.tool_map[tool_name].execute(**tool_args)
-                    messages.append({
-                        "role": "tool",
-                        "content": result,
-                        "tool_call_id": tool_call.id
-                    })
-            
-            if self.show_reasoning:
-                yield "💭 **Synthesizing results into final response...**\n\n---\n\n"
-            
-            # Stream final response
-            stream = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=self.temperature,
-                stream=True
-            )
+                    tool_args = self._parse_arguments(tool_call.function.arguments)
+                    
+                    if self.show_reasoning:
+                        yield f"🔧 **Calling {tool_name}** with args: {tool_args}\n"
+                    
+                    if tool_name in self.tool_map:
+                        result = self._run_tool(self.tool_map[tool_name], tool_args, context=context, memo=memo)
+                        findings.append((tool_name, result))
+                        tool_results.append({
+                            "tool_call_id": tool_call.id,
+                            "output": self.compactor.compact(tool_name, result.output)
+                        })
+                        if self.show_reasoning:
+                            yield f"{'♻️' if result.reused else '✅'} **{tool_name} result**: {result}\n\n"
+                
+                # Prepare for final response with the same results shown above
+                messages.append(Message.from_response(response_message))
+                for result in tool_results:
+                    messages.append(Message.tool(result["output"], result["tool_call_id"]))
+                
+                if self.show_reasoning:
+                    yield "💭 **Synthesizing results into final response...**\n\n---\n\n"
             
-            for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    final_content += chunk.choices[0].delta.content
-                    yield chunk.choices[0].delta.content
-        else:
-            # No tools needed, stream the response directly
-            for chunk in self._call_llm_stream(messages):
+            # Stream the final response (directly if no tools were needed)
+            for chunk in self._call_llm_stream(messages, model=self.router.model_for_synthesis(), context=context,
+                                               stage="synthesis"):
                 final_content += chunk
                 yield chunk
+        except RequestCancelled as stop:
+            if not final_content:
+                yield "\n---\n\n" + self._partial_answer(findings, str(stop))
+            return
+        
+        # A stream cut short by cancellation is only a partial answer
+        if context is not None and context.cancelled:
+            return
         
         # Update conversation history if memory is enabled
         if self.enable_memory:
-            self.conversation_history.append({"role": "user", "content": user_input})
-            self.conversation_history.append({"role": "assistant", "content": final_content})
+            self._remember(user_input, final_content)
+    
+    def _create_tool_messages(self, user_input: str) -> List[Message]:
+        # System prompt and few-shot examples
+        messages = list(self._prompt_messages())
+        
+        # Add conversation history if memory is enabled
+        if self.enable_memory:
+            messages.extend(self._history_for_prompt())
+        
+        messages.append(Message("user", user_input))
+        return messages
+    
+    def _prompt_messages(self) -> List[Message]:
+        # Built once per agent, and again only if the prompt or examples are swapped out
+        key = (self.system_prompt, id(self.few_shot_examples), len(self.few_shot_examples))
+        if self._prompt_cache is None or self._prompt_cache[0] != key:
+            self._prompt_cache = (key, [Message("system", self.system_prompt)]
+                                  + example_messages(self.few_shot_examples))
+        return self._prompt_cache[1]
+    
+    def _run_tool(self, tool: Tool, tool_args: Dict[str, Any],
+                  on_retry: Optional[Callable[[ToolResult, int, float], None]] = None,
+                  context: Optional[RequestContext] = None,
+                  memo: Optional[Dict[str, ToolResult]] = None) -> ToolResult:
+        """Run a tool, reusing an earlier successful identical call from ``memo`` if there is one.
+
+        ``memo`` lives for one request, so every step of a plan sees the same
+        answer to the same question. Only successes are remembered; a failed
+        call is tried again.
+        """
+        if context is not None:
+            context.usage.add_tool_call()
+        
+        # Reject malformed calls before they cost a backend round trip
+        invalid = tool.check_arguments(tool_args)
+        if invalid is not None:
+            return invalid
+        
+        key = request_key(f"tool:{tool.name}", tool_args)
+        if memo is not None and key in memo:
+            reused = copy.copy(memo[key])
+            reused.reused, reused.attempts, reused.latency = True, 0, 0.0
+            return reused
+        
+        if self.resilience:
+            result = self.resilience.execute(
+                tool, tool_args,
+                call=lambda tool, tool_args: self._invoke_tool(tool, tool_args, context),
+                on_retry=on_retry,
+                context=context
+            )
+        else:
+            result = self._invoke_tool(tool, tool_args, context)
+        if memo is not None and result.ok:
+            memo[key] = result
+        return result
+    
+    def _invoke_tool(self, tool: Tool, tool_args: Dict[str, Any],
+                     context: Optional[RequestContext] = None) -> ToolResult:
+        # A single attempt, shared with identical calls already in flight
+        result = self.coalescer.do(
+            request_key(f"tool:{tool.name}", tool_args),
+            lambda: self._call_tool(tool, tool_args, context),
+            context
+        )
+        return copy.copy(result)  # Callers fill in attempts and latency
+    
+    def _call_tool(self, tool: Tool, tool_args: Dict[str, Any],
+                   context: Optional[RequestContext] = None) -> ToolResult:
+        # Rate limited, hedged if enabled and abandoned if the request is cancelled
+        call = tool.invoke
+        if self.hedger:
+            call = partial(self.hedger.call, f"tool:{tool.name}", tool.invoke, cancel_with=context)
+        cassette = get_cassette()
+        if cassette is not None:
+            call = partial(cassette.tool, tool.name, call)
+        try:
+            self.limiter.acquire(f"tool:{tool.name}", context=context)
+        except Overloaded as shed:
+            # Retrying would only add to the load
+            return ToolResult.failure(f"❌ {tool.name} is busy ({shed}). Continue without it.", "rate_limited",
+                                      retryable=False)
+        try:
+            if context is None:
+                return call(**tool_args)
+            return context.run(call, context=context, **tool_args)
+        except TimeoutError:
+            return ToolResult.failure(
+                f"❌ {tool.name} did not respond in time. Service may be experiencing high load.", "timeout"
+            )
+    
+    def _partial_answer(self, findings: List[Tuple[str, ToolResult]], reason: str) -> str:
+        lines = [f"⏹️ I had to stop before finishing the plan ({reason or 'cancelled'})."]
+        useful = [(tool_name, result) for tool_name, result in findings if result.ok]
+        if useful:
+            lines.append("Here's what I found so far:\n")
+            for tool_name, result in useful:
+                lines.append(f"- **{tool_name}**: {result.output}")
+        return "\n".join(lines)
+    
+    def _tool_schemas(self, user_input: str = "") -> List[Dict[str, Any]]:
+        tools = self.registry.select(user_input, self.tools) if self.select_tools else self.tools
+        return [{"type": "function", "function": tool.to_openai_function()} for tool in tools]
+    
+    @staticmethod
+    def _parse_arguments(arguments: str) -> Any:
+        # Malformed JSON is passed on as is, for the tool's validator to reject
+        try:
+            return json.loads(arguments)
+        except ValueError:
+            return arguments
     
     def clear_memory(self):
         """Clear conversation history"""
@@ -0,0 +1,5 @@
+# Hotel amenities, kept apart from the catalog so the tool schemas can list them without loading NumPy
+AMENITIES = [
+    "Free WiFi", "Pool", "Gym", "Spa", "Restaurant", "Room Service", "Business Center", "Parking",
+    "Pet Friendly", "Beach Access", "Bar", "Concierge", "Breakfast Included", "Airport Shuttle", "Kitchen",
+]
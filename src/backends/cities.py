@@ -0,0 +1,42 @@
+import zlib
+from typing import List
+
+
+CITIES = [
+    "New York", "Los Angeles", "Chicago", "San Francisco", "Miami", "Seattle", "Boston", "Toronto",
+    "Mexico City", "Cancun", "Sao Paulo", "Buenos Aires", "London", "Paris", "Rome", "Barcelona",
+    "Madrid", "Amsterdam", "Berlin", "Lisbon", "Athens", "Istanbul", "Dubai", "Cairo",
+    "Cape Town", "Nairobi", "Delhi", "Mumbai", "Bangkok", "Singapore", "Bali", "Hong Kong",
+    "Shanghai", "Beijing", "Seoul", "Tokyo", "Osaka", "Sydney", "Melbourne", "Honolulu", "Rio de Janeiro",
+]
+
+CITY_ALIASES = {
+    "nyc": "new york", "new york city": "new york", "la": "los angeles", "sf": "san francisco",
+    "rio": "rio de janeiro", "bombay": "mumbai", "new delhi": "delhi", "denpasar": "bali",
+}
+
+
+def normalize_city(city: str) -> str:
+    # "Tokyo, Japan" and "tokyo" are the same city
+    name = city.split(",")[0].strip().lower()
+    return CITY_ALIASES.get(name, name)
+
+
+class CityIndex:
+    """Maps free-form city names to positions in a backend's city list.
+
+    Cities outside the list borrow one by name hash, so every query gets results.
+    """
+
+    def __init__(self, cities: List[str]):
+        self.cities = list(cities)
+        self._positions = {normalize_city(city): i for i, city in enumerate(self.cities)}
+
+    def __len__(self) -> int:
+        return len(self.cities)
+
+    def position(self, city: str) -> int:
+        name = normalize_city(city)
+        if name in self._positions:
+            return self._positions[name]
+        return zlib.crc32(name.encode()) % len(self.cities)
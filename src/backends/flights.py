@@ -0,0 +1,194 @@
+import json
+import os
+import threading
+import time
+from datetime import date as Date
+from typing import Any, Dict, List, Optional
+import numpy as np
+from src.backends.cities import CITIES, CityIndex, normalize_city
+
+
+AIRLINES = [
+    ("SkyWings Airlines", "SW"), ("Global Air", "GA"), ("Swift Travel", "ST"),
+    ("Azure Airways", "AZ"), ("Horizon Flight", "HZ"), ("Cloud9 Airlines", "C9"),
+]
+
+COLUMNS = ("keys", "departure", "duration", "price", "airline", "number", "stops")
+SORT_COLUMNS = {"price": "price", "duration": "duration", "departure": "departure"}
+
+
+class FlightInventory:
+    """A flight schedule held in columnar NumPy arrays, sorted by route and day.
+
+    Rows are ordered by a single ``(origin, destination, day)`` key, so all
+    flights for one route on one day are a contiguous slice, and an offsets
+    array (one entry per key) finds that slice in O(1). Filters then run
+    vectorised over the slice and top-k uses a partial sort. The schedule
+    repeats every ``days`` days (a whole number of weeks), so any date has
+    flights.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], cities: List[str], days: int):
+        self.cities = list(cities)
+        self.days = days
+        self._city_index = CityIndex(self.cities)
+        for name in COLUMNS:
+            setattr(self, name, columns[name])
+        # Row range of every (origin, destination, day) key: offsets[key]:offsets[key + 1]
+        n_keys = len(self.cities) ** 2 * days
+        self.offsets = np.searchsorted(self.keys, np.arange(n_keys + 1, dtype=self.keys.dtype))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def synthetic(cls, size: int = 2_000_000, cities: Optional[List[str]] = None, days: int = 91,
+                  seed: int = 0) -> "FlightInventory":
+        """Generate a plausible schedule: durations follow route distance, prices follow duration and weekday"""
+        cities = cities or CITIES
+        rng = np.random.default_rng(seed)
+        n_cities = len(cities)
+
+        origin = rng.integers(0, n_cities, size)
+        destination = (origin + rng.integers(1, n_cities, size)) % n_cities  # Never the origin
+        day = rng.integers(0, days, size)
+        departure = rng.integers(5 * 12, 23 * 12, size) * 5  # Minutes after midnight, on the 5
+        stops = rng.choice(3, size, p=[0.6, 0.3, 0.1])
+
+        # Route length from random city positions, 1h to ~15h nonstop
+        positions = rng.uniform(0, 1, (n_cities, 2))
+        distance = np.linalg.norm(positions[:, None, :] - positions[None, :, :], axis=2)
+        nonstop = 60 + distance * 600
+        duration = nonstop[origin, destination] * (1 + 0.35 * stops) * rng.uniform(0.95, 1.1, size)
+
+        # Stops make flights cheaper, Fridays and Sundays dearer
+        weekday = (day - 1) % 7
+        price = (40 + duration * 0.9) * (1 - 0.15 * stops) * rng.lognormal(0, 0.25, size)
+        price *= np.where((weekday == 4) | (weekday == 6), 1.15, 1.0)
+
+        keys = (origin * n_cities + destination) * days + day
+        order = np.lexsort((departure, keys))
+        columns = {
+            "keys": keys[order].astype(np.int32),
+            "departure": departure[order].astype(np.int16),
+            "duration": duration[order].astype(np.int16),
+            "price": np.maximum(price[order], 49).round().astype(np.float32),
+            "airline": rng.integers(0, len(AIRLINES), size).astype(np.int8),
+            "number": rng.integers(100, 10_000, size).astype(np.int16),
+            "stops": stops[order].astype(np.int8),
+        }
+        return cls(columns, cities, days)
+
+    def save(self, path: str):
+        """Write one .npy file per column, for loading later with ``load(path, mmap=True)``"""
+        os.makedirs(path, exist_ok=True)
+        for name in COLUMNS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"cities": self.cities, "days": self.days}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "FlightInventory":
+        """Load a saved schedule; memory-mapped columns are paged in only as queries touch them"""
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+                   for name in COLUMNS}
+        return cls(columns, meta["cities"], meta["days"])
+
+    def search(self, origin: str, destination: str, date: str, max_price: Optional[float] = None,
+               max_duration: Optional[int] = None, depart_after: Optional[int] = None,
+               depart_before: Optional[int] = None, max_stops: Optional[int] = None,
+               sort_by: str = "price", limit: int = 5) -> Dict[str, Any]:
+        """Top ``limit`` flights for a route and date. Durations and departure times are in minutes."""
+        if sort_by not in SORT_COLUMNS:
+            raise ValueError(f"sort_by must be one of {', '.join(SORT_COLUMNS)}")
+        if normalize_city(origin) == normalize_city(destination):
+            raise ValueError(f"origin and destination are the same ({origin}); ask which city to fly to")
+        travel_date = Date.fromisoformat(date)
+        o, d = self._city_index.position(origin), self._city_index.position(destination)
+        if o == d:
+            # Two different unknown cities hashed to the same slot; give the route its own schedule
+            d = (d + 1) % len(self.cities)
+        key = (o * len(self.cities) + d) * self.days + travel_date.toordinal() % self.days
+        lo, hi = int(self.offsets[key]), int(self.offsets[key + 1])
+
+        rows = np.arange(lo, hi)
+        mask = np.ones(len(rows), dtype=bool)
+        if max_price is not None:
+            mask &= self.price[lo:hi] <= max_price
+        if max_duration is not None:
+            mask &= self.duration[lo:hi] <= max_duration
+        if depart_after is not None:
+            mask &= self.departure[lo:hi] >= depart_after
+        if depart_before is not None:
+            mask &= self.departure[lo:hi] <= depart_before
+        if max_stops is not None:
+            mask &= self.stops[lo:hi] <= max_stops
+        rows = rows[mask]
+
+        order_by = getattr(self, SORT_COLUMNS[sort_by])[rows]
+        if len(rows) > limit:
+            top = np.argpartition(order_by, limit - 1)[:limit]
+            rows, order_by = rows[top], order_by[top]
+        rows = rows[np.argsort(order_by, kind="stable")]
+
+        return {
+            "flights": [self._flight(row, origin, destination, date) for row in rows],
+            "total_matches": int(mask.sum()),
+        }
+
+    def _flight(self, row: int, origin: str, destination: str, date: str) -> Dict[str, Any]:
+        departure, duration = int(self.departure[row]), int(self.duration[row])
+        arrival = departure + duration
+        airline, code = AIRLINES[int(self.airline[row])]
+        stops = int(self.stops[row])
+        return {
+            "airline": airline,
+            "departure": f"{origin} {departure // 60:02d}:{departure % 60:02d}",
+            "arrival": f"{destination} {arrival // 60 % 24:02d}:{arrival % 60:02d}"
+                       + (f" (+{arrival // 1440}d)" if arrival >= 1440 else ""),
+            "price": f"${int(self.price[row])}",
+            "date": date,
+            "flight_number": f"{code}{int(self.number[row])}",
+            "duration": f"{duration // 60}h {duration % 60}m",
+            "stops": "nonstop" if stops == 0 else f"{stops} stop{'s' if stops > 1 else ''}",
+        }
+
+
+_inventory: Optional[FlightInventory] = None
+_inventory_lock = threading.Lock()
+
+
+def get_flight_inventory() -> FlightInventory:
+    """The shared inventory: loaded from FLIGHT_INVENTORY_PATH if set, otherwise generated once"""
+    global _inventory
+    with _inventory_lock:
+        if _inventory is not None:
+            return _inventory
+        path = os.getenv("FLIGHT_INVENTORY_PATH")
+        if path and os.path.exists(os.path.join(path, "meta.json")):
+            _inventory = FlightInventory.load(path)
+        else:
+            _inventory = FlightInventory.synthetic(int(os.getenv("FLIGHT_INVENTORY_SIZE", 2_000_000)))
+        return _inventory
+
+
+if __name__ == "__main__":
+    # Quick benchmark: python -m src.backends.flights [size]
+    import sys
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    started = time.perf_counter()
+    inventory = FlightInventory.synthetic(size)
+    print(f"Built {len(inventory):,} flights in {time.perf_counter() - started:.2f}s")
+
+    rng = np.random.default_rng(1)
+    queries = 2_000
+    started = time.perf_counter()
+    for _ in range(queries):
+        o, d = rng.choice(inventory.cities, 2, replace=False)
+        inventory.search(o, d, f"2026-{rng.integers(1, 13):02d}-{rng.integers(1, 29):02d}",
+                         max_price=900, depart_after=8 * 60, sort_by="duration", limit=5)
+    elapsed = time.perf_counter() - started
+    print(f"{queries:,} searches in {elapsed:.2f}s ({elapsed / queries * 1000:.3f} ms each)")
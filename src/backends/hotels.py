@@ -0,0 +1,222 @@
+import base64
+import json
+import os
+import threading
+import time
+import zlib
+from datetime import date as Date
+from typing import Any, Dict, List, Optional
+import numpy as np
+from src.backends.amenities import AMENITIES
+from src.backends.cities import CITIES, CityIndex
+
+
+AMENITY_BITS = {name.lower(): 1 << i for i, name in enumerate(AMENITIES)}
+AMENITY_ODDS = np.array([0.9, 0.35, 0.5, 0.2, 0.55, 0.4, 0.3, 0.45, 0.25, 0.1, 0.5, 0.3, 0.4, 0.2, 0.15])
+
+NAME_PREFIXES = [
+    "Grand", "City", "Royal", "Harbor", "Metropolitan", "Sunset", "Urban", "Riverside",
+    "Crown", "Skyline", "Garden", "Park", "Central", "Old Town", "Bayview", "Summit",
+]
+NAME_SUFFIXES = ["Hotel", "Inn", "Resort", "Suites", "Lodge", "Plaza", "Residences", "Boutique Hotel"]
+LOCATIONS = ["Downtown {city}", "{city} City Center", "Old Town {city}", "{city} Business District",
+             "Historic {city}", "Airport Area {city}", "{city} Waterfront", "Uptown {city}"]
+
+COLUMNS = ("city", "name", "location", "price", "rating", "amenities", "calendar")
+SORT_OPTIONS = ("recommended", "price", "rating")
+MAX_NIGHTS = 30
+
+
+class HotelCatalog:
+    """Hotels held in columnar NumPy arrays, grouped by city.
+
+    Amenities are a bitset per hotel and availability is a hotel x day
+    calendar that repeats every ``days`` days, so a search is a handful of
+    vectorised masks over one city's rows. Results are ranked and paged
+    with an opaque cursor tied to the query that produced it.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], cities: List[str]):
+        self.cities = list(cities)
+        self._city_index = CityIndex(self.cities)
+        for name in COLUMNS:
+            setattr(self, name, columns[name])
+        self.days = self.calendar.shape[1]
+        # Rows of each city: offsets[city]:offsets[city + 1]
+        self.offsets = np.searchsorted(self.city, np.arange(len(self.cities) + 1, dtype=self.city.dtype))
+
+    def __len__(self) -> int:
+        return len(self.city)
+
+    @classmethod
+    def synthetic(cls, size: int = 50_000, cities: Optional[List[str]] = None, days: int = 91,
+                  seed: int = 0) -> "HotelCatalog":
+        """Generate hotels whose price follows rating and city, with more amenities at better hotels"""
+        cities = cities or CITIES
+        rng = np.random.default_rng(seed)
+
+        city = np.sort(rng.integers(0, len(cities), size))
+        rating = np.clip(rng.normal(4.0, 0.45, size), 2.5, 5.0).round(1)
+        city_cost = rng.uniform(0.6, 1.6, len(cities))
+        price = (40 + 60 * (rating - 2.5) ** 1.6) * city_cost[city] * rng.lognormal(0, 0.3, size)
+
+        has_amenity = rng.random((size, len(AMENITIES))) < AMENITY_ODDS * (0.6 + 0.3 * (rating[:, None] - 2.5))
+        amenities = (has_amenity * (1 << np.arange(len(AMENITIES)))).sum(axis=1)
+
+        columns = {
+            "city": city.astype(np.int16),
+            "name": rng.integers(0, len(NAME_PREFIXES) * len(NAME_SUFFIXES), size).astype(np.int16),
+            "location": rng.integers(0, len(LOCATIONS), size).astype(np.int8),
+            "price": price.round().astype(np.float32),
+            "rating": rating.astype(np.float32),
+            "amenities": amenities.astype(np.uint16),
+            "calendar": rng.random((size, days), dtype=np.float32) < 0.85,  # True when a room is free
+        }
+        return cls(columns, cities)
+
+    def save(self, path: str):
+        """Write one .npy file per column, for loading later with ``load(path, mmap=True)``"""
+        os.makedirs(path, exist_ok=True)
+        for name in COLUMNS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"cities": self.cities}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "HotelCatalog":
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+                   for name in COLUMNS}
+        return cls(columns, meta["cities"])
+
+    def search(self, city: str, checkin_date: str, checkout_date: str, max_price: Optional[float] = None,
+               min_rating: Optional[float] = None, amenities: Optional[List[str]] = None,
+               sort_by: str = "recommended", limit: int = 5, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """One page of hotels with rooms free for the whole stay. ``max_price`` is per night."""
+        if sort_by not in SORT_OPTIONS:
+            raise ValueError(f"sort_by must be one of {', '.join(SORT_OPTIONS)}")
+        checkin, checkout = Date.fromisoformat(checkin_date), Date.fromisoformat(checkout_date)
+        nights = (checkout - checkin).days
+        if not 0 < nights <= MAX_NIGHTS:
+            raise ValueError(f"checkout_date must be 1 to {MAX_NIGHTS} nights after checkin_date")
+        required = self._amenity_mask(amenities or [])
+
+        query = [self._city_index.position(city), checkin_date, checkout_date, max_price, min_rating,
+                 required, sort_by]
+        offset = self._decode_cursor(cursor, query)
+        c = query[0]
+        lo, hi = int(self.offsets[c]), int(self.offsets[c + 1])
+
+        # Friday and Saturday nights cost more
+        stay = np.arange(checkin.toordinal(), checkout.toordinal())
+        night_factors = np.where(np.isin((stay - 1) % 7, (4, 5)), 1.2, 1.0)
+        nightly = self.price[lo:hi] * night_factors.mean()
+
+        mask = self.calendar[lo:hi][:, stay % self.days].all(axis=1)
+        if max_price is not None:
+            mask &= nightly <= max_price
+        if min_rating is not None:
+            mask &= self.rating[lo:hi] >= min_rating
+        if required:
+            mask &= (self.amenities[lo:hi] & required) == required
+        matches = np.flatnonzero(mask)
+
+        if sort_by == "price":
+            rank = nightly[matches]
+        elif sort_by == "rating":
+            rank = -self.rating[lo:hi][matches]
+        else:
+            # Rating, discounted by how expensive the hotel is for its city
+            typical = np.median(nightly) if len(nightly) else 1.0
+            rank = -(self.rating[lo:hi][matches] - nightly[matches] / (2 * typical))
+        ordered = matches[np.lexsort((matches, rank))]  # Ties break by row, so pages are stable
+        page = ordered[offset:offset + limit]
+
+        next_offset = offset + len(page)
+        return {
+            "hotels": [self._hotel(lo + i, city, nightly[i], nights, night_factors.sum()) for i in page],
+            "total_matches": len(matches),
+            "nights": nights,
+            "next_cursor": self._encode_cursor(next_offset, query) if next_offset < len(matches) else None,
+        }
+
+    def _hotel(self, row: int, city: str, nightly: float, nights: int, total_factor: float) -> Dict[str, Any]:
+        name = int(self.name[row])
+        bits = int(self.amenities[row])
+        return {
+            "name": f"{NAME_PREFIXES[name // len(NAME_SUFFIXES)]} {NAME_SUFFIXES[name % len(NAME_SUFFIXES)]}",
+            "location": LOCATIONS[int(self.location[row])].format(city=city),
+            "price_per_night": f"${round(float(nightly))}",
+            "total_price": f"${round(float(self.price[row]) * total_factor)} "
+                           f"for {nights} night{'s' if nights > 1 else ''}",
+            "rating": round(float(self.rating[row]), 1),
+            "amenities": [amenity for i, amenity in enumerate(AMENITIES) if bits & (1 << i)],
+            "availability": "Available",
+        }
+
+    @staticmethod
+    def _amenity_mask(amenities: List[str]) -> int:
+        mask = 0
+        for amenity in amenities:
+            bit = AMENITY_BITS.get(amenity.strip().lower())
+            if bit is None:
+                raise ValueError(f"Unknown amenity '{amenity}'. Choose from: {', '.join(AMENITIES)}")
+            mask |= bit
+        return mask
+
+    @staticmethod
+    def _encode_cursor(offset: int, query: List[Any]) -> str:
+        fingerprint = zlib.crc32(json.dumps(query).encode())
+        return base64.urlsafe_b64encode(json.dumps([offset, fingerprint]).encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: Optional[str], query: List[Any]) -> int:
+        if not cursor:
+            return 0
+        try:
+            offset, fingerprint = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except ValueError:
+            raise ValueError("Invalid cursor")
+        if fingerprint != zlib.crc32(json.dumps(query).encode()):
+            raise ValueError("Cursor belongs to a different search; repeat the search without it")
+        return offset
+
+
+_catalog: Optional[HotelCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_hotel_catalog() -> HotelCatalog:
+    """The shared catalog: loaded from HOTEL_CATALOG_PATH if set, otherwise generated once"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is not None:
+            return _catalog
+        path = os.getenv("HOTEL_CATALOG_PATH")
+        if path and os.path.exists(os.path.join(path, "meta.json")):
+            _catalog = HotelCatalog.load(path)
+        else:
+            _catalog = HotelCatalog.synthetic(int(os.getenv("HOTEL_CATALOG_SIZE", 50_000)))
+        return _catalog
+
+
+if __name__ == "__main__":
+    # Quick benchmark: python -m src.backends.hotels [size]
+    import sys
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    started = time.perf_counter()
+    catalog = HotelCatalog.synthetic(size)
+    print(f"Built {len(catalog):,} hotels in {time.perf_counter() - started:.2f}s")
+
+    rng = np.random.default_rng(1)
+    queries = 2_000
+    started = time.perf_counter()
+    for _ in range(queries):
+        checkin = Date(2026, int(rng.integers(1, 13)), int(rng.integers(1, 28)))
+        checkout = Date.fromordinal(checkin.toordinal() + int(rng.integers(1, 8)))
+        catalog.search(str(rng.choice(catalog.cities)), checkin.isoformat(), checkout.isoformat(),
+                       max_price=250, min_rating=4.0, amenities=["Free WiFi"], limit=5)
+    elapsed = time.perf_counter() - started
+    print(f"{queries:,} searches in {elapsed:.2f}s ({elapsed / queries * 1000:.3f} ms each)")
@@ -0,0 +1,160 @@
+import json
+import math
+import os
+import random
+import threading
+import time
+import weakref
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+from src.core.context import RequestContext
+
+
+DEFAULT_CONFIG = os.path.join(os.path.dirname(__file__), "..", "..", "config", "tool_simulation.json")
+
+FAILURE_MESSAGES = [
+    "❌ {tool} service temporarily unavailable. Please try again.",
+    "❌ {tool} returned an error. Please retry the request.",
+    "❌ {tool} service is down for maintenance. Try again shortly.",
+]
+
+
+class LatencyModel:
+    """How long a simulated backend takes to answer.
+
+    ``kind`` is ``none``, ``fixed`` (always ``value`` seconds) or ``lognormal``
+    (``median`` seconds with spread ``sigma``). Independently of the kind, a
+    ``spike_rate`` fraction of calls take ``spike_multiplier`` times longer.
+    """
+
+    def __init__(self, kind: str = "none", value: float = 0.0, median: float = 0.0, sigma: float = 0.5,
+                 spike_rate: float = 0.0, spike_multiplier: float = 10.0):
+        if kind not in ("none", "fixed", "lognormal"):
+            raise ValueError(f"Unknown latency kind '{kind}'")
+        self.kind = kind
+        self.value = value
+        self.median = median
+        self.sigma = sigma
+        self.spike_rate = spike_rate
+        self.spike_multiplier = spike_multiplier
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            seconds = self.value
+        elif self.kind == "lognormal":
+            seconds = self.median * math.exp(rng.gauss(0, self.sigma))
+        else:
+            seconds = 0.0
+        if self.spike_rate and rng.random() < self.spike_rate:
+            seconds *= self.spike_multiplier
+        return seconds
+
+
+class ToolProfile:
+    """Simulated behaviour of one tool's backend"""
+
+    def __init__(self, failure_rate: float = 0.0, latency: Optional[LatencyModel] = None,
+                 timeout: Optional[float] = None):
+        self.failure_rate = failure_rate
+        self.latency = latency or LatencyModel()
+        self.timeout = timeout  # Calls slower than this fail as timeouts after waiting this long
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any], base: Optional["ToolProfile"] = None) -> "ToolProfile":
+        # Tool entries only need to override what differs from the default profile
+        base = base or cls()
+        latency = LatencyModel(**config["latency"]) if "latency" in config else base.latency
+        return cls(config.get("failure_rate", base.failure_rate), latency, config.get("timeout", base.timeout))
+
+
+class BackendSimulator:
+    """Injects latency and faults in front of tool backends, reproducibly.
+
+    Every call draws from its own RNG seeded by (seed, tool, arguments,
+    attempt number within the request), so a request with a given seed sees
+    the same latencies and failures however its calls interleave with other
+    requests. The seed comes from ``RequestContext.seed``, falling back to the
+    simulator's own; with neither, calls are random.
+    """
+
+    def __init__(self, profiles: Optional[Dict[str, ToolProfile]] = None, default: Optional[ToolProfile] = None,
+                 seed: Optional[int] = None):
+        self.profiles = dict(profiles or {})
+        self.default = default or ToolProfile()
+        self.seed = seed
+        self._attempts: "weakref.WeakKeyDictionary[RequestContext, Counter]" = weakref.WeakKeyDictionary()
+        self._unscoped_attempts = Counter()  # Seeded calls made without a request context
+        self._random = random.Random()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> "BackendSimulator":
+        default = ToolProfile.from_dict(config.get("default", {}))
+        profiles = {name: ToolProfile.from_dict(profile, default) for name, profile in config.get("tools", {}).items()}
+        return cls(profiles, default, config.get("seed"))
+
+    @classmethod
+    def from_file(cls, path: str) -> "BackendSimulator":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def profile(self, tool_name: str) -> ToolProfile:
+        return self.profiles.get(tool_name, self.default)
+
+    def simulate(self, tool_name: str, tool_args: Dict[str, Any],
+                 context: Optional[RequestContext] = None) -> Optional[Tuple[str, str]]:
+        """Wait out the simulated latency. Returns (error, message) for an injected fault, else None."""
+        profile = self.profile(tool_name)
+        rng = self._rng(tool_name, tool_args, context)
+        latency = profile.latency.sample(rng)
+        failed = rng.random() < profile.failure_rate
+        message = rng.choice(FAILURE_MESSAGES).format(tool=tool_name)
+
+        timed_out = profile.timeout is not None and latency > profile.timeout
+        wait = profile.timeout if timed_out else latency
+        if wait:
+            if context is not None:
+                context.sleep(wait)
+            else:
+                time.sleep(wait)
+        if timed_out:
+            return "timeout", f"❌ {tool_name} connection timeout. Service may be experiencing high load."
+        if failed:
+            return "unavailable", message
+        return None
+
+    def _rng(self, tool_name: str, tool_args: Dict[str, Any], context: Optional[RequestContext]) -> random.Random:
+        seed = context.seed if context is not None and context.seed is not None else self.seed
+        if seed is None:
+            with self._lock:
+                return random.Random(self._random.random())
+
+        call = (tool_name, json.dumps(tool_args, sort_keys=True, default=str))
+        with self._lock:
+            attempts = self._attempts.setdefault(context, Counter()) if context is not None else self._unscoped_attempts
+            attempts[call] += 1
+            attempt = attempts[call]
+        return random.Random(f"{seed}:{call[0]}:{call[1]}:{attempt}")
+
+
+_simulator: Optional[BackendSimulator] = None
+_simulator_lock = threading.Lock()
+
+
+def get_simulator() -> BackendSimulator:
+    """The shared simulator, configured from TOOL_SIMULATION_CONFIG (default config/tool_simulation.json)"""
+    global _simulator
+    with _simulator_lock:
+        if _simulator is None:
+            path = os.getenv("TOOL_SIMULATION_CONFIG", DEFAULT_CONFIG)
+            _simulator = BackendSimulator.from_file(path) if os.path.exists(path) else BackendSimulator()
+            if os.getenv("TOOL_SIMULATION_SEED"):
+                _simulator.seed = int(os.getenv("TOOL_SIMULATION_SEED"))
+        return _simulator
+
+
+def set_simulator(simulator: BackendSimulator):
+    """Swap the shared simulator, e.g. for a benchmark with its own fault model"""
+    global _simulator
+    with _simulator_lock:
+        _simulator = simulator
@@ -0,0 +1,125 @@
+import math
+import random
+import threading
+from datetime import date as Date
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from src.backends.cities import CITIES, CityIndex
+
+
+# Annual mean temperature (°C), seasonal swing (°C), share of wet days, southern hemisphere
+CLIMATES = {
+    "New York": (13, 12, 0.30, False), "Los Angeles": (18, 4, 0.10, False), "Chicago": (10, 14, 0.30, False),
+    "San Francisco": (14, 3, 0.20, False), "Miami": (25, 4, 0.40, False), "Seattle": (11, 7, 0.45, False),
+    "Boston": (11, 12, 0.30, False), "Toronto": (9, 14, 0.30, False), "Mexico City": (17, 3, 0.35, False),
+    "Cancun": (27, 3, 0.35, False), "Sao Paulo": (20, 4, 0.40, True), "Buenos Aires": (18, 7, 0.30, True),
+    "London": (11, 7, 0.45, False), "Paris": (12, 8, 0.40, False), "Rome": (16, 9, 0.25, False),
+    "Barcelona": (17, 8, 0.20, False), "Madrid": (15, 10, 0.15, False), "Amsterdam": (10, 7, 0.50, False),
+    "Berlin": (10, 10, 0.35, False), "Lisbon": (17, 6, 0.25, False), "Athens": (19, 9, 0.15, False),
+    "Istanbul": (15, 9, 0.30, False), "Dubai": (28, 7, 0.03, False), "Cairo": (22, 7, 0.02, False),
+    "Cape Town": (17, 4, 0.30, True), "Nairobi": (19, 2, 0.35, True), "Delhi": (25, 9, 0.20, False),
+    "Mumbai": (27, 3, 0.35, False), "Bangkok": (29, 2, 0.40, False), "Singapore": (28, 1, 0.50, False),
+    "Bali": (27, 1, 0.40, True), "Hong Kong": (23, 6, 0.40, False), "Shanghai": (17, 11, 0.35, False),
+    "Beijing": (13, 15, 0.20, False), "Seoul": (12, 14, 0.30, False), "Tokyo": (16, 10, 0.35, False),
+    "Osaka": (16, 10, 0.30, False), "Sydney": (18, 5, 0.35, True), "Melbourne": (15, 5, 0.35, True),
+    "Honolulu": (25, 2, 0.25, False), "Rio de Janeiro": (24, 3, 0.35, True),
+}
+
+DRY_CONDITIONS = ["Sunny", "Clear skies", "Partly cloudy", "Cloudy", "Windy", "Foggy"]
+WET_CONDITIONS = ["Light rain", "Light rain", "Heavy rain", "Thunderstorms"]
+TABLE_COLUMNS = ["city", "date", "temperature", "condition", "precipitation", "tips"]
+MAX_CITIES = 10
+MAX_DAYS = 16
+
+
+class WeatherStore:
+    """Deterministic forecasts: the same city and date always give the same weather.
+
+    Each forecast is derived from the city's climate and a seed made from
+    (city, date), and kept in an LRU cache, so repeated and overlapping
+    lookups - including whole multi-city tables - cost a dict hit each.
+    """
+
+    def __init__(self, cities: Optional[List[str]] = None, cache_size: int = 65_536):
+        self._city_index = CityIndex(cities or CITIES)
+        self._forecast = lru_cache(maxsize=cache_size)(self._compute)
+
+    def forecast(self, city: str, date: str) -> Dict[str, Any]:
+        forecast = self._forecast(self._city_index.position(city), Date.fromisoformat(date).toordinal())
+        return {"city": city, "date": date, **{key: value for key, value in forecast.items() if key != "tips"}}
+
+    def table(self, cities: List[str], start_date: str, end_date: Optional[str] = None) -> Dict[str, Any]:
+        """A compact forecast table for every city on every day from start_date to end_date (inclusive)"""
+        if not cities:
+            raise ValueError("cities must list at least one city")
+        if len(cities) > MAX_CITIES:
+            raise ValueError(f"At most {MAX_CITIES} cities per call")
+        start = Date.fromisoformat(start_date)
+        end = Date.fromisoformat(end_date) if end_date else start
+        days = (end - start).days + 1
+        if not 0 < days <= MAX_DAYS:
+            raise ValueError(f"end_date must be 0 to {MAX_DAYS - 1} days after start_date")
+
+        rows = []
+        for city in cities:
+            position = self._city_index.position(city)
+            for ordinal in range(start.toordinal(), end.toordinal() + 1):
+                forecast = self._forecast(position, ordinal)
+                rows.append([
+                    city, Date.fromordinal(ordinal).isoformat(), forecast["temperature"], forecast["condition"],
+                    forecast["precipitation_chance"], ", ".join(forecast["tips"])
+                ])
+        return {"columns": TABLE_COLUMNS, "rows": rows}
+
+    def cache_info(self):
+        return self._forecast.cache_info()
+
+    def _compute(self, position: int, ordinal: int) -> Dict[str, Any]:
+        city = self._city_index.cities[position]
+        mean, swing, wet_share, southern = CLIMATES.get(city, (15, 8, 0.3, False))
+        rng = random.Random(position * 1_000_003 + ordinal)
+
+        # Warmest around late July (late January down south)
+        day_of_year = Date.fromordinal(ordinal).timetuple().tm_yday
+        season = math.cos(2 * math.pi * (day_of_year - 200) / 365)
+        temp_celsius = round(mean + (-swing if southern else swing) * season + rng.gauss(0, 2.5))
+
+        wet = rng.random() < wet_share
+        condition = rng.choice(WET_CONDITIONS if wet else DRY_CONDITIONS)
+        if wet and temp_celsius <= 1:
+            condition = "Snow"
+        precipitation = rng.randint(40, 90) if wet else rng.randint(0, 25)
+
+        tips = []
+        extras = {}
+        if "rain" in condition.lower() or condition == "Thunderstorms":
+            tips.append("umbrella")
+            extras["umbrella_needed"] = True
+        elif condition == "Snow":
+            tips.append("winter clothing")
+            extras["winter_clothing_recommended"] = True
+        elif condition in ("Sunny", "Clear skies") and temp_celsius >= 20:
+            tips.append("sunscreen")
+            extras["sunscreen_recommended"] = True
+
+        return {
+            "temperature": f"{temp_celsius}°C ({int(temp_celsius * 9 / 5 + 32)}°F)",
+            "condition": condition,
+            "precipitation_chance": f"{precipitation}%",
+            "humidity": f"{rng.randint(55, 95) if wet else rng.randint(25, 70)}%",
+            "wind_speed": f"{rng.randint(5, 35) if condition == 'Windy' else rng.randint(3, 20)} km/h",
+            "tips": tips,
+            **extras,
+        }
+
+
+_store: Optional[WeatherStore] = None
+_store_lock = threading.Lock()
+
+
+def get_weather_store() -> WeatherStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = WeatherStore()
+        return _store
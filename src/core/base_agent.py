@@ -1,48 +1,158 @@
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Optional, Iterator
-from openai import OpenAI
 from dotenv import load_dotenv
-import os
+from functools import partial
+from src.core.clients import get_openai_client
+from src.core.context import RequestContext, BudgetExceeded
+from src.core.coalescing import SingleFlight, DEFAULT_COALESCER, request_key
+from src.core.hedging import Hedger
+from src.core.messages import Message, to_wire
+from src.core.ratelimit import RateLimiter, DEFAULT_LIMITER, estimate_tokens
+from src.core.recording import get_cassette
+from src.core.usage import Budget, UsageTracker
 
 load_dotenv()
 
 
 class BaseAgent(ABC):
-    def __init__(self, model: str = "gpt-4o-mini", temperature: float = 0.7):
+    def __init__(self, model: str = "gpt-4o-mini", temperature: float = 0.7, hedger: Optional[Hedger] = None,
+                 usage: Optional[UsageTracker] = None, limiter: Optional[RateLimiter] = None,
+                 coalescer: Optional[SingleFlight] = None):
         self.model = model
         self.temperature = temperature
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        self.conversation_history: List[Dict[str, str]] = []
+        self._client = None  # Created on first use, see client
+        self.hedger = hedger  # Opt-in hedging of slow LLM and tool calls
+        self.usage = usage or UsageTracker()  # Token accounting and budget for the session
+        self.limiter = limiter or DEFAULT_LIMITER  # Shared provider rate limits
+        self.coalescer = coalescer or DEFAULT_COALESCER  # Shares identical in-flight requests
+        self.conversation_history: List[Message] = []
+    
+    @property
+    def client(self) -> Any:
+        # Shared by every agent in the process; the OpenAI SDK is only imported when it is first needed
+        if self._client is None:
+            self._client = get_openai_client()
+        return self._client
+    
+    @client.setter
+    def client(self, client: Any):
+        self._client = client
     
     @abstractmethod
-    def process(self, user_input: str) -> str:
+    def process(self, user_input: str, context: Optional[RequestContext] = None) -> str:
         pass
     
     @abstractmethod
-    def process_stream(self, user_input: str) -> Iterator[str]:
+    def process_stream(self, user_input: str, context: Optional[RequestContext] = None) -> Iterator[str]:
         pass
     
-    def _create_messages(self, user_input: str) -> List[Dict[str, str]]:
-        return [{"role": "user", "content": user_input}]
+    def _create_messages(self, user_input: str) -> List[Message]:
+        return [Message("user", user_input)]
+    
+    def _create_completion(self, messages: List[Any], model: Optional[str] = None,
+                           context: Optional[RequestContext] = None, stage: str = "chat", **kwargs) -> Any:
+        # Single entry point for every chat completion made by the agents; messages become dicts only here
+        messages = to_wire(messages)
+        params = dict(model=self._budgeted_model(model or self.model), messages=messages,
+                      temperature=self.temperature, **kwargs)
+        if params.get("stream"):
+            # Ask for a final chunk carrying the token usage
+            params.setdefault("stream_options", {"include_usage": True})
+        
+        made = []  # Set if this caller made the request rather than sharing another's
+
+        def request() -> Any:
+            # Only the caller that actually makes the request waits for quota
+            made.append(True)
+            self.limiter.acquire(f"llm:{params['model']}", estimate_tokens(messages, kwargs.get("max_tokens")),
+                                 context)
+            call = self._create
+            if self.hedger:
+                call = partial(self.hedger.call, f"llm:{params['model']}", call, cancel_with=context)
+            cassette = get_cassette()
+            if cassette is not None:
+                # Recorded as one call however it was hedged; a replay never reaches the client
+                call = partial(cassette.completion, call)
+            if context is None:
+                response = call(**params)
+            else:
+                # Bound the call by the request deadline and stop waiting on cancellation
+                timeout = context.timeout_for()
+                response = context.run(call, **params, **({"timeout": timeout} if timeout is not None else {}))
+            if not params.get("stream"):
+                self._record_usage(params["model"], response.usage, messages, stage, context, kwargs)
+            return response
+        
+        # Identical requests already in flight (e.g. the same example prompt) share one response
+        key = request_key("llm", params)
+        if params.get("stream"):
+            def on_chunk(chunk: Any, shared: bool = False):
+                if chunk.usage is not None:
+                    self._record_usage(params["model"], chunk.usage, messages, stage, context, kwargs, shared)
+            return self.coalescer.stream(key, request, on_chunk, context,
+                                         on_joined_chunk=partial(on_chunk, shared=True))
+        response = self.coalescer.do(key, request, context)
+        if not made:
+            self._record_usage(params["model"], response.usage, messages, stage, context, kwargs, shared=True)
+        return response
     
-    def _call_llm(self, messages: List[Dict[str, str]], **kwargs) -> str:
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            temperature=self.temperature,
-            **kwargs
-        )
+    def _create(self, **params) -> Any:
+        return self.client.chat.completions.create(**params)
+    
+    def _call_llm(self, messages: List[Message], model: Optional[str] = None,
+                  context: Optional[RequestContext] = None, stage: str = "chat", **kwargs) -> str:
+        response = self._create_completion(messages, model=model, context=context, stage=stage, **kwargs)
         return response.choices[0].message.content
     
-    def _call_llm_stream(self, messages: List[Dict[str, str]], **kwargs) -> Iterator[str]:
-        stream = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            temperature=self.temperature,
-            stream=True,
-            **kwargs
-        )
+    def _call_llm_stream(self, messages: List[Message], model: Optional[str] = None,
+                         context: Optional[RequestContext] = None, stage: str = "chat", **kwargs) -> Iterator[str]:
+        stream = self._create_completion(messages, model=model, context=context, stage=stage, stream=True, **kwargs)
         
-        for chunk in stream:
-            if chunk.choices[0].delta.content is not None:
-                yield chunk.choices[0].delta.content
\ No newline at end of file
+        # Closing the stream on cancellation aborts the in-flight read
+        unregister = context.on_cancel(stream.close) if context else None
+        try:
+            for chunk in stream:
+                if context is not None and context.cancelled:
+                    break
+                # The usage chunk has no choices
+                if chunk.choices and chunk.choices[0].delta.content is not None:
+                    yield chunk.choices[0].delta.content
+        except Exception:
+            # A stream closed by cancellation just ends early with a partial answer
+            if context is None or not context.cancelled:
+                raise
+        finally:
+            if unregister:
+                unregister()
+            stream.close()
+    
+    def _record_usage(self, model: str, usage: Any, messages: List[Dict[str, Any]], stage: str,
+                      context: Optional[RequestContext], kwargs: Dict[str, Any], shared: bool = False):
+        # A response shared with another caller counts towards this session's budget too
+        if usage is None:
+            return
+        self.usage.record(model, usage, stage, context.usage if context else None)
+        if shared:
+            return  # Its rate limit quota was settled by the caller that made the request
+        # Settle the rate limiter's estimate against what the call really used
+        estimate = estimate_tokens(messages, kwargs.get("max_tokens"))
+        self.limiter.adjust(f"llm:{model}", usage.total_tokens - estimate)
+    
+    def _remember(self, user_input: str, response: str):
+        self.conversation_history.append(Message("user", user_input))
+        self.conversation_history.append(Message("assistant", response))
+    
+    def _budgeted_model(self, model: str) -> str:
+        # Spend less as the session budget runs out, and stop once it is gone
+        action = self.usage.budget_action()
+        if action == Budget.STOP:
+            raise BudgetExceeded("token budget exhausted")
+        if action in (Budget.DOWNGRADE, Budget.TRIM):
+            return self.usage.budget.downgrade_model
+        return model
+    
+    def _history_for_prompt(self) -> List[Message]:
+        # Near the end of the budget only the most recent turns are resent
+        if self.usage.budget_action() in (Budget.TRIM, Budget.STOP):
+            return self.conversation_history[-self.usage.budget.keep_messages:]
+        return self.conversation_history
\ No newline at end of file
@@ -0,0 +1,232 @@
+import inspect
+import json
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+from src.core.checkpoints import CheckpointStore
+from src.core.context import RequestContext, BATCH
+from src.core.startup import AGENT_CLASSES, load_agent_class
+from src.core.usage import UsageTracker
+
+
+def load_items(path: str) -> List[Dict[str, Any]]:
+    """Prompts from a JSON lines file.
+
+    Each line is ``{"id": ..., "prompt": "..."}`` or, for a multi-turn
+    conversation, ``{"id": ..., "turns": ["...", "..."]}``. An optional
+    ``agents`` list limits the item to some stages. Items without an id are
+    numbered by line.
+    """
+    items = []
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            turns = item.get("turns") or [item["prompt"]]
+            items.append({"id": str(item.get("id", number)), "turns": list(turns), "agents": item.get("agents")})
+    return items
+
+
+def status(record: Dict[str, Any]) -> str:
+    """``ok``, ``partial`` (a turn was cut short and answered with what it had) or ``error``"""
+    return record.get("status") or ("ok" if record["error"] is None else "error")  # Records from before statuses
+
+
+def completed_tasks(path: str) -> Set[Tuple[str, str]]:
+    """(item id, agent) pairs already answered in full in an output file"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # A line cut short when the batch was interrupted
+            if status(record) == "ok":
+                done.add((record["id"], record["agent"]))
+    return done
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+class BatchRunner:
+    """Runs a file of prompts through several agent stages at once.
+
+    Every stage gets its own pool of ``workers`` threads and a fresh agent
+    per item, so stages run side by side and items within a stage run
+    concurrently. Calls go through the shared rate limiter in the batch
+    lane, behind interactive traffic. Each result is appended to the output
+    file as soon as it is ready; run again with the same output and only the
+    items that failed or ran out of time are redone. With ``checkpoints``,
+    reasoning loops interrupted mid-item pick up from their last iteration too.
+    """
+
+    def __init__(self, agents: Optional[Sequence[str]] = None, workers: int = 4, model: str = "gpt-4o-mini",
+                 planning_model: Optional[str] = None, timeout: Optional[float] = None, seed: Optional[int] = None,
+                 checkpoints: Optional[CheckpointStore] = None):
+        self.agents = list(agents or AGENT_CLASSES)
+        for key in self.agents:
+            if key not in AGENT_CLASSES:
+                raise ValueError(f"Unknown agent '{key}' (expected one of: {', '.join(AGENT_CLASSES)})")
+        self.workers = workers
+        self.model = model
+        self.planning_model = planning_model
+        self.timeout = timeout  # Per turn
+        self.seed = seed  # Makes simulated tool latency and failures reproducible
+        self.checkpoints = checkpoints
+
+    def run(self, input_path: str, output_path: str, resume: bool = True,
+            on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+        """Run every item through every stage and return the new results"""
+        items = load_items(input_path)
+        done = completed_tasks(output_path) if resume else set()
+        if not resume and os.path.exists(output_path):
+            os.unlink(output_path)
+
+        results: List[Dict[str, Any]] = []
+        write_lock = threading.Lock()
+        pools = {key: ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"batch-{key}")
+                 for key in self.agents}
+        with open(output_path, "a") as output:
+            if output.tell() and not _ends_with_newline(output_path):
+                output.write("\n")  # End a line cut short when the last run was interrupted
+
+            def finished(future: Future):
+                if future.cancelled():
+                    return  # Queued when the batch was interrupted; left for a resumed run
+                record = future.result()
+                with write_lock:
+                    output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    output.flush()
+                    results.append(record)
+                if on_result:
+                    on_result(record)
+
+            futures = []
+            try:
+                for key in self.agents:
+                    for item in items:
+                        if (item["agents"] and key not in item["agents"]) or (item["id"], key) in done:
+                            continue
+                        future = pools[key].submit(self._run_item, key, item)
+                        future.add_done_callback(finished)
+                        futures.append(future)
+                wait(futures)
+            finally:
+                # Running items still finish and are written; queued ones are left for a resumed run
+                for pool in pools.values():
+                    pool.shutdown(wait=True, cancel_futures=True)
+        return results
+
+    def _run_item(self, key: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        request = RequestContext(priority=BATCH, seed=self.seed)  # Shared by the item's turns for usage
+        turns = []
+        error = None
+        partial = False
+        started = time.perf_counter()
+        try:
+            agent = self._create_agent(key)
+            for number, prompt in enumerate(item["turns"]):
+                # Each turn has its own deadline and a run id stable across reruns of the batch
+                context = RequestContext(timeout=self.timeout, parent=request, run_id=f"{item['id']}:{key}:{number}")
+                turn_started = time.perf_counter()
+                response = agent.process(prompt, context)
+                turn = {"prompt": prompt, "response": response,
+                        "latency": round(time.perf_counter() - turn_started, 3)}
+                if context.reason is not None:
+                    # The agent was stopped (e.g. by its deadline) and answered with what it had found so far
+                    turn["stopped"] = context.reason
+                    partial = True
+                turns.append(turn)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        return {
+            "id": item["id"],
+            "agent": key,
+            "model": self.model,
+            "turns": turns,
+            "latency": round(time.perf_counter() - started, 3),
+            "usage": request.usage.to_dict(),
+            "status": "error" if error is not None else "partial" if partial else "ok",
+            "error": error,
+        }
+
+    def _create_agent(self, key: str) -> Any:
+        agent_class = load_agent_class(key)
+        parameters = inspect.signature(agent_class.__init__).parameters
+        kwargs: Dict[str, Any] = {"model": self.model, "usage": UsageTracker()}
+        if self.planning_model and "planning_model" in parameters:
+            kwargs["planning_model"] = self.planning_model
+        if self.checkpoints is not None and "checkpoints" in parameters:
+            kwargs["checkpoints"] = self.checkpoints
+        return agent_class(**kwargs)
+
+
+def summarize(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Latency percentiles of complete answers, token use and tool calls per agent"""
+    by_agent: Dict[str, List[Dict[str, Any]]] = {}
+    for record in records:
+        by_agent.setdefault(record["agent"], []).append(record)
+    summary = {}
+    for agent, rows in by_agent.items():
+        latencies = sorted(row["latency"] for row in rows if status(row) == "ok")
+        summary[agent] = {
+            "items": len(rows),
+            "errors": sum(status(row) == "error" for row in rows),
+            "partial": sum(status(row) == "partial" for row in rows),
+            "p50_latency": statistics.median(latencies) if latencies else None,
+            "p95_latency": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] if latencies else None,
+            "total_tokens": sum(row["usage"]["total_tokens"] for row in rows),
+            "cost": round(sum(row["usage"]["cost"] for row in rows), 6),
+            "tool_calls": sum(row["usage"]["tool_calls"] for row in rows),
+        }
+    return summary
+
+
+if __name__ == "__main__":
+    # python -m src.core.batch prompts.jsonl results.jsonl [--agents simple,tool] [--workers 4] [--fresh]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a JSON lines file of prompts through the agent stages")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--agents", default=",".join(AGENT_CLASSES), help="comma separated agent keys")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent items per agent")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--planning-model")
+    parser.add_argument("--timeout", type=float, help="seconds per turn")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--checkpoints", help="directory for reasoning loop checkpoints")
+    parser.add_argument("--fresh", action="store_true", help="start over instead of resuming the output")
+    args = parser.parse_args()
+
+    from src.core.checkpoints import FileCheckpointStore
+
+    runner = BatchRunner(args.agents.split(","), args.workers, args.model, args.planning_model, args.timeout,
+                         args.seed, FileCheckpointStore(args.checkpoints) if args.checkpoints else None)
+    started = time.perf_counter()
+    progress = {"done": 0}
+
+    def report(record: Dict[str, Any]):
+        progress["done"] += 1
+        outcome = f"error: {record['error']}" if record["error"] else f"{record['latency']:.1f}s"
+        if status(record) == "partial":
+            outcome += " (partial: ran out of time)"
+        print(f"[{progress['done']}] {record['agent']:12s} {record['id']}: {outcome}", flush=True)
+
+    new = runner.run(args.input, args.output, resume=not args.fresh, on_result=report)
+    print(f"\n{len(new)} results in {time.perf_counter() - started:.1f}s")
+    for agent, stats in summarize(new).items():
+        latency = f"p50 {stats['p50_latency']:.2f}s p95 {stats['p95_latency']:.2f}s" \
+            if stats["p50_latency"] is not None else "no successes"
+        print(f"{agent:12s} {stats['items']:4d} items {stats['errors']:3d} errors {stats['partial']:3d} partial  "
+              f"{latency}  {stats['total_tokens']:,} tokens ${stats['cost']:.4f}  {stats['tool_calls']} tool calls")
@@ -0,0 +1,144 @@
+import json
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+from src.core.messages import Message, to_wire
+from src.core.tools import ToolResult
+
+
+class Checkpoint:
+    """Where an agent loop had got to after its last completed iteration.
+
+    Holds everything the next iteration needs - the messages so far (with
+    older tool outputs already digested), every tool result, the request's
+    tool memo and the trace shown so far - so a resumed run neither calls
+    the model for a finished iteration nor repeats a tool call.
+    """
+
+    def __init__(self, run_id: str, user_input: str, messages: List[Message], iterations: int = 0,
+                 findings: Optional[List[Tuple[str, ToolResult]]] = None,
+                 memo: Optional[Dict[str, ToolResult]] = None,
+                 tool_turns: Optional[List[List[Tuple[int, Tuple[str, ToolResult]]]]] = None,
+                 low_confidence: bool = False, trace: Optional[List[str]] = None):
+        self.run_id = run_id
+        self.user_input = user_input
+        self.messages = messages
+        self.iterations = iterations
+        self.findings = findings if findings is not None else []
+        self.memo = memo if memo is not None else {}
+        self.tool_turns = tool_turns if tool_turns is not None else []  # Each iteration's tool message indices
+        self.low_confidence = low_confidence
+        self.trace = trace if trace is not None else []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "user_input": self.user_input,
+            "messages": to_wire(self.messages),
+            "iterations": self.iterations,
+            "findings": [[tool_name, _result_to_dict(result)] for tool_name, result in self.findings],
+            "memo": {key: _result_to_dict(result) for key, result in self.memo.items()},
+            "tool_turns": [[[index, tool_name, _result_to_dict(result)] for index, (tool_name, result) in turn]
+                           for turn in self.tool_turns],
+            "low_confidence": self.low_confidence,
+            "trace": self.trace,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Checkpoint":
+        return cls(
+            data["run_id"],
+            data["user_input"],
+            [Message.coerce(message) for message in data["messages"]],
+            data["iterations"],
+            [(tool_name, ToolResult(**result)) for tool_name, result in data["findings"]],
+            {key: ToolResult(**result) for key, result in data["memo"].items()},
+            [[(index, (tool_name, ToolResult(**result))) for index, tool_name, result in turn]
+             for turn in data["tool_turns"]],
+            data["low_confidence"],
+            data["trace"],
+        )
+
+
+def _result_to_dict(result: ToolResult) -> Dict[str, Any]:
+    return {"output": result.output, "ok": result.ok, "error": result.error, "retryable": result.retryable,
+            "attempts": result.attempts, "latency": result.latency, "reused": result.reused}
+
+
+class CheckpointStore(ABC):
+    """Where agent loops save their checkpoints, by run id"""
+
+    @abstractmethod
+    def save(self, checkpoint: Checkpoint):
+        pass
+
+    @abstractmethod
+    def load(self, run_id: str) -> Optional[Checkpoint]:
+        pass
+
+    @abstractmethod
+    def delete(self, run_id: str):
+        pass
+
+
+class MemoryCheckpointStore(CheckpointStore):
+    """Checkpoints kept in this process - survives a failed request, not a restart"""
+
+    def __init__(self):
+        self._checkpoints: Dict[str, str] = {}  # Serialized, so later iterations can't change a saved one
+        self._lock = threading.Lock()
+
+    def save(self, checkpoint: Checkpoint):
+        encoded = json.dumps(checkpoint.to_dict(), ensure_ascii=False)
+        with self._lock:
+            self._checkpoints[checkpoint.run_id] = encoded
+
+    def load(self, run_id: str) -> Optional[Checkpoint]:
+        with self._lock:
+            encoded = self._checkpoints.get(run_id)
+        return Checkpoint.from_dict(json.loads(encoded)) if encoded is not None else None
+
+    def delete(self, run_id: str):
+        with self._lock:
+            self._checkpoints.pop(run_id, None)
+
+    def __len__(self) -> int:
+        return len(self._checkpoints)
+
+
+class FileCheckpointStore(CheckpointStore):
+    """One JSON file per run in ``directory``, replaced atomically so a crash never leaves half a checkpoint"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def save(self, checkpoint: Checkpoint):
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(checkpoint.to_dict(), f, ensure_ascii=False)
+            os.replace(temporary, self._path(checkpoint.run_id))
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def load(self, run_id: str) -> Optional[Checkpoint]:
+        try:
+            with open(self._path(run_id)) as f:
+                return Checkpoint.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def delete(self, run_id: str):
+        try:
+            os.unlink(self._path(run_id))
+        except FileNotFoundError:
+            pass
+
+    def _path(self, run_id: str) -> str:
+        # Run ids come from callers, so keep them to one safe file name
+        safe = "".join(char if char.isalnum() or char in "-_." else "_" for char in run_id)
+        return os.path.join(self.directory, f"{safe}.json")
@@ -0,0 +1,26 @@
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+
+_clients: Dict[Optional[str], "OpenAI"] = {}
+_clients_lock = threading.Lock()
+
+
+def get_openai_client(api_key: Optional[str] = None) -> "OpenAI":
+    """The process-wide OpenAI client for an API key (OPENAI_API_KEY by default).
+
+    The SDK is imported on first use, so code paths that never call a model
+    don't pay for it at startup, and every agent shares one client and its
+    connection pool instead of building its own.
+    """
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            from openai import OpenAI
+            client = _clients[api_key] = OpenAI(api_key=api_key)
+        return client
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from src.core.context import RequestContext, RequestCancelled
+
+
+def request_key(prefix: str, payload: Any) -> str:
+    """Stable key for a request, e.g. a tool's arguments or a completion's parameters"""
+    def default(value: Any) -> Any:
+        # Assistant messages from earlier responses are pydantic models
+        return value.model_dump() if hasattr(value, "model_dump") else str(value)
+
+    encoded = json.dumps(payload, sort_keys=True, default=default)
+    return f"{prefix}:{hashlib.sha256(encoded.encode()).hexdigest()[:16]}"
+
+
+class _LeaderGaveUp(Exception):
+    """The caller making the shared request was cancelled; the next waiter takes over"""
+
+
+class SingleFlight:
+    """Makes concurrent identical requests share one upstream call.
+
+    The first caller for a key (the leader) makes the call; callers that
+    arrive while it is in flight wait for its result instead, each bounded
+    by its own RequestContext. Errors are shared the same way, but nothing
+    is cached - the key is forgotten as soon as the call finishes. If the
+    leader itself is cancelled, one of the waiters makes the call instead.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, Future] = {}
+        self._streams: Dict[str, "_Broadcast"] = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    def do(self, key: str, fn: Callable[[], Any], context: Optional[RequestContext] = None) -> Any:
+        """Return ``fn()``, or the result of an identical call already in flight.
+
+        The result object is shared between callers, so copy it before mutating it.
+        """
+        with self._lock:
+            self.stats["calls"] += 1
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = Future()
+
+            if not leader:
+                try:
+                    result = context.wait(flight) if context is not None else flight.result()
+                except _LeaderGaveUp:
+                    continue
+                with self._lock:
+                    self.stats["coalesced"] += 1
+                return result
+
+            try:
+                result = fn()
+            except RequestCancelled:
+                # Only this caller gave up - let a waiter retry rather than fail with it
+                self._finish(key, flight, error=_LeaderGaveUp())
+                raise
+            except BaseException as error:
+                self._finish(key, flight, error=error)
+                raise
+            self._finish(key, flight, result=result)
+            return result
+
+    def stream(self, key: str, open_stream: Callable[[], Any],
+               on_chunk: Optional[Callable[[Any], None]] = None,
+               context: Optional[RequestContext] = None,
+               on_joined_chunk: Optional[Callable[[Any], None]] = None) -> "_Subscription":
+        """Subscribe to a streamed response, joining an identical stream if one is open.
+
+        Late subscribers replay the chunks they missed. ``on_chunk`` sees each
+        upstream chunk once, however many subscribers there are, while
+        ``on_joined_chunk`` sees each chunk this caller receives if it joined
+        another caller's stream. The upstream stream is closed when the last
+        subscriber closes.
+        """
+        while True:
+            with self._lock:
+                # Joined under the lock that registers streams, so the stream can't be abandoned in between
+                broadcast = self._streams.get(key)
+                subscription = broadcast.subscribe(on_joined_chunk) if broadcast is not None else None
+                if subscription is not None:
+                    self.stats["calls"] += 1
+                    self.stats["coalesced"] += 1
+                    return subscription
+
+            opener: List[_Subscription] = []
+
+            def open_broadcast() -> _Broadcast:
+                opened = _Broadcast(open_stream(), on_chunk, on_finish=lambda: self._forget_stream(key, opened))
+                opener.append(opened.subscribe())  # Before anyone else can join, and leave
+                with self._lock:
+                    self._streams[key] = opened
+                return opened
+
+            broadcast = self.do(key, open_broadcast, context)
+            subscription = opener[0] if opener else broadcast.subscribe(on_joined_chunk)
+            if subscription is not None:
+                return subscription
+            # Everyone else left before this caller joined and the upstream was closed - open a new one
+
+    def _finish(self, key: str, flight: Future, result: Any = None, error: Optional[BaseException] = None):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        if error is not None:
+            flight.set_exception(error)
+        else:
+            flight.set_result(result)
+
+    def _forget_stream(self, key: str, broadcast: "_Broadcast"):
+        with self._lock:
+            if self._streams.get(key) is broadcast:
+                del self._streams[key]
+
+
+class _Broadcast:
+    """Fans one upstream stream out to any number of subscribers"""
+
+    def __init__(self, upstream: Any, on_chunk: Optional[Callable[[Any], None]],
+                 on_finish: Callable[[], None]):
+        self._upstream = upstream
+        self._iterator = iter(upstream)
+        self._on_chunk = on_chunk
+        self._on_finish = on_finish
+        self._chunks: List[Any] = []
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._subscribers = 0
+        self._abandoned = False
+        self._read_lock = threading.Lock()  # One subscriber reads upstream at a time
+        self._lock = threading.Lock()
+
+    def subscribe(self, on_chunk: Optional[Callable[[Any], None]] = None) -> Optional["_Subscription"]:
+        """A new subscriber, or None if the last one left before the stream finished"""
+        with self._lock:
+            if self._abandoned:
+                return None
+            self._subscribers += 1
+        return _Subscription(self, on_chunk)
+
+    def chunk(self, index: int) -> Any:
+        """The chunk at ``index``, reading upstream if nobody has yet. Raises StopIteration at the end."""
+        with self._read_lock:
+            while index >= len(self._chunks):
+                if self._done:
+                    if self._error is not None:
+                        raise self._error
+                    raise StopIteration
+                try:
+                    chunk = next(self._iterator)
+                except StopIteration:
+                    self._finish()
+                    continue
+                except Exception as error:
+                    self._finish(error)
+                    continue
+                self._chunks.append(chunk)
+                if self._on_chunk:
+                    self._on_chunk(chunk)
+            return self._chunks[index]
+
+    def unsubscribe(self):
+        with self._lock:
+            self._subscribers -= 1
+            abandoned = self._abandoned = self._subscribers == 0 and not self._done
+        if abandoned:
+            # Nobody is listening - stop the upstream read (this may interrupt a blocked reader). It ends
+            # with an error, so it can never pass for a complete stream.
+            self._finish(RequestCancelled("every subscriber left the stream"))
+            self._upstream.close()
+
+    def _finish(self, error: Optional[BaseException] = None):
+        with self._lock:
+            if self._done:
+                return
+            self._done = True
+            self._error = error
+        self._on_finish()
+
+
+class _Subscription:
+    """One subscriber's view of a broadcast; iterate it and close it like the stream it replaces"""
+
+    def __init__(self, broadcast: _Broadcast, on_chunk: Optional[Callable[[Any], None]] = None):
+        self._broadcast = broadcast
+        self._on_chunk = on_chunk  # Sees the chunks this subscriber receives
+        self._index = 0
+        self._closed = False
+        self._lock = threading.Lock()  # close() may come from a cancellation callback
+
+    def __iter__(self) -> Iterator[Any]:
+        return self
+
+    def __next__(self) -> Any:
+        if self._closed:
+            raise StopIteration
+        try:
+            chunk = self._broadcast.chunk(self._index)
+        except BaseException:
+            self.close()
+            raise
+        self._index += 1
+        if self._on_chunk:
+            self._on_chunk(chunk)
+        return chunk
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._broadcast.unsubscribe()
+
+
+# Shared so identical requests from every session are coalesced.
+DEFAULT_COALESCER = SingleFlight()
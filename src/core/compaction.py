@@ -0,0 +1,106 @@
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+
+class Projection:
+    """How to shrink one tool's output before the model sees it.
+
+    ``rows`` names the list of results in the output (None when the output
+    is a single record), ``keep`` the row fields worth sending, in order,
+    and ``drop`` any other fields to leave out. At most ``top_k`` rows are
+    sent, and ``digest_rows`` once the output is digested.
+    """
+
+    def __init__(self, rows: Optional[str] = None, keep: Optional[Sequence[str]] = None, drop: Sequence[str] = (),
+                 top_k: Optional[int] = None, digest_rows: int = 1):
+        self.rows = rows
+        self.keep = list(keep) if keep is not None else None
+        self.drop = set(drop)
+        self.top_k = top_k
+        self.digest_rows = digest_rows
+
+
+class ToolOutputCompactor:
+    """Turns raw tool outputs into compact tool messages.
+
+    Lists of records become one ``columns`` header plus ``rows`` of values,
+    floats are rounded and JSON is written without whitespace. ``digest``
+    goes further for outputs the model has already acted on: only the first
+    ``digest_rows`` rows are kept, with a count of what was left out.
+    Outputs that aren't JSON (e.g. error messages) pass through unchanged.
+    """
+
+    def __init__(self, projections: Optional[Dict[str, Projection]] = None, precision: int = 2):
+        self.projections = dict(projections or {})
+        self.precision = precision
+
+    def compact(self, tool_name: str, output: str) -> str:
+        return self._project(tool_name, output, digest=False)
+
+    def digest(self, tool_name: str, output: str) -> str:
+        return self._project(tool_name, output, digest=True)
+
+    def _project(self, tool_name: str, output: str, digest: bool) -> str:
+        try:
+            payload = json.loads(output)
+        except ValueError:
+            return output
+        if not isinstance(payload, dict):
+            return self._dumps(payload)
+
+        projection = self.projections.get(tool_name, Projection())
+        payload = {key: value for key, value in payload.items() if key not in projection.drop}
+        rows_key = projection.rows or ("rows" if "rows" in payload else None)
+        if rows_key and isinstance(payload.get(rows_key), list):
+            rows = payload.pop(rows_key)
+            limit = projection.digest_rows if digest else projection.top_k
+            if limit is not None and len(rows) > limit:
+                payload["omitted"] = len(rows) - limit
+                rows = rows[:limit]
+            payload.update(self._table(rows, payload.pop("columns", None), projection))
+        elif projection.keep is not None:
+            payload = {key: payload[key] for key in projection.keep if key in payload}
+
+        compacted = self._dumps(payload)
+        return f"[digest of earlier result] {compacted}" if "omitted" in payload and digest else compacted
+
+    @staticmethod
+    def _table(rows: List[Any], columns: Optional[List[str]], projection: Projection) -> Dict[str, Any]:
+        if rows and all(isinstance(row, dict) for row in rows):
+            columns = projection.keep or [key for key in rows[0] if key not in projection.drop]
+            rows = [[row.get(column) for column in columns] for row in rows]
+        return {"columns": columns or [], "rows": rows}
+
+    def _dumps(self, payload: Any) -> str:
+        return json.dumps(self._round(payload), separators=(",", ":"), ensure_ascii=False)
+
+    def _round(self, value: Any) -> Any:
+        if isinstance(value, float):
+            return round(value, self.precision)
+        if isinstance(value, dict):
+            return {key: self._round(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._round(item) for item in value]
+        return value
+
+
+# What the travel tools' outputs are trimmed to
+TRAVEL_PROJECTIONS = {
+    "search_flights": Projection(
+        rows="flights",
+        keep=["flight_number", "airline", "departure", "arrival", "duration", "stops", "price"],
+        top_k=10
+    ),
+    "search_hotels": Projection(
+        rows="hotels",
+        keep=["name", "location", "price_per_night", "total_price", "rating", "amenities"],
+        top_k=10
+    ),
+    "get_weather": Projection(
+        keep=["city", "date", "temperature", "condition", "precipitation_chance", "umbrella_needed",
+              "winter_clothing_recommended", "sunscreen_recommended"]
+    ),
+    "get_weather_forecast": Projection(rows="rows", digest_rows=3),
+}
+
+DEFAULT_COMPACTOR = ToolOutputCompactor(TRAVEL_PROJECTIONS)
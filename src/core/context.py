@@ -0,0 +1,158 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional
+from src.core.usage import Usage
+
+
+class RequestCancelled(Exception):
+    """The request was cancelled, e.g. because the user sent a new message"""
+
+
+class DeadlineExceeded(RequestCancelled):
+    """The request ran out of time"""
+
+
+class BudgetExceeded(RequestCancelled):
+    """The session's token or cost budget is spent"""
+
+
+class Overloaded(RequestCancelled):
+    """Shed by admission control: the rate limit queue was full or too slow"""
+
+
+# Priority lanes for shared rate limits - interactive requests go first
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+
+class RequestContext:
+    """Deadline and cancellation signal for one request through an agent.
+
+    Agents check it between iterations, derive per-call timeouts from it and
+    register cleanup (e.g. closing an open stream) to run on cancellation.
+    """
+
+    def __init__(self, timeout: Optional[float] = None, parent: Optional["RequestContext"] = None,
+                 priority: Optional[str] = None, seed: Optional[int] = None, run_id: Optional[str] = None):
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        if parent and parent.deadline is not None:
+            deadline = parent.deadline if deadline is None else min(deadline, parent.deadline)
+        self.deadline = deadline
+        self.reason: Optional[str] = None
+        # Token usage for the whole request, shared with child contexts
+        self.usage = parent.usage if parent else Usage()
+        self.priority = priority or (parent.priority if parent else INTERACTIVE)
+        # Makes simulated tool latency and failures reproducible for this request
+        self.seed = seed if seed is not None else (parent.seed if parent else None)
+        # Names the run for checkpointing, so a retry of the same run resumes where it stopped
+        self.run_id = run_id if run_id is not None else (parent.run_id if parent else None)
+        self._cancelled = threading.Event()
+        self._callbacks: List[Callable[[], Any]] = []
+        self._lock = threading.Lock()
+        if parent:
+            parent.on_cancel(lambda: self.cancel(parent.reason or "cancelled"))
+
+    def child(self, timeout: Optional[float] = None) -> "RequestContext":
+        """A context that is cancelled with this one and may have a tighter deadline"""
+        return RequestContext(timeout=timeout, parent=self)
+
+    def cancel(self, reason: str = "cancelled"):
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self.reason = reason
+            self._cancelled.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def on_cancel(self, callback: Callable[[], Any]) -> Callable[[], None]:
+        """Run callback on cancellation (immediately if already cancelled). Returns an unregister function."""
+        with self._lock:
+            if not self._cancelled.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._unregister(callback)
+        callback()
+        return lambda: None
+
+    @property
+    def cancelled(self) -> bool:
+        if not self._cancelled.is_set() and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("deadline exceeded")
+        return self._cancelled.is_set()
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self):
+        """Raise if the request has been cancelled or is out of time"""
+        if self.cancelled:
+            if self.reason == "deadline exceeded":
+                raise DeadlineExceeded(self.reason)
+            raise RequestCancelled(self.reason)
+
+    def timeout_for(self, default: Optional[float] = None) -> Optional[float]:
+        """Timeout for the next call: the remaining budget, capped by the call's own default"""
+        self.check()
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        return remaining if default is None else min(default, remaining)
+
+    def sleep(self, seconds: float):
+        """Sleep that wakes up early (and raises) on cancellation"""
+        remaining = self.remaining()
+        if remaining is not None and seconds >= remaining:
+            self._cancelled.wait(remaining)
+            self.cancelled  # Trips the deadline
+        else:
+            self._cancelled.wait(seconds)
+        self.check()
+
+    def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Make a blocking call in the caller's thread, failing the way the request did if it was cut short.
+
+        The call has to bound itself: LLM calls are given ``timeout_for()``
+        and tools the context, whose ``sleep`` wakes on cancellation, and
+        streams are closed through ``on_cancel``. A call that doesn't listen
+        (a non-streaming completion) finishes before the cancellation is seen,
+        at most at its timeout. Running calls here rather than in a shared pool
+        means no thread outlives the request, and there is no process-wide
+        limit on how many requests make calls at once.
+        """
+        self.check()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            # E.g. the client's own timeout firing at the deadline
+            self.check()
+            raise
+
+    def wait(self, future: Future) -> Any:
+        """Wait for a future's result, giving up as soon as the request is cancelled or out of time.
+
+        The future itself is left alone, since others may be waiting on it too.
+        """
+        self.check()
+        finished = threading.Event()
+        future.add_done_callback(lambda _: finished.set())
+        unregister = self.on_cancel(finished.set)
+        try:
+            finished.wait(self.remaining())
+            if not future.done():
+                self.cancelled  # Trips the deadline if that's why we woke up
+                self.check()
+            return future.result()
+        finally:
+            unregister()
+
+    def _unregister(self, callback: Callable[[], Any]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, List, Optional, Set
+from src.core.context import RequestContext, RequestCancelled
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies for one backend"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class Hedger:
+    """Fires a backup request when the first one is slower than usual.
+
+    The hedge delay is the tracked latency percentile for the call's key
+    (e.g. ``tool:get_weather`` or ``llm:gpt-4o-mini``). Whichever request
+    answers first wins and the other is cancelled - or, if it is already
+    running, its result is discarded (and closed if it is a stream). Hedges
+    are paid for out of a token bucket that refills by ``max_hedge_ratio``
+    per request, so at most that fraction of traffic is ever duplicated.
+
+    The wrapped call's own arguments, ``timeout`` included, are passed on to
+    it; a backup's ``timeout`` is shortened by the time already spent.
+    """
+
+    def __init__(self, percentile: float = 95.0, max_hedge_ratio: float = 0.1,
+                 min_samples: int = 20, min_delay: float = 0.05, burst: float = 5.0,
+                 max_wait: Optional[float] = None, max_workers: int = 32):
+        self.percentile = percentile
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_samples = min_samples  # Don't hedge until the percentile is meaningful
+        self.min_delay = min_delay
+        self.burst = burst
+        self.max_wait = max_wait  # Default limit on how long a call waits for an answer
+        self._trackers: Dict[str, LatencyTracker] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+        self._hedge_tokens = burst
+        self.stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "timeouts": 0}
+
+    def tracker(self, key: str) -> LatencyTracker:
+        with self._lock:
+            if key not in self._trackers:
+                self._trackers[key] = LatencyTracker()
+            return self._trackers[key]
+
+    def hedge_delay(self, key: str) -> Optional[float]:
+        tracker = self.tracker(key)
+        if len(tracker) < self.min_samples:
+            return None
+        return max(self.min_delay, tracker.percentile(self.percentile))
+
+    def call(self, key: str, fn: Callable[..., Any], *args, max_wait: Optional[float] = None,
+             cancel_with: Optional[RequestContext] = None, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)``, hedging it if it is slow.
+
+        Waits at most ``max_wait`` (the hedger's by default) or the call's own
+        ``timeout``, whichever is shorter, and raises TimeoutError after that.
+        Stops waiting and raises RequestCancelled once ``cancel_with`` is cancelled.
+        """
+        max_wait = max_wait if max_wait is not None else self.max_wait
+        limits = [limit for limit in (max_wait, kwargs.get("timeout")) if limit is not None]
+        timeout = min(limits) if limits else None
+        started = time.monotonic()
+        tracker = self.tracker(key)
+        delay = self.hedge_delay(key)
+
+        with self._lock:
+            self.stats["requests"] += 1
+            self._hedge_tokens = min(self.burst, self._hedge_tokens + self.max_hedge_ratio)
+
+        futures = [self._submit(tracker, fn, args, kwargs)]
+        try:
+            if delay is not None and (timeout is None or delay < timeout):
+                done = self._wait_first(futures, delay, cancel_with)
+                if not done and self._take_hedge_token():
+                    backup = dict(kwargs)
+                    if backup.get("timeout") is not None:
+                        # The backup has to answer by the same time as the primary
+                        backup["timeout"] = max(0.0, backup["timeout"] - (time.monotonic() - started))
+                    futures.append(self._submit(tracker, fn, args, backup))
+
+            remaining = None if timeout is None else max(0.0, timeout - (time.monotonic() - started))
+            done = self._wait_first(futures, remaining, cancel_with)
+        except RequestCancelled:
+            for future in futures:
+                self._discard(future)
+            raise
+
+        if not done:
+            for future in futures:
+                self._discard(future)
+            with self._lock:
+                self.stats["timeouts"] += 1
+            raise TimeoutError(f"{key} did not respond within {timeout:g}s")
+
+        # Prefer the primary when both finished at once
+        winner = futures[0] if futures[0] in done else next(iter(done))
+        for future in futures:
+            if future is not winner:
+                self._discard(future)
+        if winner is not futures[0]:
+            with self._lock:
+                self.stats["hedge_wins"] += 1
+        return winner.result()
+
+    @staticmethod
+    def _wait_first(futures: List[Future], timeout: Optional[float],
+                    context: Optional[RequestContext]) -> Set[Future]:
+        # The finished futures once one finishes or ``timeout`` passes; raises if ``context`` is cancelled first
+        if context is None:
+            return wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)[0]
+        woken = threading.Event()
+        for future in futures:
+            future.add_done_callback(lambda _: woken.set())
+        unregister = context.on_cancel(woken.set)
+        try:
+            remaining = context.remaining()
+            woken.wait(timeout if remaining is None else remaining if timeout is None else min(timeout, remaining))
+        finally:
+            unregister()
+        done = {future for future in futures if future.done()}
+        if not done:
+            context.check()
+        return done
+
+    def _submit(self, tracker: LatencyTracker, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Future:
+        def timed():
+            started = time.monotonic()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                tracker.record(time.monotonic() - started)
+        return self._executor.submit(timed)
+
+    def _take_hedge_token(self) -> bool:
+        with self._lock:
+            if self._hedge_tokens < 1:
+                return False
+            self._hedge_tokens -= 1
+            self.stats["hedged"] += 1
+            return True
+
+    @staticmethod
+    def _discard(future: Future):
+        # Cancel if it hasn't started; otherwise release whatever it returns
+        if future.cancel():
+            return
+
+        def release(done: Future):
+            if done.cancelled() or done.exception() is not None:
+                return
+            close = getattr(done.result(), "close", None)
+            if callable(close):
+                close()
+        future.add_done_callback(release)
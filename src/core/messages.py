@@ -0,0 +1,80 @@
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class Message:
+    """One chat message, kept small because every session holds a list of them.
+
+    Slotted, with interned role names; content strings are shared rather
+    than copied, so the same Message can sit in the app's history and an
+    agent's without duplication. The dict sent to the API is built on each
+    ``to_dict`` call and not kept, since it would be more than twice the
+    size of the message itself.
+    """
+
+    __slots__ = ("role", "content", "tool_calls", "tool_call_id")
+
+    def __init__(self, role: str, content: Optional[str], tool_calls: Optional[Tuple[Dict[str, Any], ...]] = None,
+                 tool_call_id: Optional[str] = None):
+        self.role = sys.intern(role)
+        self.content = content
+        self.tool_calls = tool_calls  # For assistant turns that call tools, in wire format
+        self.tool_call_id = tool_call_id  # For tool results
+
+    @classmethod
+    def tool(cls, content: str, tool_call_id: str) -> "Message":
+        return cls("tool", content, tool_call_id=tool_call_id)
+
+    @classmethod
+    def from_response(cls, message: Any) -> "Message":
+        """Convert an assistant message from a completion, dropping SDK fields the API doesn't need back"""
+        tool_calls = None
+        if getattr(message, "tool_calls", None):
+            tool_calls = tuple(
+                {"id": call.id, "type": "function",
+                 "function": {"name": call.function.name, "arguments": call.function.arguments}}
+                for call in message.tool_calls
+            )
+        return cls("assistant", message.content, tool_calls)
+
+    @classmethod
+    def coerce(cls, message: Any) -> "Message":
+        """A Message from a Message, a wire-format dict or an SDK message"""
+        if isinstance(message, Message):
+            return message
+        if isinstance(message, dict):
+            tool_calls = tuple(message["tool_calls"]) if message.get("tool_calls") else None
+            return cls(message["role"], message.get("content"), tool_calls, message.get("tool_call_id"))
+        return cls.from_response(message)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The API's dict form"""
+        wire: Dict[str, Any] = {"role": self.role, "content": self.content}
+        if self.tool_calls:
+            wire["tool_calls"] = list(self.tool_calls)
+        if self.tool_call_id is not None:
+            wire["tool_call_id"] = self.tool_call_id
+        return wire
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Message):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        content = self.content if self.content is None or len(self.content) <= 40 else self.content[:37] + "..."
+        return f"Message({self.role!r}, {content!r})"
+
+
+def to_wire(messages: Iterable[Any]) -> List[Dict[str, Any]]:
+    """The list sent to the API: Messages become dicts, anything else passes through"""
+    return [message.to_dict() if isinstance(message, Message) else message for message in messages]
+
+
+def example_messages(examples: List[Dict[str, str]]) -> List[Message]:
+    """Few-shot examples as alternating user and assistant messages"""
+    messages = []
+    for example in examples:
+        messages.append(Message("user", example["user"]))
+        messages.append(Message("assistant", example["assistant"]))
+    return messages
@@ -0,0 +1,196 @@
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from src.core.context import RequestContext, Overloaded, INTERACTIVE, BATCH
+
+
+LANES = (INTERACTIVE, BATCH)  # In priority order
+
+
+class TokenBucket:
+    """Refills at ``rate`` per second up to ``capacity``. Not thread-safe on its own."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self._updated = time.monotonic()
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` can be taken. Requests larger than the bucket wait for a full one."""
+        self._refill()
+        needed = min(amount, self.capacity)
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) / self.rate
+
+    def take(self, amount: float):
+        # The level may go negative (e.g. after under-estimating tokens); later callers wait it off
+        self._refill()
+        self.level -= amount
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class Limit:
+    """Requests-per-minute and tokens-per-minute ceiling for one model or tool.
+
+    Buckets hold ``burst_seconds`` worth of quota, so a burst can't spend
+    the whole minute at once.
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None, burst_seconds: float = 10.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.burst_seconds = burst_seconds
+        self.requests = TokenBucket(rpm / 60, max(1.0, rpm * burst_seconds / 60)) if rpm else None
+        self.tokens = TokenBucket(tpm / 60, tpm * burst_seconds / 60) if tpm else None
+
+    def wait_time(self, tokens: float) -> float:
+        waits = [0.0]
+        if self.requests:
+            waits.append(self.requests.wait_time(1))
+        if self.tokens and tokens:
+            waits.append(self.tokens.wait_time(tokens))
+        return max(waits)
+
+    def scaled(self, fraction: float) -> "Limit":
+        """A fresh limit allowing ``fraction`` of this one's quota"""
+        return Limit(self.rpm * fraction if self.rpm else None, self.tpm * fraction if self.tpm else None,
+                     self.burst_seconds)
+
+    def take(self, tokens: float):
+        if self.requests:
+            self.requests.take(1)
+        if self.tokens and tokens:
+            self.tokens.take(tokens)
+
+
+class RateLimiter:
+    """Process-wide admission control for model and tool calls.
+
+    Limits are keyed like the hedger's latency trackers (``llm:gpt-4o-mini``,
+    ``tool:get_weather``). Callers queue per key in priority order - the
+    interactive lane ahead of the batch lane - and only the head of the
+    queue spends quota. A caller that would wait longer than its lane's
+    ``max_wait`` (or its request's remaining time), or that finds the queue
+    full, is shed with ``Overloaded`` straight away instead of piling up.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Limit]] = None, max_wait: Optional[Dict[str, float]] = None,
+                 max_queue: int = 64):
+        self.limits = dict(limits or {})
+        self.max_wait = {INTERACTIVE: 10.0, BATCH: 60.0, **(max_wait or {})}
+        self.max_queue = max_queue
+        self._queues: Dict[str, List[Any]] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def limit_for(self, key: str) -> Optional[Limit]:
+        """The limit for ``key``: tools match exactly, models also by their dated snapshots"""
+        if key in self.limits or not key.startswith("llm:"):
+            return self.limits.get(key)
+        # llm:gpt-4o-2024-08-06 shares llm:gpt-4o's limit; the longest model name the key extends at a "-" wins
+        base = max((name for name in self.limits if name.startswith("llm:") and key.startswith(name + "-")),
+                   key=len, default=None)
+        return self.limits.get(base)
+
+    def acquire(self, key: str, tokens: float = 0, context: Optional[RequestContext] = None) -> float:
+        """Wait for one request (and ``tokens``) of quota for ``key``. Returns the seconds spent waiting.
+
+        Raises Overloaded if the call is shed, or RequestCancelled if ``context`` is cancelled while queued.
+        """
+        limit = self.limit_for(key)
+        if limit is None:
+            return 0.0
+        lane = context.priority if context else INTERACTIVE
+        started = time.monotonic()
+        deadline = started + self.max_wait.get(lane, self.max_wait[INTERACTIVE])
+        if context is not None and context.remaining() is not None:
+            deadline = min(deadline, started + context.remaining())
+
+        with self._cond:
+            queue = self._queues.setdefault(key, [])
+            stats = self._stats.setdefault(key, {"admitted": 0, "shed": 0, "waited": 0.0})
+            if len(queue) >= self.max_queue:
+                stats["shed"] += 1
+                raise Overloaded(f"too busy - {key} queue is full")
+
+            ticket = (LANES.index(lane) if lane in LANES else len(LANES), next(self._seq))
+            heapq.heappush(queue, ticket)
+            unregister = context.on_cancel(self._wake) if context else None
+            try:
+                while True:
+                    if context is not None:
+                        context.check()
+                    now = time.monotonic()
+                    wait = limit.wait_time(tokens) if queue[0] == ticket else None
+                    if wait == 0:
+                        limit.take(tokens)
+                        stats["admitted"] += 1
+                        stats["waited"] += now - started
+                        return now - started
+                    remaining = deadline - now
+                    if remaining <= 0 or (wait is not None and wait > remaining):
+                        stats["shed"] += 1
+                        raise Overloaded(f"too busy - {key} is at its rate limit")
+                    self._cond.wait(remaining if wait is None else wait)
+            finally:
+                queue.remove(ticket)
+                heapq.heapify(queue)
+                self._cond.notify_all()
+                if unregister:
+                    unregister()
+
+    def share(self, parts: int):
+        """Keep 1/``parts`` of every limit, for one of ``parts`` processes drawing on the same quota"""
+        with self._cond:
+            self.limits = {key: limit.scaled(1 / parts) for key, limit in self.limits.items()}
+            self._cond.notify_all()
+
+    def adjust(self, key: str, tokens: float):
+        """Charge (or refund, if negative) tokens once a call's actual usage is known"""
+        limit = self.limit_for(key)
+        if limit is None or limit.tokens is None or not tokens:
+            return
+        with self._cond:
+            limit.tokens.take(tokens)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._cond:
+            return {
+                key: {**counts, "queued": len(self._queues.get(key, [])), "waited": round(counts["waited"], 2)}
+                for key, counts in self._stats.items()
+            }
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+
+def estimate_tokens(messages: List[Any], max_tokens: Optional[int] = None) -> int:
+    """Rough token count for a completion before it is made (~4 characters per token)"""
+    prompt = 0
+    for message in messages:
+        content = message.get("content") if isinstance(message, dict) else getattr(message, "content", None)
+        prompt += 4 + len(str(content or "")) // 4
+    return prompt + (max_tokens or 512)
+
+
+# Conservative defaults for a low usage tier; shared by every agent in the process.
+DEFAULT_LIMITER = RateLimiter({
+    "llm:gpt-4o-mini": Limit(rpm=500, tpm=200_000),
+    "llm:gpt-4o": Limit(rpm=500, tpm=30_000),
+    "llm:gpt-3.5-turbo": Limit(rpm=500, tpm=200_000),
+    "tool:search_flights": Limit(rpm=300),
+    "tool:search_hotels": Limit(rpm=300),
+    "tool:get_weather": Limit(rpm=600),
+    "tool:get_weather_forecast": Limit(rpm=120),  # Each call is up to 10 cities x 16 days of lookups
+})
@@ -0,0 +1,305 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+from src.core.coalescing import request_key
+from src.core.context import RequestContext
+from src.core.messages import Message, to_wire
+from src.core.tools import ToolResult
+
+
+RECORD = "record"
+REPLAY = "replay"
+
+
+class ReplayMiss(LookupError):
+    """A replayed run made a call the cassette has no recording of"""
+
+
+class Cassette:
+    """Completions and tool results of agent runs, recorded to a JSON lines file and served back.
+
+    In ``record`` mode every completion (with its streamed chunks and their
+    timings), every tool result and its latency, and every finished run is
+    appended to ``path`` as it happens, so a cassette from a crashed process
+    is still usable. In ``replay`` mode nothing reaches the API or the tool
+    backends: each call is answered with the next recording of an identical
+    call, after the recorded delay divided by ``speed`` (None for no delay).
+    """
+
+    def __init__(self, path: str, mode: str = RECORD, speed: Optional[float] = 1.0):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode '{mode}'")
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self.runs: List[Dict[str, Any]] = []
+        self._recordings: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._lock = threading.Lock()
+        if mode == REPLAY:
+            self._load()
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == RECORD
+
+    def completion(self, call: Callable[..., Any], **params) -> Any:
+        """Make ``call(**params)``, a chat completion, through the cassette"""
+        key = self._completion_key(params)
+        if not self.recording:
+            entry = self._next(key, f"completion for {params.get('model')}")
+            if entry["type"] == "stream":
+                return _ReplayStream(entry["chunks"], self.speed)
+            self._wait(entry["elapsed"])
+            return _completion_from_dict(entry["response"])
+
+        started = time.monotonic()
+        response = call(**params)
+        request = {name: value for name, value in params.items() if name != "timeout"}
+        if params.get("stream"):
+            return _RecordingStream(response, started, lambda chunks: self._append(
+                {"type": "stream", "key": key, "request": request, "chunks": chunks}))
+        self._append({"type": "completion", "key": key, "request": request, "response": response.model_dump(),
+                      "elapsed": time.monotonic() - started})
+        return response
+
+    def tool(self, tool_name: str, call: Callable[..., ToolResult], context: Optional[RequestContext] = None,
+             **tool_args) -> ToolResult:
+        """Make one attempt at a tool call, ``call(**tool_args)``, through the cassette"""
+        key = request_key(f"tool:{tool_name}", tool_args)
+        if not self.recording:
+            entry = self._next(key, f"{tool_name} call with {tool_args}")
+            self._wait(entry["latency"], context)
+            return ToolResult(**entry["result"])
+
+        started = time.monotonic()
+        result = call(**tool_args) if context is None else call(context=context, **tool_args)
+        self._append({"type": "tool", "key": key, "tool": tool_name, "args": tool_args,
+                      "result": {"output": result.output, "ok": result.ok, "error": result.error,
+                                 "retryable": result.retryable},
+                      "latency": time.monotonic() - started})
+        return result
+
+    def record_run(self, agent: str, agent_kwargs: Dict[str, Any], user_input: str, output: str, elapsed: float,
+                   history: Optional[List[Message]] = None, entry: str = "process", seed: Optional[int] = None):
+        """Note a finished agent run so it can be replayed.
+
+        ``agent_kwargs`` are what the agent was built with and ``entry`` the
+        method that ran it (``process`` or ``process_stream``): both change the
+        requests the agent makes, so a replay has to match them to find its
+        recordings. The request's ``seed`` makes its retry backoff replay the same.
+        """
+        run = {"type": "run", "agent": agent, "kwargs": agent_kwargs, "entry": entry, "seed": seed,
+               "input": user_input, "output": output, "elapsed": elapsed, "history": to_wire(history or [])}
+        self.runs.append(run)
+        self._append(run)
+
+    def _append(self, entry: Dict[str, Any]):
+        line = json.dumps(entry, default=str, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+
+    def _load(self):
+        with open(self.path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry["type"] == "run":
+                    self.runs.append(entry)
+                else:
+                    self._recordings[entry["key"]].append(entry)
+
+    def _next(self, key: str, description: str) -> Dict[str, Any]:
+        # Identical calls are answered in the order they were recorded
+        with self._lock:
+            recordings = self._recordings.get(key)
+            if not recordings:
+                raise ReplayMiss(f"{self.path} has no recording of this {description}")
+            return recordings.popleft()
+
+    def _wait(self, seconds: float, context: Optional[RequestContext] = None):
+        if not self.speed or seconds <= 0:
+            return
+        if context is not None:
+            context.sleep(seconds / self.speed)
+        else:
+            time.sleep(seconds / self.speed)
+
+    @staticmethod
+    def _completion_key(params: Dict[str, Any]) -> str:
+        # The timeout depends on how long the request had left, not on what was asked
+        return request_key("llm", {name: value for name, value in params.items() if name != "timeout"})
+
+
+class _RecordingStream:
+    """Passes a completion stream through, noting each chunk and when it arrived"""
+
+    def __init__(self, upstream: Any, started: float, on_finish: Callable[[List[Dict[str, Any]]], None]):
+        self._upstream = upstream
+        self._started = started
+        self._on_finish = on_finish
+        self._chunks: List[Dict[str, Any]] = []
+        self._finished = False
+
+    def __iter__(self) -> Iterator[Any]:
+        try:
+            for chunk in self._upstream:
+                self._chunks.append({"at": time.monotonic() - self._started, "chunk": chunk.model_dump()})
+                yield chunk
+        finally:
+            self._finish()
+
+    def close(self):
+        self._upstream.close()
+        self._finish()
+
+    def _finish(self):
+        # A stream closed early is still recorded, so a cancelled run replays the same way
+        if not self._finished:
+            self._finished = True
+            self._on_finish(self._chunks)
+
+
+class _ReplayStream:
+    """Serves recorded chunks at their recorded times, scaled by ``speed``"""
+
+    def __init__(self, chunks: List[Dict[str, Any]], speed: Optional[float]):
+        self._chunks = chunks
+        self._speed = speed
+        self._closed = threading.Event()
+        self._started = time.monotonic()  # Chunk times count from the request, like the recording's
+
+    def __iter__(self) -> Iterator[Any]:
+        started = self._started
+        for recorded in self._chunks:
+            if self._speed:
+                wait = started + recorded["at"] / self._speed - time.monotonic()
+                # Closing the stream interrupts the wait, like closing a real connection
+                if wait > 0 and self._closed.wait(wait):
+                    return
+            if self._closed.is_set():
+                return
+            yield _chunk_from_dict(recorded["chunk"])
+
+    def close(self):
+        self._closed.set()
+
+
+def _completion_from_dict(data: Dict[str, Any]) -> Any:
+    from openai.types.chat import ChatCompletion
+    return ChatCompletion.model_validate(data)
+
+
+def _chunk_from_dict(data: Dict[str, Any]) -> Any:
+    from openai.types.chat import ChatCompletionChunk
+    return ChatCompletionChunk.model_validate(data)
+
+
+_cassette: Optional[Cassette] = None
+_cassette_configured = False
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """The active cassette, if any. Set AGENT_CASSETTE to record every run in the process to that file."""
+    global _cassette, _cassette_configured
+    if _cassette_configured:
+        return _cassette
+    with _cassette_lock:
+        if not _cassette_configured:
+            path = os.getenv("AGENT_CASSETTE")
+            if path and _cassette is None:
+                _cassette = Cassette(path)
+            _cassette_configured = True
+        return _cassette
+
+
+def set_cassette(cassette: Optional[Cassette]):
+    """Record to or replay from ``cassette`` (None to go back to live calls)"""
+    global _cassette, _cassette_configured
+    with _cassette_lock:
+        _cassette = cassette
+        _cassette_configured = True
+
+
+ENTRY_POINTS = ("process", "process_stream")
+
+
+def run_agent(agent_key: str, user_input: str, history: Optional[List[Message]] = None,
+              context: Optional[RequestContext] = None, entry: str = "process", **agent_kwargs) -> Dict[str, Any]:
+    """Run a fresh agent, built with ``agent_kwargs``, once through the active cassette and note the run on it"""
+    from src.core.startup import load_agent_class
+
+    if entry not in ENTRY_POINTS:
+        raise ValueError(f"Unknown entry point '{entry}' (expected one of: {', '.join(ENTRY_POINTS)})")
+    agent = load_agent_class(agent_key)(**agent_kwargs)
+    if hasattr(agent, "conversation_history"):
+        agent.conversation_history = list(history or [])
+    started = time.perf_counter()
+    if entry == "process_stream":
+        output = "".join(agent.process_stream(user_input, context))
+    else:
+        output = agent.process(user_input, context)
+    elapsed = time.perf_counter() - started
+    cassette = get_cassette()
+    if cassette is not None and cassette.recording:
+        cassette.record_run(agent_key, agent_kwargs, user_input, output, elapsed, history, entry,
+                            context.seed if context is not None else None)
+    return {"output": output, "elapsed": elapsed}
+
+
+if __name__ == "__main__":
+    # python -m src.core.recording record <cassette> <agent> <prompt> [--model M] [--stream] [--seed N]
+    # python -m src.core.recording replay <cassette> [--speed X]   (--speed 0 replays without delays)
+    import argparse
+
+    # Run as a script this file is __main__; the agents look for the cassette on the imported module
+    from src.core.recording import Cassette, REPLAY, run_agent, set_cassette
+
+    parser = argparse.ArgumentParser(description="Record agent runs to a cassette, or replay them offline")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record")
+    record.add_argument("cassette")
+    record.add_argument("agent")
+    record.add_argument("prompt")
+    record.add_argument("--model", default="gpt-4o-mini")
+    record.add_argument("--temperature", type=float, default=0.7)
+    record.add_argument("--planning-model")
+    record.add_argument("--stream", action="store_true", help="run through process_stream, as the app does")
+    record.add_argument("--seed", type=int)
+    replay = commands.add_parser("replay")
+    replay.add_argument("cassette")
+    replay.add_argument("--speed", type=float, default=1.0)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        set_cassette(Cassette(args.cassette))
+        context = RequestContext(seed=args.seed) if args.seed is not None else None
+        agent_kwargs = {"model": args.model, "temperature": args.temperature}
+        if args.planning_model:
+            agent_kwargs["planning_model"] = args.planning_model
+        run = run_agent(args.agent, args.prompt, context=context,
+                        entry="process_stream" if args.stream else "process", **agent_kwargs)
+        print(run["output"])
+        print(f"\nRecorded in {run['elapsed']:.2f}s to {args.cassette}")
+    else:
+        cassette = Cassette(args.cassette, REPLAY, args.speed or None)
+        set_cassette(cassette)
+        recorded, mismatches = list(cassette.runs), 0
+        replay_total = 0.0
+        for number, entry in enumerate(recorded, 1):
+            history = [Message.coerce(message) for message in entry["history"]]
+            context = RequestContext(seed=entry["seed"]) if entry["seed"] is not None else None
+            run = run_agent(entry["agent"], entry["input"], history, context, entry["entry"], **entry["kwargs"])
+            replay_total += run["elapsed"]
+            same = run["output"] == entry["output"]
+            mismatches += not same
+            print(f"{number:3d} {entry['agent']:12s} recorded {entry['elapsed']:7.2f}s  "
+                  f"replayed {run['elapsed']:7.2f}s  {'same answer' if same else 'DIFFERENT ANSWER'}")
+        recorded_total = sum(entry["elapsed"] for entry in recorded)
+        print(f"\n{len(recorded)} runs: recorded {recorded_total:.2f}s, replayed {replay_total:.2f}s, "
+              f"{mismatches} different")
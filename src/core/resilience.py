@@ -0,0 +1,216 @@
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+from src.core.context import RequestContext
+from src.core.tools import Tool, ToolResult
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.2, max_delay: float = 2.0,
+                 multiplier: float = 2.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+
+    def delay(self, attempt: int, rng: Optional[random.Random] = None) -> float:
+        # attempt is the number of attempts made so far (1 after the first failure)
+        ceiling = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        return (rng or random).uniform(0, ceiling)
+
+
+class RetryBudget:
+    """Caps retries to a fraction of recent requests so retries can't amplify an outage"""
+
+    def __init__(self, ratio: float = 0.2, min_tokens: float = 3.0, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = min_tokens
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class CircuitBreaker:
+    """Fails fast when most recent calls failed, then lets a single probe through after a cool-down"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_rate: float = 0.8, window: int = 20, min_calls: int = 10,
+                 reset_timeout: float = 10.0):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._outcomes = deque(maxlen=window)  # True for failures
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def release(self):
+        """Give back an allowed call that ended without an outcome (e.g. it was cancelled)"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._outcomes.clear()
+            self.state = self.CLOSED
+            self._outcomes.append(False)
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._outcomes.append(True)
+            self._probe_in_flight = False
+            failures = sum(self._outcomes)
+            if self.state == self.HALF_OPEN or (
+                len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate
+            ):
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class ResilientExecutor:
+    """Runs tools with backoff retries, a per-tool retry budget and a per-tool circuit breaker.
+
+    Breakers and budgets are keyed by tool name, so share one executor across
+    agents to protect a backend from every session at once.
+    """
+
+    def __init__(self, policy: Optional[RetryPolicy] = None, budget_ratio: float = 0.2,
+                 failure_rate: float = 0.8, reset_timeout: float = 10.0):
+        self.policy = policy or RetryPolicy()
+        self.budget_ratio = budget_ratio
+        self.failure_rate = failure_rate
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._budgets: Dict[str, RetryBudget] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def execute(self, tool: Tool, tool_args: Dict[str, Any],
+                call: Optional[Callable[[Tool, Dict[str, Any]], ToolResult]] = None,
+                on_retry: Optional[Callable[[ToolResult, int, float], None]] = None,
+                context: Optional[RequestContext] = None) -> ToolResult:
+        """Run one tool call. ``call`` performs a single attempt (defaults to ``tool.invoke``);
+        ``on_retry(failed_result, next_attempt, delay)`` is called before each retry.
+        Raises RequestCancelled if ``context`` is cancelled or runs out of time."""
+        call = call or (lambda tool, tool_args: tool.invoke(**tool_args))
+        breaker, budget = self._state_for(tool.name)
+        budget.record_request()
+        self._count(tool.name, "calls")
+        started = time.monotonic()
+        attempt = 0
+        # Seeded requests get reproducible backoff too
+        rng = random.Random(f"{context.seed}:{tool.name}") if context is not None and context.seed is not None else None
+
+        while True:
+            # Checked before taking a half-open breaker's only probe slot
+            if context is not None:
+                context.check()
+            if not breaker.allow():
+                self._count(tool.name, "short_circuited")
+                result = ToolResult.failure(
+                    f"❌ {tool.name} is currently unavailable (too many recent failures). "
+                    f"Continue without it or try again later.",
+                    "circuit_open",
+                    retryable=False
+                )
+                break
+
+            attempt += 1
+            try:
+                result = call(tool, tool_args)
+            except BaseException:
+                # A cancelled attempt says nothing about the backend; without this a lost probe would keep
+                # the breaker half open, rejecting the tool for everyone
+                breaker.release()
+                raise
+
+            if result.ok:
+                breaker.record_success()
+                self._count(tool.name, "successes")
+                break
+
+            self._count(tool.name, "failures")
+            if result.retryable:
+                breaker.record_failure()
+            else:
+                # The backend answered (e.g. bad arguments), so it is not down
+                breaker.record_success()
+
+            if not result.retryable or attempt >= self.policy.max_attempts:
+                break
+            if not budget.try_spend():
+                self._count(tool.name, "budget_exhausted")
+                break
+
+            delay = self.policy.delay(attempt, rng)
+            if context is not None and context.remaining() is not None and delay >= context.remaining():
+                break  # No time left for another attempt
+            self._count(tool.name, "retries")
+            if on_retry:
+                on_retry(result, attempt + 1, delay)
+            if context is not None:
+                context.sleep(delay)
+            else:
+                time.sleep(delay)
+
+        result.attempts = attempt
+        result.latency = time.monotonic() - started
+        return result
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                name: {**counts, "circuit": self._breakers[name].state}
+                for name, counts in self._stats.items()
+            }
+
+    def _state_for(self, tool_name: str):
+        with self._lock:
+            if tool_name not in self._breakers:
+                self._breakers[tool_name] = CircuitBreaker(self.failure_rate, reset_timeout=self.reset_timeout)
+                self._budgets[tool_name] = RetryBudget(self.budget_ratio)
+                self._stats[tool_name] = {
+                    "calls": 0, "successes": 0, "failures": 0, "retries": 0,
+                    "budget_exhausted": 0, "short_circuited": 0
+                }
+            return self._breakers[tool_name], self._budgets[tool_name]
+
+    def _count(self, tool_name: str, key: str):
+        with self._lock:
+            self._stats[tool_name][key] += 1
+
+
+# Shared by default so every session sees the same breaker state per backend.
+# The demo tools fail half the time, so allow about one retry per call.
+DEFAULT_EXECUTOR = ResilientExecutor(budget_ratio=1.0)
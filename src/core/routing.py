@@ -0,0 +1,27 @@
+from typing import Optional
+
+
+class ModelRouter:
+    """Chooses which model handles each stage of a tool-using agent.
+
+    Tool-selection ("planning") iterations go to a fast, cheap model, while the
+    final answer ("synthesis") and low-confidence turns go to the stronger model.
+    """
+
+    def __init__(self, synthesis_model: str, planning_model: Optional[str] = None,
+                 escalate_on_low_confidence: bool = True):
+        self.synthesis_model = synthesis_model
+        self.planning_model = planning_model or synthesis_model
+        self.escalate_on_low_confidence = escalate_on_low_confidence
+    
+    @property
+    def is_cascade(self) -> bool:
+        return self.planning_model != self.synthesis_model
+    
+    def model_for_planning(self, low_confidence: bool = False) -> str:
+        if low_confidence and self.escalate_on_low_confidence:
+            return self.synthesis_model
+        return self.planning_model
+    
+    def model_for_synthesis(self) -> str:
+        return self.synthesis_model
@@ -0,0 +1,181 @@
+import inspect
+import re
+import types
+from datetime import date as Date
+from typing import Annotated, Any, Callable, Dict, List, Literal, Optional, Tuple, Union, get_args, get_origin, \
+    get_type_hints
+
+
+class SchemaHint:
+    """Extra JSON schema keywords for an argument, e.g. ``Annotated[int, SchemaHint(minimum=1)]``"""
+
+    def __init__(self, **schema: Any):
+        self.schema = schema
+
+
+# Annotations for string arguments with a fixed format
+ISODate = Annotated[str, SchemaHint(format="date")]
+ClockTime = Annotated[str, SchemaHint(pattern=r"^([01]\d|2[0-3]):[0-5]\d$")]
+
+_JSON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean", dict: "object", list: "array"}
+_ARGS_SECTION = re.compile(r"^\s*(Args|Arguments|Parameters):\s*$")
+_ARG_LINE = re.compile(r"^\s*(\w+)(?:\s*\([^)]*\))?:\s*(.*)$")
+
+
+def schema_from_function(function: Callable) -> Tuple[str, Dict[str, Any]]:
+    """A tool description and JSON schema built from a function's signature and docstring.
+
+    The description is the docstring's first paragraph; argument descriptions
+    come from its ``Args:`` section. Parameters without a default are required.
+    """
+    hints = get_type_hints(function, include_extras=True)
+    description, arg_docs = _parse_docstring(inspect.getdoc(function) or "")
+    properties = {}
+    required = []
+    for name, parameter in inspect.signature(function).parameters.items():
+        if parameter.kind in (parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD) or name == "context":
+            continue
+        prop = _schema_for(hints.get(name, str))
+        if name in arg_docs:
+            prop["description"] = arg_docs[name]
+        properties[name] = prop
+        if parameter.default is parameter.empty:
+            required.append(name)
+    return description, {"type": "object", "properties": properties, "required": required}
+
+
+def _schema_for(annotation: Any) -> Dict[str, Any]:
+    origin, args = get_origin(annotation), get_args(annotation)
+    if origin is Annotated:
+        schema = _schema_for(args[0])
+        for extra in args[1:]:
+            if isinstance(extra, SchemaHint):
+                schema.update(extra.schema)
+        return schema
+    if origin in (Union, types.UnionType):
+        # Optional[X] - None just means "not given"
+        options = [arg for arg in args if arg is not type(None)]
+        return _schema_for(options[0]) if len(options) == 1 else {}
+    if origin is Literal:
+        return {"type": _JSON_TYPES.get(type(args[0]), "string"), "enum": list(args)}
+    if origin in (list, List):
+        return {"type": "array", "items": _schema_for(args[0])} if args else {"type": "array"}
+    if origin in (dict, Dict):
+        return {"type": "object"}
+    return {"type": _JSON_TYPES[annotation]} if annotation in _JSON_TYPES else {}
+
+
+def _parse_docstring(doc: str) -> Tuple[str, Dict[str, str]]:
+    lines = doc.splitlines()
+    summary = []
+    for line in lines:
+        if not line.strip() or _ARGS_SECTION.match(line):
+            break
+        summary.append(line.strip())
+
+    arg_docs: Dict[str, str] = {}
+    in_args = False
+    current = None
+    for line in lines:
+        if _ARGS_SECTION.match(line):
+            in_args = True
+            continue
+        if not in_args:
+            continue
+        if not line.strip():
+            break
+        match = _ARG_LINE.match(line)
+        if match and len(line) - len(line.lstrip()) <= 4:
+            current = match.group(1)
+            arg_docs[current] = match.group(2).strip()
+        elif current:
+            arg_docs[current] += " " + line.strip()  # Continuation line
+    return " ".join(summary), arg_docs
+
+
+_TYPE_CHECKS = {
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "array": lambda value: isinstance(value, list),
+    "object": lambda value: isinstance(value, dict),
+}
+_TYPE_NAMES = {"string": "a string", "integer": "a whole number", "number": "a number", "boolean": "true or false",
+               "array": "a list", "object": "an object"}
+_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+Validator = Callable[[Dict[str, Any]], Optional[str]]
+
+
+def compile_validator(parameters: Dict[str, Any]) -> Validator:
+    """Compile a JSON schema for tool arguments into a fast check.
+
+    The returned function takes the arguments and returns None if they are
+    valid, or a short error message the model can act on. Checks are built
+    once per tool, so validating a call is a few dict lookups.
+    """
+    properties = parameters.get("properties", {})
+    required = list(parameters.get("required", []))
+    checks = {name: _compile_property(name, schema) for name, schema in properties.items()}
+
+    def validate(args: Dict[str, Any]) -> Optional[str]:
+        if not isinstance(args, dict):
+            return "arguments must be a JSON object"
+        errors = [f"missing required argument '{name}'" for name in required if args.get(name) is None]
+        for name, value in args.items():
+            check = checks.get(name)
+            if check is None:
+                errors.append(f"unexpected argument '{name}' (expected: {', '.join(properties)})")
+            elif value is not None:
+                error = check(value)
+                if error:
+                    errors.append(error)
+        return "; ".join(errors) or None
+
+    return validate
+
+
+def _compile_property(name: str, schema: Dict[str, Any]) -> Callable[[Any], Optional[str]]:
+    type_check = _TYPE_CHECKS.get(schema.get("type"))
+    enum = set(schema["enum"]) if "enum" in schema else None
+    pattern = re.compile(schema["pattern"]) if "pattern" in schema else None
+    is_date = schema.get("format") == "date"
+    minimum, maximum = schema.get("minimum"), schema.get("maximum")
+    max_items = schema.get("maxItems")
+    item_check = _compile_property(name, schema["items"]) if "items" in schema else None
+
+    def check(value: Any) -> Optional[str]:
+        if type_check is not None and not type_check(value):
+            return f"'{name}' must be {_TYPE_NAMES[schema['type']]}, got {value!r}"
+        if enum is not None and value not in enum:
+            return f"'{name}' must be one of {', '.join(map(str, schema['enum']))}, got {value!r}"
+        if is_date and not _is_date(value):
+            return f"'{name}' must be a date in YYYY-MM-DD format, got {value!r}"
+        if pattern is not None and not pattern.search(value):
+            return f"'{name}' has the wrong format, got {value!r}" + (
+                f" ({schema['description']})" if "description" in schema else "")
+        if minimum is not None and value < minimum:
+            return f"'{name}' must be at least {minimum}, got {value!r}"
+        if maximum is not None and value > maximum:
+            return f"'{name}' must be at most {maximum}, got {value!r}"
+        if max_items is not None and len(value) > max_items:
+            return f"'{name}' takes at most {max_items} items, got {len(value)}"
+        if item_check is not None:
+            for item in value:
+                error = item_check(item)
+                if error:
+                    return error
+        return None
+
+    return check
+
+
+def _is_date(value: str) -> bool:
+    if not _DATE.match(value):
+        return False
+    try:
+        Date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
@@ -0,0 +1,83 @@
+import importlib
+import time
+from typing import Dict, Type
+
+
+# Agent classes by app key, imported only when an agent is first used
+AGENT_CLASSES = {
+    "simple": "src.agents.simple_agent:SimpleAgent",
+    "few_shot": "src.agents.few_shot_agent:FewShotAgent",
+    "memory": "src.agents.memory_agent:MemoryAgent",
+    "tool": "src.agents.tool_agent:ToolAgent",
+    "reasoning": "src.agents.reasoning_agent:ReasoningAgent",
+    "multi_agent": "src.agents.multi_agent:MultiAgentOrchestrator",
+}
+
+
+def load_agent_class(key: str) -> Type:
+    module, name = AGENT_CLASSES[key].split(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def warm_up() -> Dict[str, float]:
+    """Load the OpenAI SDK and build the tool backends before the first request needs them.
+
+    Returns the seconds each step took. Everything it builds is cached for
+    the life of the process, so running it twice is cheap.
+    """
+    from src.backends.flights import get_flight_inventory
+    from src.backends.hotels import get_hotel_catalog
+    from src.backends.weather import get_weather_store
+    from src.core.clients import get_openai_client
+
+    steps = {
+        "openai_client": get_openai_client,
+        "flight_inventory": get_flight_inventory,
+        "hotel_catalog": get_hotel_catalog,
+        "weather_store": get_weather_store,
+    }
+    timings = {}
+    for name, step in steps.items():
+        started = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - started
+    return timings
+
+
+# Each benchmark step runs in a fresh interpreter, so it sees a true cold start
+_BENCHMARK_STEPS = {
+    "import app modules": "import src.core.context, src.core.usage, src.core.startup",
+    "import reasoning agent": "import src.agents.reasoning_agent",
+    "import all agents": "from src.core.startup import AGENT_CLASSES, load_agent_class\n"
+                         "for key in AGENT_CLASSES: load_agent_class(key)",
+    "construct reasoning agent": "from src.core.startup import load_agent_class\n"
+                                 "load_agent_class('reasoning')(model='gpt-4o-mini')",
+    "first tool call (cold backends)": "from src.core.tools import TRAVEL_REGISTRY\n"
+                                       "from src.backends.simulation import BackendSimulator, set_simulator\n"
+                                       "set_simulator(BackendSimulator())\n"
+                                       "TRAVEL_REGISTRY.get('search_flights').invoke("
+                                       "origin='New York', destination='Tokyo', date='2026-11-02')",
+    "first LLM client": "from src.core.clients import get_openai_client\nget_openai_client('sk-benchmark')",
+    "warm up": "from src.core.startup import warm_up\nwarm_up()",
+}
+
+
+if __name__ == "__main__":
+    # Cold start benchmark: python -m src.core.startup [runs]
+    import os
+    import statistics
+    import subprocess
+    import sys
+
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    root = os.path.join(os.path.dirname(__file__), "..", "..")
+    timer = ("import time\nstarted = time.perf_counter()\n{code}\n"
+             "print(time.perf_counter() - started)")
+    env = {**os.environ, "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "sk-benchmark")}  # No requests are made
+    for label, code in _BENCHMARK_STEPS.items():
+        samples = []
+        for _ in range(runs):
+            output = subprocess.run([sys.executable, "-c", timer.format(code=code)], cwd=root, env=env, check=True,
+                                    capture_output=True, text=True).stdout
+            samples.append(float(output.strip().splitlines()[-1]))
+        print(f"{label:34s} {statistics.median(samples) * 1000:8.1f} ms (median of {runs})")
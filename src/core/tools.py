@@ -1,16 +1,47 @@
-from typing import Dict, List, Callable, Any
+from typing import Annotated, Dict, List, Callable, Any, Iterator, Literal, Optional, Sequence
 import json
-from datetime import datetime
-import requests
-import random
+import re
+from src.backends.amenities import AMENITIES
+from src.backends.simulation import get_simulator
+from src.core.context import RequestContext
+from src.core.schema import ClockTime, ISODate, SchemaHint, compile_validator, schema_from_function
+
+
+class ToolResult:
+    """Outcome of a single tool invocation"""
+    
+    def __init__(self, output: str, ok: bool = True, error: Optional[str] = None,
+                 retryable: bool = False, attempts: int = 1, latency: float = 0.0, reused: bool = False):
+        self.output = output  # What the model sees
+        self.ok = ok
+        self.error = error  # Failure category, e.g. "unavailable", "timeout", "circuit_open"
+        self.retryable = retryable
+        self.attempts = attempts
+        self.latency = latency
+        self.reused = reused  # Answered from an earlier identical call in the same request
+    
+    def __str__(self) -> str:
+        return self.output
+    
+    def __repr__(self) -> str:
+        return f"ToolResult(ok={self.ok}, error={self.error!r}, attempts={self.attempts}, reused={self.reused})"
+    
+    @classmethod
+    def failure(cls, output: str, error: str, retryable: bool = True) -> "ToolResult":
+        return cls(output, ok=False, error=error, retryable=retryable)
 
 
 class Tool:
-    def __init__(self, name: str, description: str, function: Callable, parameters: Dict[str, Any]):
+    def __init__(self, name: str, description: str, function: Callable, parameters: Dict[str, Any],
+                 keywords: Sequence[str] = ()):
         self.name = name
         self.description = description
         self.function = function
         self.parameters = parameters
+        self.keywords = list(keywords)  # Words in a request that make this tool relevant
+        words = "|".join(re.escape(keyword) for keyword in self.keywords)
+        self._keyword_pattern = re.compile(rf"\b(?:{words})", re.IGNORECASE) if words else None
+        self.validate = compile_validator(parameters)
     
     def to_openai_function(self) -> Dict[str, Any]:
         return {
@@ -20,171 +51,208 @@ class Tool:
         }
     
     def execute(self, **kwargs) -> str:
-        # 50% chance of failure for demonstration
-        if random.random() < 0.5:
-            failure_messages = [
-                f"❌ {self.name} service temporarily unavailable. Please try again.",
-                f"❌ {self.name} connection timeout. Service may be experiencing high load.",
-                f"❌ {self.name} returned an error. Please retry the request.",
-                f"❌ {self.name} service is down for maintenance. Try again shortly."
-            ]
-            return random.choice(failure_messages)
+        return self.invoke(**kwargs).output
+    
+    def matches(self, text: str) -> Optional[bool]:
+        """Whether ``text`` mentions any of the tool's keywords (None if it has none)"""
+        if self._keyword_pattern is None:
+            return None
+        return bool(self._keyword_pattern.search(text))
+    
+    def check_arguments(self, kwargs: Dict[str, Any]) -> Optional[ToolResult]:
+        """A failure the model can act on if the arguments don't match the schema, else None"""
+        error = self.validate(kwargs)
+        if error is None:
+            return None
+        return ToolResult.failure(f"❌ Invalid arguments for {self.name}: {error}. Fix them and call again.",
+                                  "invalid_arguments", retryable=False)
+    
+    def invoke(self, context: Optional[RequestContext] = None, **kwargs) -> ToolResult:
+        # Models send null for optional arguments they leave out; the function's defaults apply instead
+        kwargs = {name: value for name, value in kwargs.items() if value is not None}
+        invalid = self.check_arguments(kwargs)
+        if invalid is not None:
+            return invalid
+        
+        # Simulated backend latency and failures, configured in config/tool_simulation.json
+        fault = get_simulator().simulate(self.name, kwargs, context)
+        if fault is not None:
+            error, message = fault
+            return ToolResult.failure(message, error)
         
         try:
             result = self.function(**kwargs)
-            return json.dumps(result) if not isinstance(result, str) else result
+            return ToolResult(json.dumps(result) if not isinstance(result, str) else result)
         except Exception as e:
-            return f"Error executing {self.name}: {str(e)}"
+            # Bad arguments won't get better by retrying
+            return ToolResult.failure(f"Error executing {self.name}: {str(e)}", "error", retryable=False)
 
 
-# Example travel planning tools
-def search_flights(origin: str, destination: str, date: str) -> Dict[str, Any]:
-    # Randomized mock implementation
-    airlines = ["SkyWings Airlines", "Global Air", "Swift Travel", "Azure Airways", "Horizon Flight", "Cloud9 Airlines"]
-    
-    # Generate 1-3 random flights
-    num_flights = random.randint(1, 3)
-    flights = []
-    
-    for i in range(num_flights):
-        departure_hour = random.randint(6, 22)
-        flight_duration = random.randint(2, 14)  # 2-14 hours
-        arrival_hour = (departure_hour + flight_duration) % 24
-        price = random.randint(200, 1200)
-        
-        flights.append({
-            "airline": random.choice(airlines),
-            "departure": f"{origin} {departure_hour:02d}:{random.randint(0, 59):02d}",
-            "arrival": f"{destination} {arrival_hour:02d}:{random.randint(0, 59):02d}",
-            "price": f"${price}",
-            "date": date,
-            "flight_number": f"{random.choice(['AA', 'UA', 'DL', 'SW'])}{random.randint(100, 9999)}",
-            "duration": f"{flight_duration}h {random.randint(0, 59)}m"
-        })
-    
-    return {"flights": flights}
-
-
-def search_hotels(city: str, checkin_date: str, checkout_date: str) -> Dict[str, Any]:
-    # Randomized mock implementation
-    hotel_names = [
-        "Grand Palace Hotel", "City Center Inn", "Skyline Resort", "Harbor View Hotel", 
-        "Metropolitan Suites", "Royal Gardens Hotel", "Downtown Plaza", "Sunset Lodge",
-        "Urban Retreat", "Cosmopolitan Hotel", "Riverside Inn", "Crown Hotel"
-    ]
-    
-    locations = [f"Downtown {city}", f"{city} City Center", f"Old Town {city}", 
-                f"{city} Business District", f"Historic {city}", f"Airport Area {city}"]
-    
-    amenities_list = [
-        ["Free WiFi", "Pool", "Gym"], ["Spa", "Restaurant", "Room Service"],
-        ["Business Center", "Parking", "Pet Friendly"], ["Beach Access", "Bar", "Concierge"],
-        ["Breakfast Included", "Airport Shuttle", "Fitness Center"]
-    ]
-    
-    # Generate 1-4 random hotels
-    num_hotels = random.randint(1, 4)
-    hotels = []
-    
-    for i in range(num_hotels):
-        price = random.randint(80, 500)
-        rating = round(random.uniform(3.0, 5.0), 1)
+class ToolRegistry:
+    """Tools by name, declared with the ``tool`` decorator.
+
+    The decorator builds each tool's JSON schema from the function's type
+    hints and docstring, and compiles an argument validator from it. Agents
+    ask ``select`` for the tools relevant to a request so that only those
+    schemas are sent with the prompt.
+    """
+    
+    def __init__(self):
+        self._tools: Dict[str, Tool] = {}
+    
+    def tool(self, name: Optional[str] = None, description: Optional[str] = None,
+             keywords: Sequence[str] = ()) -> Callable[[Callable], Callable]:
+        """Register the decorated function as a tool. The function itself is returned unchanged."""
+        def register(function: Callable) -> Callable:
+            doc, parameters = schema_from_function(function)
+            self.register(Tool(name or function.__name__, description or doc, function, parameters, keywords))
+            return function
+        return register
+    
+    def register(self, tool: Tool):
+        self._tools[tool.name] = tool
+    
+    def get(self, name: str) -> Optional[Tool]:
+        return self._tools.get(name)
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+    
+    def __iter__(self) -> Iterator[Tool]:
+        return iter(self._tools.values())
+    
+    def __len__(self) -> int:
+        return len(self._tools)
+    
+    def select(self, text: str, tools: Optional[List[Tool]] = None) -> List[Tool]:
+        """The tools whose keywords appear in ``text``, or all of them if none do.
         
-        hotels.append({
-            "name": random.choice(hotel_names),
-            "location": random.choice(locations),
-            "price_per_night": f"${price}",
-            "rating": rating,
-            "amenities": random.choice(amenities_list),
-            "availability": "Available" if random.random() > 0.2 else "Limited availability"
-        })
-    
-    return {"hotels": hotels}
-
-
-def get_weather(city: str, date: str) -> Dict[str, Any]:
-    # Randomized mock implementation
-    conditions = [
-        "Sunny", "Partly cloudy", "Cloudy", "Light rain", "Heavy rain", 
-        "Thunderstorms", "Snow", "Foggy", "Windy", "Clear skies"
-    ]
-    
-    # Temperature varies by season - more moderate like typical travel destinations
-    temp_celsius = random.randint(5, 30)  # 5°C to 30°C (41°F to 86°F)
-    temp_fahrenheit = int(temp_celsius * 9/5 + 32)
-    
-    humidity = random.randint(30, 90)
-    precipitation = random.randint(0, 80)
-    wind_speed = random.randint(5, 25)
-    
-    condition = random.choice(conditions)
-    
-    # Add weather-appropriate details
-    extras = {}
-    if "rain" in condition.lower():
-        extras["umbrella_needed"] = True
-        precipitation = max(precipitation, 40)  # Higher chance of rain
-    elif condition == "Snow":
-        temp_celsius = random.randint(-2, 5)  # Snow only at low temps
-        temp_fahrenheit = int(temp_celsius * 9/5 + 32)
-        extras["winter_clothing_recommended"] = True
-    elif condition == "Sunny":
-        extras["sunscreen_recommended"] = True
-        precipitation = min(precipitation, 20)  # Lower chance of rain when sunny
-    
-    return {
-        "city": city,
-        "date": date,
-        "temperature": f"{temp_celsius}°C ({temp_fahrenheit}°F)",
-        "condition": condition,
-        "precipitation_chance": f"{precipitation}%",
-        "humidity": f"{humidity}%",
-        "wind_speed": f"{wind_speed} km/h",
-        **extras
-    }
-
-
-# Tool definitions
-TRAVEL_TOOLS = [
-    Tool(
-        name="search_flights",
-        description="Search for available flights between cities",
-        function=search_flights,
-        parameters={
-            "type": "object",
-            "properties": {
-                "origin": {"type": "string", "description": "Departure city"},
-                "destination": {"type": "string", "description": "Arrival city"},
-                "date": {"type": "string", "description": "Travel date (YYYY-MM-DD)"}
-            },
-            "required": ["origin", "destination", "date"]
-        }
-    ),
-    Tool(
-        name="search_hotels",
-        description="Search for hotels in a specific city",
-        function=search_hotels,
-        parameters={
-            "type": "object",
-            "properties": {
-                "city": {"type": "string", "description": "City name"},
-                "checkin_date": {"type": "string", "description": "Check-in date (YYYY-MM-DD)"},
-                "checkout_date": {"type": "string", "description": "Check-out date (YYYY-MM-DD)"}
-            },
-            "required": ["city", "checkin_date", "checkout_date"]
-        }
-    ),
-    Tool(
-        name="get_weather",
-        description="Get weather forecast for a city on a specific date",
-        function=get_weather,
-        parameters={
-            "type": "object",
-            "properties": {
-                "city": {"type": "string", "description": "City name"},
-                "date": {"type": "string", "description": "Date (YYYY-MM-DD)"}
-            },
-            "required": ["city", "date"]
-        }
+        Tools without keywords are always included.
+        """
+        tools = list(self) if tools is None else tools
+        relevant = []
+        matched = False
+        for tool in tools:
+            match = tool.matches(text)
+            if match is None or match:
+                relevant.append(tool)
+                matched = matched or bool(match)
+        return relevant if matched else tools
+
+
+TRAVEL_REGISTRY = ToolRegistry()
+
+# Words that make every travel tool relevant
+TRIP_WORDS = ("trip", "travel", "itinerary", "vacation", "holiday", "getaway", "plan", "visit", "journey")
+
+
+# Example travel planning tools
+@TRAVEL_REGISTRY.tool(keywords=("flight", "fly", "flying", "airline", "airport", "plane", *TRIP_WORDS))
+def search_flights(origin: str, destination: str, date: ISODate, max_price: Optional[float] = None,
+                   max_duration_hours: Optional[float] = None, depart_after: Optional[ClockTime] = None,
+                   depart_before: Optional[ClockTime] = None, max_stops: Optional[int] = None,
+                   sort_by: Literal["price", "duration", "departure"] = "price",
+                   limit: int = 5) -> Dict[str, Any]:
+    """Search for available flights between cities, optionally filtered and sorted
+
+    Args:
+        origin: Departure city
+        destination: Arrival city
+        date: Travel date (YYYY-MM-DD)
+        max_price: Maximum price in USD
+        max_duration_hours: Maximum flight duration in hours
+        depart_after: Earliest departure time (HH:MM)
+        depart_before: Latest departure time (HH:MM)
+        max_stops: Maximum number of stops (0 for nonstop)
+        sort_by: How to order results (default price)
+        limit: Number of flights to return (default 5)
+    """
+    # Served from the local indexed flight inventory (NumPy and the data load on first use)
+    from src.backends.flights import get_flight_inventory
+    return get_flight_inventory().search(
+        origin, destination, date,
+        max_price=max_price,
+        max_duration=int(max_duration_hours * 60) if max_duration_hours is not None else None,
+        depart_after=_minutes(depart_after),
+        depart_before=_minutes(depart_before),
+        max_stops=max_stops,
+        sort_by=sort_by,
+        limit=max(1, min(int(limit), 20))
+    )
+
+
+def _minutes(clock: Optional[str]) -> Optional[int]:
+    # "HH:MM" -> minutes after midnight
+    if not clock:
+        return None
+    hours, minutes = clock.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+@TRAVEL_REGISTRY.tool(keywords=("hotel", "stay", "accommodation", "lodging", "room", "resort", "night",
+                                 *TRIP_WORDS))
+def search_hotels(city: str, checkin_date: ISODate, checkout_date: ISODate, max_price: Optional[float] = None,
+                  min_rating: Annotated[Optional[float], SchemaHint(minimum=0, maximum=5)] = None,
+                  amenities: Optional[List[Literal[tuple(AMENITIES)]]] = None,
+                  sort_by: Literal["recommended", "price", "rating"] = "recommended", limit: int = 5,
+                  cursor: Optional[str] = None) -> Dict[str, Any]:
+    """Search for hotels with rooms free for the whole stay, optionally filtered and ranked.
+    Pass next_cursor from a previous result as cursor to get more.
+
+    Args:
+        city: City name
+        checkin_date: Check-in date (YYYY-MM-DD)
+        checkout_date: Check-out date (YYYY-MM-DD)
+        max_price: Maximum price per night in USD
+        min_rating: Minimum guest rating (out of 5)
+        amenities: Amenities the hotel must have
+        sort_by: How to rank results (default recommended)
+        limit: Number of hotels to return (default 5)
+        cursor: next_cursor from a previous search, for the next page
+    """
+    # Served from the local columnar hotel catalog
+    from src.backends.hotels import get_hotel_catalog
+    return get_hotel_catalog().search(
+        city, checkin_date, checkout_date,
+        max_price=max_price,
+        min_rating=min_rating,
+        amenities=amenities,
+        sort_by=sort_by,
+        limit=max(1, min(int(limit), 20)),
+        cursor=cursor
     )
-]
\ No newline at end of file
+
+
+@TRAVEL_REGISTRY.tool(keywords=("weather", "forecast", "rain", "temperature", "sunny", "pack", "packing",
+                                 *TRIP_WORDS))
+def get_weather(city: str, date: ISODate) -> Dict[str, Any]:
+    """Get weather forecast for a city on a specific date
+
+    Args:
+        city: City name
+        date: Date (YYYY-MM-DD)
+    """
+    # Served from the deterministic local forecast store
+    from src.backends.weather import get_weather_store
+    return get_weather_store().forecast(city, date)
+
+
+@TRAVEL_REGISTRY.tool(keywords=("weather", "forecast", "rain", "temperature", "sunny", "pack", "packing",
+                                 *TRIP_WORDS))
+def get_weather_forecast(cities: Annotated[List[str], SchemaHint(maxItems=10)], start_date: ISODate,
+                         end_date: Optional[ISODate] = None) -> Dict[str, Any]:
+    """Get the weather for several cities over a range of dates in one call, as a compact table.
+    Prefer this over repeated get_weather calls for multi-day or multi-city trips.
+
+    Args:
+        cities: City names (up to 10)
+        start_date: First date (YYYY-MM-DD)
+        end_date: Last date, inclusive (YYYY-MM-DD, up to 16 days)
+    """
+    # One compact table instead of a get_weather call per city and day
+    from src.backends.weather import get_weather_store
+    return get_weather_store().table(cities, start_date, end_date)
+
+
+# Every registered travel tool, in declaration order
+TRAVEL_TOOLS = list(TRAVEL_REGISTRY)
@@ -0,0 +1,139 @@
+import threading
+from typing import Any, Dict, Optional
+
+
+# USD per 1M tokens: (input, output)
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    # Dated snapshots (e.g. gpt-4o-2024-08-06) are priced like their base model
+    prefix = max((name for name in MODEL_PRICES if model.startswith(name)), key=len, default=None)
+    input_price, output_price = MODEL_PRICES.get(prefix, (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+class Usage:
+    """Running token and cost totals"""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.tool_calls = 0  # Tool calls the model made, including ones answered from the request's memo
+        self._lock = threading.Lock()
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, prompt_tokens: int, completion_tokens: int, cost: float):
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cost += cost
+
+    def add_tool_call(self):
+        with self._lock:
+            self.tool_calls += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "cost": round(self.cost, 6),
+            "tool_calls": self.tool_calls,
+        }
+
+
+class Budget:
+    """Token/cost limits for a session and what to do as they are approached.
+
+    Past ``downgrade_at`` of the budget calls switch to ``downgrade_model``,
+    past ``trim_at`` older conversation history is dropped as well, and once
+    the budget is spent no further calls are made.
+    """
+
+    OK = "ok"
+    DOWNGRADE = "downgrade"
+    TRIM = "trim"
+    STOP = "stop"
+
+    def __init__(self, max_tokens: Optional[int] = None, max_cost: Optional[float] = None,
+                 downgrade_at: float = 0.7, trim_at: float = 0.85,
+                 downgrade_model: str = "gpt-4o-mini", keep_messages: int = 6):
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.downgrade_at = downgrade_at
+        self.trim_at = trim_at
+        self.downgrade_model = downgrade_model
+        self.keep_messages = keep_messages  # History kept when trimming
+
+    def fraction_used(self, usage: Usage) -> float:
+        fractions = [0.0]
+        if self.max_tokens:
+            fractions.append(usage.total_tokens / self.max_tokens)
+        if self.max_cost:
+            fractions.append(usage.cost / self.max_cost)
+        return max(fractions)
+
+    def action(self, usage: Usage) -> str:
+        used = self.fraction_used(usage)
+        if used >= 1.0:
+            return self.STOP
+        if used >= self.trim_at:
+            return self.TRIM
+        if used >= self.downgrade_at:
+            return self.DOWNGRADE
+        return self.OK
+
+
+class UsageTracker:
+    """Token usage for one session, broken down by model and by stage"""
+
+    def __init__(self, budget: Optional[Budget] = None):
+        self.budget = budget
+        self.session = Usage()
+        self.by_model: Dict[str, Usage] = {}
+        self.by_stage: Dict[str, Usage] = {}
+        self.last_request: Optional[Usage] = None
+        self._lock = threading.Lock()
+
+    def record(self, model: str, usage: Any, stage: str = "chat", request: Optional[Usage] = None):
+        """Add an API ``usage`` object (from a response or the final stream chunk)"""
+        if usage is None:
+            return
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        cost = estimate_cost(model, prompt_tokens, completion_tokens)
+
+        with self._lock:
+            by_model = self.by_model.setdefault(model, Usage())
+            by_stage = self.by_stage.setdefault(stage, Usage())
+            if request is not None:
+                self.last_request = request
+
+        for totals in (self.session, by_model, by_stage, request):
+            if totals is not None:
+                totals.add(prompt_tokens, completion_tokens, cost)
+
+    def budget_action(self) -> str:
+        if self.budget is None:
+            return Budget.OK
+        return self.budget.action(self.session)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "session": self.session.to_dict(),
+            "last_request": self.last_request.to_dict() if self.last_request else None,
+            "by_model": {model: usage.to_dict() for model, usage in self.by_model.items()},
+            "by_stage": {stage: usage.to_dict() for stage, usage in self.by_stage.items()},
+        }
@@ -0,0 +1,512 @@
+import bisect
+import hashlib
+import multiprocessing
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from src.core.context import RequestContext, RequestCancelled, DeadlineExceeded, BudgetExceeded, Overloaded
+from src.core.messages import Message, to_wire
+from src.core.ratelimit import DEFAULT_LIMITER
+from src.core.usage import Budget, Usage, UsageTracker
+
+
+class WorkerError(Exception):
+    """A request failed inside a worker process"""
+
+
+class WorkerDied(WorkerError):
+    """The worker handling a request exited before answering"""
+
+
+# Cancellations raised in a worker are raised as the same type in the caller
+_CANCELLATIONS = {error.__name__: error for error in (RequestCancelled, DeadlineExceeded, BudgetExceeded, Overloaded)}
+
+
+class HashRing:
+    """Consistent hashing of keys (session ids) onto nodes (workers).
+
+    Each node owns ``replicas`` points on the ring, so keys spread evenly and
+    removing a node only moves the keys it owned - every other session stays
+    on the worker that has its state.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 64):
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: Dict[int, str] = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str):
+        for replica in range(self.replicas):
+            point = self._hash(f"{node}#{replica}")
+            if point not in self._owners:
+                bisect.insort(self._points, point)
+                self._owners[point] = node
+
+    def remove(self, node: str):
+        points = [point for point, owner in self._owners.items() if owner == node]
+        for point in points:
+            del self._owners[point]
+            self._points.remove(point)
+
+    def node_for(self, key: str) -> Optional[str]:
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+    def __len__(self) -> int:
+        return len(set(self._owners.values()))
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+class PendingResponse:
+    """A request sent to the pool: iterate it for a stream's chunks, or wait for ``result()``"""
+
+    def __init__(self, request: Dict[str, Any], cancel: Callable[[], None]):
+        self.request = request
+        self.id = request["id"]
+        self.worker: Optional[str] = None
+        self.started = False
+        self.streamed = False  # Chunks already reached the caller, so it can't be retried elsewhere
+        self.usage: Optional[Dict[str, Any]] = None  # The worker's calls for it, once it has finished
+        self._cancel = cancel
+        self._events: "queue.Queue[Tuple[str, Any]]" = queue.Queue()
+
+    def __iter__(self) -> Iterator[str]:
+        while True:
+            kind, payload = self._events.get()
+            if kind == "chunk":
+                yield payload
+            elif kind == "done":
+                return
+            else:
+                raise payload
+
+    def result(self) -> str:
+        if self.request["stream"]:
+            return "".join(self)
+        kind, payload = self._events.get()
+        if kind == "error":
+            raise payload
+        return payload
+
+    def cancel(self):
+        self._cancel()
+
+    def _put(self, kind: str, payload: Any):
+        self._events.put((kind, payload))
+
+
+class WorkerPool:
+    """Serves agents from a pool of worker processes, each session always on the same worker.
+
+    Sessions are routed by consistent hashing, so each session keeps hitting
+    the worker that holds its agent (and its history, prompt cache, tool
+    backends and circuit breakers); only the sessions of a worker that dies
+    move, and requests it had not started streaming are retried on the
+    session's new worker. Each worker runs up to ``threads`` requests at a
+    time, one at a time per session, and keeps at most ``max_sessions`` agents.
+    The workers split the provider rate limits evenly between them.
+    """
+
+    def __init__(self, workers: Optional[int] = None, threads: int = 8, max_sessions: int = 1000,
+                 replicas: int = 64, retry_on_death: bool = True, check_interval: float = 0.2):
+        self.size = workers or multiprocessing.cpu_count()
+        self.threads = threads
+        self.max_sessions = max_sessions
+        self.retry_on_death = retry_on_death
+        self.check_interval = check_interval
+        self.ring = HashRing(replicas=replicas)
+        self.stats = {"requests": 0, "retried": 0, "worker_deaths": 0}
+        # Spawned, not forked: the parent has threads (and maybe a Streamlit server) that must not be copied
+        self._mp = multiprocessing.get_context("spawn")
+        self._outbox = self._mp.Queue()
+        self._workers: Dict[str, Tuple[Any, Any]] = {}  # Name -> (process, inbox)
+        self._pending: Dict[str, PendingResponse] = {}
+        self._lock = threading.Lock()
+        self._running = False
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> "WorkerPool":
+        for index in range(self.size):
+            name = f"worker-{index}"
+            inbox = self._mp.Queue()
+            process = self._mp.Process(target=_serve, args=(name, inbox, self._outbox, self.threads,
+                                                            self.max_sessions, self.size), name=name, daemon=True)
+            process.start()
+            self._workers[name] = (process, inbox)
+            self.ring.add(name)
+        self._running = True
+        for target in (self._collect, self._monitor):
+            thread = threading.Thread(target=target, name=f"pool-{target.__name__.strip('_')}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def submit(self, session_id: str, agent_key: str, prompt: str, stream: bool = False,
+               history: Optional[List[Any]] = None, timeout: Optional[float] = None, seed: Optional[int] = None,
+               run_id: Optional[str] = None, priority: Optional[str] = None, usage: Optional[UsageTracker] = None,
+               **agent_kwargs) -> PendingResponse:
+        """Send a request to the session's worker.
+
+        ``agent_kwargs`` (model, temperature, ...) configure the session's
+        agent; a change recreates it. ``history`` replaces the agent's
+        conversation history for this request; leave it out to use the
+        history the worker already holds. With ``usage`` the worker holds the
+        request to that tracker's budget, counting what it has spent so far.
+        """
+        request = {
+            "id": uuid.uuid4().hex, "session": session_id, "agent": agent_key, "prompt": prompt, "stream": stream,
+            "history": to_wire(history) if history is not None else None, "timeout": timeout, "seed": seed,
+            "run_id": run_id, "priority": priority, "budget": _budget_state(usage), "agent_kwargs": agent_kwargs,
+        }
+        pending = PendingResponse(request, lambda: self._send_to_owner(request["id"], ("cancel", request["id"])))
+        with self._lock:
+            self.stats["requests"] += 1
+        self._dispatch(pending)
+        return pending
+
+    def process(self, session_id: str, agent_key: str, prompt: str, **kwargs) -> str:
+        return self.submit(session_id, agent_key, prompt, **kwargs).result()
+
+    def process_stream(self, session_id: str, agent_key: str, prompt: str, **kwargs) -> Iterator[str]:
+        return iter(self.submit(session_id, agent_key, prompt, stream=True, **kwargs))
+
+    def reset_session(self, session_id: str):
+        """Drop a session's agent, and with it its history"""
+        with self._lock:
+            name = self.ring.node_for(session_id)
+            worker = self._workers.get(name)
+        if worker is not None:
+            worker[1].put(("reset", session_id))
+
+    def queue_depths(self) -> Dict[str, Dict[str, int]]:
+        """Requests waiting and running on each live worker"""
+        with self._lock:
+            depths = {name: {"queued": 0, "active": 0} for name in self._workers}
+            for pending in self._pending.values():
+                if pending.worker in depths:
+                    depths[pending.worker]["active" if pending.started else "queued"] += 1
+        return depths
+
+    def shutdown(self, timeout: float = 5.0):
+        self._running = False
+        with self._lock:
+            workers, self._workers = dict(self._workers), {}
+            pending, self._pending = list(self._pending.values()), {}
+        for _, inbox in workers.values():
+            inbox.put(None)
+        for process, _ in workers.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._outbox.put(None)
+        for request in pending:
+            request._put("error", WorkerDied("worker pool shut down"))
+
+    def __enter__(self) -> "WorkerPool":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def _dispatch(self, pending: PendingResponse):
+        with self._lock:
+            name = self.ring.node_for(pending.request["session"])
+            if name is None:
+                pending._put("error", WorkerDied("no live workers"))
+                return
+            pending.worker, pending.started = name, False
+            self._pending[pending.id] = pending
+            inbox = self._workers[name][1]
+        inbox.put(("request", pending.request))
+
+    def _send_to_owner(self, request_id: str, message: Tuple[str, Any]):
+        with self._lock:
+            pending = self._pending.get(request_id)
+            worker = self._workers.get(pending.worker) if pending is not None else None
+        if worker is not None:
+            worker[1].put(message)
+
+    def _collect(self):
+        # Routes every worker's replies to the request they answer
+        while True:
+            message = self._outbox.get()
+            if message is None:
+                return
+            kind, request_id, payload = message
+            with self._lock:
+                pending = self._pending.get(request_id)
+                if pending is None:
+                    continue  # Answered by a worker that was given up for dead
+                if kind == "started":
+                    pending.started = True
+                elif kind == "chunk":
+                    pending.streamed = True
+                elif kind in ("done", "error"):
+                    del self._pending[request_id]
+            if kind == "chunk":
+                pending._put("chunk", payload)
+            elif kind == "done":
+                pending.usage = payload["usage"]
+                pending._put("done", payload["output"])
+            elif kind == "error":
+                name, text, pending.usage = payload
+                error = _CANCELLATIONS[name](text) if name in _CANCELLATIONS else WorkerError(f"{name}: {text}")
+                pending._put("error", error)
+
+    def _monitor(self):
+        while self._running:
+            with self._lock:
+                dead = [name for name, (process, _) in self._workers.items() if not process.is_alive()]
+            for name in dead:
+                self._handle_death(name)
+            time.sleep(self.check_interval)
+
+    def _handle_death(self, name: str):
+        # The dead worker's sessions move to their next worker on the ring
+        with self._lock:
+            if self._workers.pop(name, None) is None:
+                return
+            self.ring.remove(name)
+            self.stats["worker_deaths"] += 1
+            orphans = [pending for pending in self._pending.values() if pending.worker == name]
+            for pending in orphans:
+                del self._pending[pending.id]
+        for pending in orphans:
+            if self.retry_on_death and not pending.streamed:
+                with self._lock:
+                    self.stats["retried"] += 1
+                self._dispatch(pending)
+            else:
+                pending._put("error", WorkerDied(f"{name} exited while handling the request"))
+
+
+class PooledAgent:
+    """An agent whose requests run in a ``WorkerPool``, with the same interface as a local one.
+
+    ``conversation_history``, when set, is sent with each request; with it
+    left empty the worker's own history for the session is used.
+    """
+
+    def __init__(self, pool: WorkerPool, session_id: str, agent_key: str, usage: Optional[UsageTracker] = None,
+                 **agent_kwargs):
+        self.pool = pool
+        self.session_id = session_id
+        self.agent_key = agent_key
+        self.agent_kwargs = agent_kwargs
+        self.model = agent_kwargs.get("model", "gpt-4o-mini")
+        self.usage = usage or UsageTracker()
+        self.conversation_history: List[Message] = []
+
+    def process(self, user_input: str, context: Optional[RequestContext] = None) -> str:
+        pending = self._submit(user_input, context, stream=False)
+        unregister = context.on_cancel(pending.cancel) if context is not None else None
+        try:
+            return pending.result()
+        finally:
+            if unregister:
+                unregister()
+            self._record_usage(pending, context)
+
+    def process_stream(self, user_input: str, context: Optional[RequestContext] = None) -> Iterator[str]:
+        pending = self._submit(user_input, context, stream=True)
+        unregister = context.on_cancel(pending.cancel) if context is not None else None
+        try:
+            yield from pending
+        finally:
+            if unregister:
+                unregister()
+            self._record_usage(pending, context)
+
+    def clear_memory(self):
+        self.conversation_history = []
+        self.pool.reset_session(self.session_id)
+
+    def _submit(self, user_input: str, context: Optional[RequestContext], stream: bool) -> PendingResponse:
+        return self.pool.submit(
+            self.session_id, self.agent_key, user_input, stream=stream,
+            history=self.conversation_history or None,
+            timeout=context.remaining() if context is not None else None,
+            seed=context.seed if context is not None else None,
+            run_id=context.run_id if context is not None else None,
+            priority=context.priority if context is not None else None,
+            usage=self.usage,
+            **self.agent_kwargs
+        )
+
+    def _record_usage(self, pending: PendingResponse, context: Optional[RequestContext]):
+        # Each of the worker's calls is recorded as if it had been made here, with its own model and stage
+        if not pending.usage:
+            return
+        request = context.usage if context is not None else None
+        for model, stage, prompt_tokens, completion_tokens in pending.usage["calls"]:
+            self.usage.record(model, SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens),
+                              stage, request)
+        if request is not None:
+            for _ in range(pending.usage["tool_calls"]):
+                request.add_tool_call()
+
+
+def _budget_state(usage: Optional[UsageTracker]) -> Optional[Dict[str, Any]]:
+    # A session's budget and what it has spent so far, as sent to a worker
+    if usage is None or usage.budget is None:
+        return None
+    return {"limits": dict(vars(usage.budget)), "prompt_tokens": usage.session.prompt_tokens,
+            "completion_tokens": usage.session.completion_tokens, "cost": usage.session.cost}
+
+
+class _SessionUsage(UsageTracker):
+    """A worker's tracker for one session's agent.
+
+    Each request brings the session's budget and spending from the caller,
+    and the calls it makes are kept to be reported back with its answer.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.calls: List[Tuple[str, str, int, int]] = []  # (model, stage, prompt tokens, completion tokens)
+
+    def start(self, budget: Optional[Dict[str, Any]]):
+        """Take the caller's budget state before running a request"""
+        session = Usage()
+        if budget is not None:
+            session.prompt_tokens, session.completion_tokens = budget["prompt_tokens"], budget["completion_tokens"]
+            session.cost = budget["cost"]
+        with self._lock:
+            self.budget = Budget(**budget["limits"]) if budget is not None else None
+            self.session = session
+            self.calls = []
+
+    def record(self, model: str, usage: Any, stage: str = "chat", request: Optional[Usage] = None):
+        super().record(model, usage, stage, request)
+        if usage is not None:
+            with self._lock:
+                self.calls.append((model, stage, getattr(usage, "prompt_tokens", 0) or 0,
+                                   getattr(usage, "completion_tokens", 0) or 0))
+
+    def report(self, context: RequestContext) -> Dict[str, Any]:
+        """The request's calls, to send back with its answer"""
+        with self._lock:
+            calls, self.calls = self.calls, []
+        return {"calls": calls, "tool_calls": context.usage.tool_calls}
+
+
+def _serve(name: str, inbox: Any, outbox: Any, threads: int, max_sessions: int, workers: int = 1):
+    """A worker process: runs requests for its sessions until it is sent None"""
+    from src.core.startup import load_agent_class, warm_up
+
+    # Every worker draws on the same provider quota
+    DEFAULT_LIMITER.share(workers)
+
+    sessions: "OrderedDict[str, Tuple[Tuple, Any]]" = OrderedDict()  # Session -> (config, agent), oldest first
+    # Sessions with a request running -> their requests still to run. A session has one request on the
+    # executor at a time, so a busy session queues here instead of parking pool threads.
+    waiting: Dict[str, Deque[Dict[str, Any]]] = {}
+    contexts: Dict[str, RequestContext] = {}
+    lock = threading.Lock()
+    executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix=name)
+
+    def agent_for(request: Dict[str, Any]) -> Any:
+        kwargs = {key: value for key, value in request["agent_kwargs"].items() if value is not None}
+        config = (request["agent"], tuple(sorted(kwargs.items())))
+        with lock:
+            entry = sessions.get(request["session"])
+            if entry is not None and entry[0] == config:
+                sessions.move_to_end(request["session"])
+                return entry[1]
+        agent = load_agent_class(request["agent"])(usage=_SessionUsage(), **kwargs)
+        with lock:
+            sessions[request["session"]] = (config, agent)
+            sessions.move_to_end(request["session"])
+            while len(sessions) > max_sessions:
+                sessions.popitem(last=False)
+        return agent
+
+    def handle(request: Dict[str, Any]):
+        request_id = request["id"]
+        usage: Optional[_SessionUsage] = None
+        try:
+            context = contexts[request_id]
+            context.check()
+            outbox.put(("started", request_id, None))
+            agent = agent_for(request)
+            usage = agent.usage
+            usage.start(request["budget"])
+            if request["history"] is not None and hasattr(agent, "conversation_history"):
+                agent.conversation_history = [Message.coerce(message) for message in request["history"]]
+            if request["stream"]:
+                for chunk in agent.process_stream(request["prompt"], context):
+                    outbox.put(("chunk", request_id, chunk))
+                output = None
+            else:
+                output = agent.process(request["prompt"], context)
+            outbox.put(("done", request_id, {"output": output, "usage": usage.report(context)}))
+        except Exception as e:
+            # What a failed request spent still counts against the session's budget
+            report = usage.report(context) if usage is not None else None
+            outbox.put(("error", request_id, (type(e).__name__, str(e), report)))
+        finally:
+            with lock:
+                contexts.pop(request_id, None)
+                queued = waiting.get(request["session"])
+                following = queued.popleft() if queued else None
+                if following is None:
+                    waiting.pop(request["session"], None)
+            if following is not None:
+                # Behind the other sessions' requests already waiting, so a busy session can't hog the pool
+                executor.submit(handle, following)
+
+    threading.Thread(target=_warm_up_quietly, args=(warm_up,), daemon=True).start()
+    while True:
+        message = inbox.get()
+        if message is None:
+            break
+        kind, payload = message
+        if kind == "request":
+            with lock:
+                contexts[payload["id"]] = RequestContext(timeout=payload["timeout"], seed=payload["seed"],
+                                                         run_id=payload["run_id"], priority=payload["priority"])
+                # A session's requests run one at a time, in order
+                busy = payload["session"] in waiting
+                if busy:
+                    waiting[payload["session"]].append(payload)
+                else:
+                    waiting[payload["session"]] = deque()
+            if not busy:
+                executor.submit(handle, payload)
+        elif kind == "cancel":
+            with lock:
+                context = contexts.get(payload)
+            if context is not None:
+                context.cancel("cancelled")
+        elif kind == "reset":
+            with lock:
+                sessions.pop(payload, None)
+    with lock:
+        running = list(contexts.values())
+        unstarted = [request for queued in waiting.values() for request in queued]
+        waiting.clear()
+    for context in running:
+        context.cancel("worker shutting down")
+    for request in unstarted:
+        outbox.put(("error", request["id"], ("RequestCancelled", "worker shutting down", None)))
+    executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _warm_up_quietly(warm_up: Callable[[], Any]):
+    # Build the tool backends before the first request; a failure here shows up on that request instead
+    try:
+        warm_up()
+    except Exception:
+        pass
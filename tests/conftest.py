@@ -0,0 +1,95 @@
+import itertools
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from openai.types.chat import ChatCompletion, ChatCompletionChunk  # noqa: E402
+from src.backends.simulation import BackendSimulator, set_simulator  # noqa: E402
+from src.core import clients  # noqa: E402
+from src.core.recording import set_cassette  # noqa: E402
+
+_ids = itertools.count()
+
+
+def completion(content=None, tool_calls=None, model="gpt-4o-mini") -> ChatCompletion:
+    message: Dict[str, Any] = {"role": "assistant", "content": content}
+    if tool_calls:
+        message["tool_calls"] = [{"id": f"call_{next(_ids)}", "type": "function",
+                                  "function": {"name": name, "arguments": json.dumps(args)}}
+                                 for name, args in tool_calls]
+    return ChatCompletion.model_validate({
+        "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": model,
+        "choices": [{"index": 0, "finish_reason": "stop", "message": message}],
+        "usage": {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120},
+    })
+
+
+def chunks(text: str, model="gpt-4o-mini", usage=True):
+    for word in text.split(" "):
+        yield ChatCompletionChunk.model_validate({
+            "id": "chatcmpl-test", "object": "chat.completion.chunk", "created": 0, "model": model,
+            "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]})
+    if usage:
+        yield ChatCompletionChunk.model_validate({
+            "id": "chatcmpl-test", "object": "chat.completion.chunk", "created": 0, "model": model,
+            "choices": [], "usage": {"prompt_tokens": 50, "completion_tokens": 10, "total_tokens": 60}})
+
+
+class FakeClient:
+    """Stands in for the OpenAI client: ``script(params)`` returns a completion or the answer text"""
+
+    def __init__(self, script: Callable[[Dict[str, Any]], Any], delay: float = 0.0):
+        self.script = script
+        self.delay = delay
+        self.calls: List[Dict[str, Any]] = []
+        self.chat = self
+        self.completions = self
+
+    def create(self, **params):
+        self.calls.append(params)
+        if self.delay:
+            # Like the real client, give up at the timeout the request's deadline allows
+            timeout = params.get("timeout")
+            if timeout is not None and timeout < self.delay:
+                time.sleep(timeout)
+                raise TimeoutError("Request timed out.")
+            time.sleep(self.delay)
+        answer = self.script(params)
+        if params.get("stream"):
+            text = answer if isinstance(answer, str) else answer.choices[0].message.content
+            return chunks(text, usage=bool(params.get("stream_options")))
+        return completion(answer) if isinstance(answer, str) else answer
+
+
+def plan_then_answer(params: Dict[str, Any]) -> Any:
+    """Calls every tool offered once, then answers"""
+    if params.get("tools") and params["messages"][-1]["role"] == "user":
+        names = {tool["function"]["name"] for tool in params["tools"]}
+        calls = []
+        if "search_flights" in names:
+            calls.append(("search_flights", {"origin": "New York", "destination": "Tokyo", "date": "2026-11-02"}))
+        if "get_weather" in names:
+            calls.append(("get_weather", {"city": "Tokyo", "date": "2026-11-02"}))
+        return completion(None, calls)
+    return "Here is the plan"
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    """Installs a FakeClient as the shared OpenAI client, with tool backends that never fail or wait"""
+    def install(script: Callable[[Dict[str, Any]], Any] = plan_then_answer, delay: float = 0.0) -> FakeClient:
+        client = FakeClient(script, delay)
+        monkeypatch.setitem(clients._clients, os.environ["OPENAI_API_KEY"], client)
+        return client
+
+    set_simulator(BackendSimulator())
+    yield install
+    set_cassette(None)
+    set_simulator(None)
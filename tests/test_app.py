@@ -0,0 +1,46 @@
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from src.core.messages import Message
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def message(role, content, trace=None):
+    return {"role": role, "content": content, "trace": trace, "answer": content, "message": Message(role, content)}
+
+
+@pytest.fixture
+def app(fake_client):
+    fake_client(lambda params: "Here is the plan")
+    return AppTest.from_file(APP, default_timeout=30).run()
+
+
+def test_only_the_latest_messages_are_rendered_until_asked(app):
+    app.session_state.messages = [message("user" if number % 2 == 0 else "assistant", f"Message {number}")
+                                  for number in range(25)]
+    app.run()
+    assert len(app.chat_message) == 20 and app.chat_message[0].markdown[0].value == "Message 5"
+
+    show_earlier = next(button for button in app.button if button.key == "show_earlier")
+    assert show_earlier.label == "⬆️ Show earlier messages (5 hidden)"
+    show_earlier.click().run()
+    assert len(app.chat_message) == 25 and not any(button.key == "show_earlier" for button in app.button)
+
+
+def test_tool_trace_is_shown_apart_from_the_answer(app):
+    trace = "🔧 **Calling get_weather** with args: {'city': 'Tokyo'}\n"
+    app.session_state.messages = [message("user", "Weather in Tokyo?"),
+                                  {**message("assistant", f"{trace}---\nSunny"), "trace": trace, "answer": "Sunny"}]
+    app.run()
+    reply = app.chat_message[1]
+    assert reply.expander[0].label == "🔍 View Tool Calls" and reply.markdown[-1].value == "Sunny"
+
+
+def test_a_new_message_gets_an_answer(app):
+    app.chat_input[0].set_value("Plan a weekend in Rome").run()
+    assert not app.exception
+    assert [entry["role"] for entry in app.session_state.messages] == ["user", "assistant"]
+    assert app.session_state.messages[-1]["answer"].strip() == "Here is the plan"
@@ -0,0 +1,99 @@
+import pytest
+
+from src.backends.cities import CITIES, CityIndex, normalize_city
+from src.backends.flights import FlightInventory
+from src.backends.hotels import HotelCatalog
+
+
+@pytest.fixture(scope="module")
+def flights():
+    return FlightInventory.synthetic(100_000)
+
+
+@pytest.fixture(scope="module")
+def busy_routes():
+    # Hundreds of flights per route and day, so filters and top-k have something to choose from
+    return FlightInventory.synthetic(100_000, cities=["New York", "Tokyo", "London", "Paris", "Rome"], days=7)
+
+
+@pytest.fixture(scope="module")
+def hotels():
+    return HotelCatalog.synthetic(20_000)
+
+
+def test_rio_is_its_own_city(flights):
+    assert normalize_city("Rio") == normalize_city("Rio de Janeiro, Brazil") == "rio de janeiro"
+    assert CityIndex(CITIES).position("Rio") != CityIndex(CITIES).position("Sao Paulo")
+    found = flights.search("Rio", "Sao Paulo", "2026-11-02")["flights"]
+    assert found and found[0]["arrival"].startswith("Sao Paulo")
+
+
+def test_same_city_flight_search_is_refused(flights):
+    with pytest.raises(ValueError, match="the same"):
+        flights.search("Tokyo", "tokyo, Japan", "2026-11-02")
+
+
+def price(flight):
+    return int(flight["price"].lstrip("$"))
+
+
+def test_flight_filters_and_top_k_match_a_full_sort(busy_routes):
+    query = dict(origin="New York", destination="Tokyo", date="2026-11-02", max_price=900, max_stops=1)
+    everything = busy_routes.search(**query, limit=10_000)
+    found = everything["flights"]
+    assert len(found) == everything["total_matches"] > 5
+    assert all(price(flight) <= 900 and flight["stops"] in ("nonstop", "1 stop") for flight in found)
+    assert [price(flight) for flight in found] == sorted(price(flight) for flight in found)
+
+    top = busy_routes.search(**query)
+    assert [price(flight) for flight in top["flights"]] == [price(flight) for flight in found[:5]]
+    assert top["total_matches"] == everything["total_matches"]
+
+
+def test_flights_depart_in_the_requested_window_sorted_by_departure(busy_routes):
+    found = busy_routes.search("London", "Paris", "2026-11-06", depart_after=9 * 60, depart_before=12 * 60,
+                           sort_by="departure", limit=50)["flights"]
+    times = [flight["departure"].split()[-1] for flight in found]
+    assert found and times == sorted(times) and all("09:00" <= time <= "12:00" for time in times)
+
+
+def test_saved_inventory_loads_memory_mapped_with_the_same_answers(flights, tmp_path):
+    flights.save(str(tmp_path))
+    loaded = FlightInventory.load(str(tmp_path))
+    assert len(loaded) == len(flights)
+    query = ("Paris", "Rome", "2026-12-24")
+    assert loaded.search(*query, sort_by="duration") == flights.search(*query, sort_by="duration")
+
+
+STAY = dict(city="Tokyo", checkin_date="2026-11-02", checkout_date="2026-11-05")
+
+
+def test_hotel_filters_apply_to_the_whole_stay(hotels):
+    found = hotels.search(**STAY, max_price=250, min_rating=4.0, amenities=["pool", "Free WiFi"], limit=100)
+    assert found["hotels"] and found["nights"] == 3
+    for hotel in found["hotels"]:
+        assert int(hotel["price_per_night"].lstrip("$")) <= 250 and hotel["rating"] >= 4.0
+        assert {"Pool", "Free WiFi"} <= set(hotel["amenities"])
+    ratings = [hotel["rating"] for hotel in hotels.search(**STAY, sort_by="rating", limit=20)["hotels"]]
+    assert ratings == sorted(ratings, reverse=True)
+
+
+def test_cursor_pages_through_every_match_once(hotels):
+    pages, cursor = [], None
+    while True:
+        page = hotels.search(**STAY, sort_by="price", limit=40, cursor=cursor)
+        pages.append(page["hotels"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    walked = [hotel for page in pages for hotel in page]
+    assert len(pages) > 2 and len(walked) == page["total_matches"]
+    assert walked == hotels.search(**STAY, sort_by="price", limit=len(walked))["hotels"]
+
+
+def test_cursor_is_refused_for_a_different_search(hotels):
+    cursor = hotels.search(**STAY, limit=5)["next_cursor"]
+    with pytest.raises(ValueError, match="different search"):
+        hotels.search(**STAY, sort_by="price", cursor=cursor)
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        hotels.search(**STAY, cursor="not-a-cursor")
@@ -0,0 +1,45 @@
+import json
+import time
+
+from src.core.batch import BatchRunner, completed_tasks, summarize
+
+
+def write_items(path, count):
+    with open(path, "w") as f:
+        for number in range(count):
+            f.write(json.dumps({"id": f"q{number}", "prompt": f"Flights from New York to Tokyo ({number})"}) + "\n")
+
+
+def test_answers_cut_short_by_the_deadline_are_partial_and_rerun(tmp_path, fake_client):
+    items, output = str(tmp_path / "items.jsonl"), str(tmp_path / "results.jsonl")
+    write_items(items, 2)
+    fake_client(delay=0.3)
+    records = BatchRunner(["reasoning"], workers=2, timeout=0.1).run(items, output)
+
+    assert [record["status"] for record in records] == ["partial", "partial"]
+    assert all(record["error"] is None and record["turns"][0]["stopped"] == "deadline exceeded"
+               for record in records)
+    assert completed_tasks(output) == set()
+    stats = summarize(records)["reasoning"]
+    assert (stats["partial"], stats["errors"], stats["p50_latency"]) == (2, 0, None)
+
+    fake_client()
+    rerun = BatchRunner(["reasoning"], workers=2).run(items, output)
+    assert sorted(record["id"] for record in rerun) == ["q0", "q1"]
+    assert completed_tasks(output) == {("q0", "reasoning"), ("q1", "reasoning")}
+
+
+class JustInTime:
+    """Answers in full without looking at the deadline, which has passed by the time it returns"""
+
+    def process(self, prompt, context):
+        time.sleep(0.1)
+        return f"Complete answer to {prompt}"
+
+
+def test_answer_finished_before_being_stopped_is_complete(tmp_path, monkeypatch):
+    items, output = str(tmp_path / "items.jsonl"), str(tmp_path / "results.jsonl")
+    write_items(items, 1)
+    monkeypatch.setattr(BatchRunner, "_create_agent", lambda self, key: JustInTime())
+    records = BatchRunner(["reasoning"], workers=1, timeout=0.05).run(items, output)
+    assert records[0]["status"] == "ok" and "stopped" not in records[0]["turns"][0]
@@ -0,0 +1,81 @@
+import pytest
+
+from src.agents.reasoning_agent import ReasoningAgent
+from src.core.checkpoints import FileCheckpointStore, MemoryCheckpointStore
+from src.core.context import RequestContext
+from src.core.resilience import ResilientExecutor, RetryPolicy
+from src.core.tools import TRAVEL_REGISTRY
+
+from conftest import completion
+
+PLAN = [
+    ("search_flights", {"origin": "New York", "destination": "Tokyo", "date": "2026-11-02"}),
+    ("search_hotels", {"city": "Tokyo", "checkin_date": "2026-11-02", "checkout_date": "2026-11-05"}),
+    ("get_weather", {"city": "Tokyo", "date": "2026-11-02"}),
+    ("get_weather", {"city": "Osaka", "date": "2026-11-03"}),
+]
+
+
+def planner(fail_on_call=None):
+    """Works through PLAN one tool call per iteration, failing like the provider on one call"""
+    calls = {"count": 0}
+
+    def script(params):
+        calls["count"] += 1
+        if calls["count"] == fail_on_call:
+            raise RuntimeError("provider returned 500")
+        step = sum(1 for message in params["messages"] if message["role"] == "assistant" and message.get("tool_calls"))
+        return completion(None, [PLAN[step]]) if step < len(PLAN) else "Final plan"
+
+    return script
+
+
+@pytest.fixture
+def tool_calls(monkeypatch):
+    calls = []
+    for tool in TRAVEL_REGISTRY:
+        def counted(function=tool.function, name=tool.name, **kwargs):
+            calls.append((name, kwargs))
+            return function(**kwargs)
+        monkeypatch.setattr(tool, "function", counted)
+    return calls
+
+
+def agent(store):
+    return ReasoningAgent(checkpoints=store, resilience=ResilientExecutor(RetryPolicy(base_delay=0.0)))
+
+
+@pytest.mark.parametrize("kind", ["memory", "file"])
+def test_resume_continues_after_the_last_finished_iteration(kind, tmp_path, fake_client, tool_calls):
+    store = MemoryCheckpointStore() if kind == "memory" else FileCheckpointStore(str(tmp_path))
+    fake_client(planner(fail_on_call=3))
+    with pytest.raises(RuntimeError):
+        agent(store).process("Flights, hotels and weather for Tokyo", RequestContext(run_id="trip-1"))
+    assert store.load("trip-1").iterations == 2
+    assert [name for name, _ in tool_calls] == ["search_flights", "search_hotels"]
+
+    client = fake_client(planner())
+    output = agent(store).resume("trip-1")
+
+    # No finished iteration is asked of the model again and no tool call is repeated
+    assert len(client.calls) == 3
+    assert [args for _, args in tool_calls] == [args for _, args in PLAN]
+    assert "Resuming** after iteration 2" in output and output.endswith("Final plan")
+    assert store.load("trip-1") is None
+
+
+def test_streamed_run_resumes(fake_client, tool_calls):
+    store = MemoryCheckpointStore()
+    fake_client(planner(fail_on_call=4))
+    with pytest.raises(RuntimeError):
+        "".join(agent(store).process_stream("Flights, hotels and weather for Tokyo", RequestContext(run_id="trip-2")))
+
+    fake_client(planner())
+    output = "".join(agent(store).resume_stream("trip-2"))
+    assert [args for _, args in tool_calls] == [args for _, args in PLAN]
+    assert output.rstrip().endswith("Final plan")
+
+
+def test_resuming_an_unknown_run_raises():
+    with pytest.raises(KeyError):
+        agent(MemoryCheckpointStore()).resume("missing")
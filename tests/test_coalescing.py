@@ -0,0 +1,119 @@
+import threading
+
+import pytest
+
+from src.core.coalescing import SingleFlight
+from src.core.context import RequestCancelled
+
+
+class Upstream:
+    """A stream of numbered chunks that counts how often it was opened"""
+
+    def __init__(self, size=5, fail_at=None):
+        self.size = size
+        self.fail_at = fail_at
+        self.opened = 0
+        self.closed = 0
+
+    def open(self):
+        self.opened += 1
+        return _Stream(self)
+
+
+class _Stream:
+    def __init__(self, upstream):
+        self.upstream = upstream
+
+    def __iter__(self):
+        for index in range(self.upstream.size):
+            if index == self.upstream.fail_at:
+                raise ConnectionError("connection reset")
+            yield index
+
+    def close(self):
+        self.upstream.closed += 1
+
+
+def test_subscribers_share_one_upstream_and_late_ones_replay():
+    flights, upstream, seen = SingleFlight(), Upstream(), []
+    first = flights.stream("key", upstream.open, on_chunk=seen.append)
+    assert [next(first), next(first)] == [0, 1]
+    second = flights.stream("key", upstream.open, on_chunk=seen.append)
+
+    assert list(second) == [0, 1, 2, 3, 4]
+    assert list(first) == [2, 3, 4]
+    assert upstream.opened == 1 and seen == [0, 1, 2, 3, 4]
+    assert flights.stats == {"calls": 2, "coalesced": 1}
+
+
+def test_finished_stream_is_forgotten():
+    flights, upstream = SingleFlight(), Upstream(size=2)
+    assert list(flights.stream("key", upstream.open)) == [0, 1]
+    assert list(flights.stream("key", upstream.open)) == [0, 1]
+    assert upstream.opened == 2
+
+
+def test_upstream_error_reaches_every_subscriber():
+    flights, upstream = SingleFlight(), Upstream(fail_at=2)
+    first = flights.stream("key", upstream.open)
+    second = flights.stream("key", upstream.open)
+    for subscription in (first, second):
+        with pytest.raises(ConnectionError):
+            list(subscription)
+
+
+def test_last_subscriber_leaving_closes_the_upstream():
+    flights, upstream = SingleFlight(), Upstream()
+    first = flights.stream("key", upstream.open)
+    second = flights.stream("key", upstream.open)
+    next(first)
+    first.close()
+    assert upstream.closed == 0
+    second.close()
+    assert upstream.closed == 1
+
+
+def test_joining_an_abandoned_stream_opens_a_new_one(monkeypatch):
+    flights, upstream = SingleFlight(), Upstream()
+    leader = flights.stream("key", upstream.open)
+    next(leader)
+    # Keep the abandoned stream registered, as it is between the last subscriber leaving and it being forgotten
+    monkeypatch.setattr(flights, "_forget_stream", lambda key, broadcast: None)
+    leader.close()
+
+    follower = flights.stream("key", upstream.open)
+    assert list(follower) == [0, 1, 2, 3, 4]
+    assert upstream.opened == 2
+
+
+def test_abandoned_stream_ends_with_an_error():
+    flights, upstream = SingleFlight(), Upstream()
+    subscription = flights.stream("key", upstream.open)
+    broadcast = subscription._broadcast
+    subscription.close()
+    assert broadcast.subscribe() is None
+    with pytest.raises(RequestCancelled):
+        broadcast.chunk(0)
+
+
+def test_concurrent_joins_and_leaves_never_truncate_a_stream():
+    flights, upstream = SingleFlight(), Upstream(size=20)
+    results, start = [], threading.Barrier(8)
+
+    def subscriber(leave_early):
+        start.wait()
+        for _ in range(50):
+            subscription = flights.stream("key", upstream.open)
+            if leave_early:
+                next(subscription, None)
+                subscription.close()
+            else:
+                results.append(list(subscription))
+
+    threads = [threading.Thread(target=subscriber, args=(number % 2 == 0,)) for number in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 200
+    assert all(result == list(range(20)) for result in results)
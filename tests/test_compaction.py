@@ -0,0 +1,40 @@
+import json
+
+from src.backends.hotels import HotelCatalog
+from src.core.compaction import DEFAULT_COMPACTOR, Projection, ToolOutputCompactor
+
+
+def hotel_search():
+    found = HotelCatalog.synthetic(5_000).search("Tokyo", "2026-11-02", "2026-11-05", limit=12)
+    assert found["next_cursor"] is not None
+    return found
+
+
+def test_hotel_results_become_a_table_and_keep_the_cursor():
+    found = hotel_search()
+    compacted = json.loads(DEFAULT_COMPACTOR.compact("search_hotels", json.dumps(found)))
+
+    assert compacted["columns"] == ["name", "location", "price_per_night", "total_price", "rating", "amenities"]
+    assert len(compacted["rows"]) == 10 and compacted["omitted"] == 2
+    assert compacted["rows"][0][0] == found["hotels"][0]["name"]
+    assert (compacted["next_cursor"], compacted["total_matches"]) == (found["next_cursor"], found["total_matches"])
+
+
+def test_digest_keeps_one_row_and_the_cursor():
+    found = hotel_search()
+    digest = DEFAULT_COMPACTOR.digest("search_hotels", json.dumps(found))
+    assert digest.startswith("[digest of earlier result] ")
+    payload = json.loads(digest.removeprefix("[digest of earlier result] "))
+    assert len(payload["rows"]) == 1 and payload["omitted"] == 11
+    assert payload["next_cursor"] == found["next_cursor"]
+
+
+def test_single_records_keep_listed_fields_and_round_floats():
+    compactor = ToolOutputCompactor({"get_weather": Projection(keep=["city", "temperature"])}, precision=1)
+    output = json.dumps({"city": "Tokyo", "temperature": 18.456, "humidity": "60%"})
+    assert compactor.compact("get_weather", output) == '{"city":"Tokyo","temperature":18.5}'
+
+
+def test_outputs_that_are_not_json_pass_through():
+    error = "❌ search_flights service temporarily unavailable. Please try again."
+    assert DEFAULT_COMPACTOR.compact("search_flights", error) == error
@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+
+from src.core.context import RequestCancelled, RequestContext
+from src.core.hedging import Hedger
+
+
+class Backend:
+    """Answers after ``delays`` in turn (the last one repeating), recording the arguments of every call"""
+
+    def __init__(self, *delays):
+        self.delays = list(delays)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, query, **kwargs):
+        with self._lock:
+            number = len(self.calls)
+            self.calls.append(kwargs)
+        time.sleep(self.delays[min(number, len(self.delays) - 1)])
+        return f"{query} answered by call {number + 1}"
+
+
+def warmed(hedger, key, seconds=0.01, samples=5):
+    for _ in range(samples):
+        hedger.tracker(key).record(seconds)
+    return hedger
+
+
+def test_slow_call_is_hedged_after_the_tracked_percentile():
+    hedger = warmed(Hedger(min_samples=5, min_delay=0.02), "llm:gpt-4o")
+    assert hedger.hedge_delay("llm:gpt-4o") == 0.02
+
+    backend = Backend(0.5, 0.0)
+    assert hedger.call("llm:gpt-4o", backend, "plan") == "plan answered by call 2"
+    assert hedger.stats["hedged"] == hedger.stats["hedge_wins"] == 1
+
+
+def test_no_hedging_until_enough_latencies_are_known():
+    hedger, backend = warmed(Hedger(min_samples=20), "llm:gpt-4o"), Backend(0.05, 0.0)
+    assert hedger.hedge_delay("llm:gpt-4o") is None
+    assert hedger.call("llm:gpt-4o", backend, "plan") == "plan answered by call 1"
+    assert len(backend.calls) == 1
+
+
+def test_timeout_reaches_the_wrapped_call_and_bounds_the_wait():
+    hedger = warmed(Hedger(min_samples=5, min_delay=0.05), "llm:gpt-4o")
+    backend = Backend(0.3)
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        hedger.call("llm:gpt-4o", backend, "plan", timeout=0.15)
+    assert time.monotonic() - started < 0.25
+    # The backup only gets what is left of the timeout
+    primary, backup = (call["timeout"] for call in backend.calls)
+    assert primary == 0.15 and backup < 0.11
+
+
+def test_cancellation_stops_the_wait():
+    hedger, backend, context = Hedger(), Backend(1.0), RequestContext()
+    threading.Timer(0.05, context.cancel, args=("superseded by a new message",)).start()
+    started = time.monotonic()
+    with pytest.raises(RequestCancelled):
+        hedger.call("tool:search_flights", backend, "Tokyo", cancel_with=context)
+    assert time.monotonic() - started < 0.5
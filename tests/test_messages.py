@@ -0,0 +1,46 @@
+import sys
+
+import pytest
+
+from src.core.messages import Message, example_messages, to_wire
+
+from conftest import completion
+
+CONVERSATION = [
+    Message("system", "You are a travel agent"),
+    Message("user", "Weather in Tokyo?"),
+    Message.from_response(completion(None, [("get_weather", {"city": "Tokyo", "date": "2026-11-02"})])
+                          .choices[0].message),
+    Message.tool('{"condition":"Sunny"}', "call_1"),
+    Message("assistant", "Sunny"),
+]
+
+
+@pytest.mark.parametrize("message", CONVERSATION, ids=lambda message: message.role)
+def test_messages_survive_the_wire_format(message):
+    assert Message.coerce(to_wire([message])[0]) == message
+
+
+def test_tool_calls_keep_only_what_the_api_needs():
+    wire = CONVERSATION[2].to_dict()
+    assert wire["content"] is None and "tool_call_id" not in wire
+    assert wire["tool_calls"] == [{"id": wire["tool_calls"][0]["id"], "type": "function",
+                                   "function": {"name": "get_weather",
+                                                "arguments": '{"city": "Tokyo", "date": "2026-11-02"}'}}]
+    assert CONVERSATION[3].to_dict() == {"role": "tool", "content": '{"condition":"Sunny"}', "tool_call_id": "call_1"}
+
+
+def test_coerce_accepts_sdk_messages_and_passes_messages_through():
+    sdk_message = completion("Sunny").choices[0].message
+    assert Message.coerce(sdk_message) == Message("assistant", "Sunny")
+    assert Message.coerce(CONVERSATION[1]) is CONVERSATION[1]
+    assert to_wire([{"role": "user", "content": "Hi"}]) == [{"role": "user", "content": "Hi"}]
+
+
+def test_messages_are_slotted_and_share_their_strings():
+    content = "A long answer " * 100
+    message = Message("".join(["assi", "stant"]), content)
+    assert not hasattr(message, "__dict__")
+    assert message.role is sys.intern("assistant") and message.content is content
+    assert example_messages([{"user": "Hi", "assistant": "Hello"}]) == [Message("user", "Hi"),
+                                                                       Message("assistant", "Hello")]
@@ -0,0 +1,19 @@
+from src.core.ratelimit import Limit, RateLimiter
+
+
+def test_limits_match_tools_exactly_and_models_by_snapshot():
+    mini, full, weather = Limit(rpm=500), Limit(rpm=100), Limit(rpm=60)
+    limiter = RateLimiter({"llm:gpt-4o-mini": mini, "llm:gpt-4o": full, "tool:get_weather": weather})
+
+    assert limiter.limit_for("tool:get_weather") is weather
+    assert limiter.limit_for("tool:get_weather_forecast") is None
+    assert limiter.limit_for("llm:gpt-4o-2024-08-06") is full
+    assert limiter.limit_for("llm:gpt-4o-mini-2024-07-18") is mini
+    assert limiter.limit_for("llm:gpt-4omni") is None
+
+
+def test_shared_limits_are_split_between_processes():
+    limiter = RateLimiter({"llm:gpt-4o": Limit(rpm=500, tpm=30_000), "tool:get_weather": Limit(rpm=600)})
+    limiter.share(4)
+    assert (limiter.limit_for("llm:gpt-4o").rpm, limiter.limit_for("llm:gpt-4o").tpm) == (125, 7_500)
+    assert limiter.limit_for("tool:get_weather").rpm == 150 and limiter.limit_for("tool:get_weather").tpm is None
@@ -0,0 +1,60 @@
+import pytest
+
+from src.core.context import RequestContext
+from src.core.messages import Message
+from src.core.recording import REPLAY, Cassette, ReplayMiss, run_agent, set_cassette
+
+
+def replay_offline(path, fake_client):
+    # Any call that reaches the client during a replay fails the test
+    def live_call(params):
+        raise AssertionError(f"live completion during replay: {params}")
+
+    fake_client(live_call)
+    cassette = Cassette(path, REPLAY, speed=None)
+    set_cassette(cassette)
+    return cassette
+
+
+def test_streamed_run_replays_with_its_agent_kwargs(tmp_path, fake_client):
+    path = str(tmp_path / "runs.jsonl")
+    client = fake_client(lambda params: "Hello from the agent")
+    set_cassette(Cassette(path))
+    history = [Message("user", "Hi"), Message("assistant", "Hello"), Message("user", "Tell me about Tokyo")]
+    recorded = run_agent("memory", "Tell me about Tokyo", history, entry="process_stream",
+                         model="gpt-4o", temperature=0.2)
+    assert client.calls[0]["stream"] and client.calls[0]["temperature"] == 0.2
+
+    cassette = replay_offline(path, fake_client)
+    [run] = cassette.runs
+    assert (run["entry"], run["kwargs"]) == ("process_stream", {"model": "gpt-4o", "temperature": 0.2})
+    replayed = run_agent(run["agent"], run["input"], [Message.coerce(m) for m in run["history"]],
+                         entry=run["entry"], **run["kwargs"])
+    assert replayed["output"] == recorded["output"] == "Hello from the agent "
+
+
+def test_tool_run_replays_without_calling_tools(tmp_path, fake_client):
+    path = str(tmp_path / "runs.jsonl")
+    fake_client()
+    set_cassette(Cassette(path))
+    recorded = run_agent("reasoning", "Flights and weather for Tokyo", context=RequestContext(seed=3),
+                         planning_model="gpt-4o-mini")
+
+    cassette = replay_offline(path, fake_client)
+    [run] = cassette.runs
+    assert run["seed"] == 3 and run["kwargs"] == {"planning_model": "gpt-4o-mini"}
+    replayed = run_agent(run["agent"], run["input"], context=RequestContext(seed=run["seed"]), entry=run["entry"],
+                         **run["kwargs"])
+    assert replayed["output"] == recorded["output"]
+
+
+def test_replay_of_an_unrecorded_call_raises(tmp_path, fake_client):
+    path = str(tmp_path / "runs.jsonl")
+    fake_client(lambda params: "Recorded")
+    set_cassette(Cassette(path))
+    run_agent("simple", "What is the capital of Japan?", model="gpt-4o-mini")
+
+    replay_offline(path, fake_client)
+    with pytest.raises(ReplayMiss):
+        # A different temperature is a different request
+        run_agent("simple", "What is the capital of Japan?", model="gpt-4o-mini", temperature=0.1)
@@ -0,0 +1,95 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.core.context import RequestCancelled, RequestContext
+from src.core.resilience import CircuitBreaker, ResilientExecutor, RetryPolicy
+from src.core.tools import ToolResult
+
+TOOL = SimpleNamespace(name="search_flights")
+
+
+class Backend:
+    """A tool attempt that answers with ``outcomes`` in turn, then keeps repeating the last one"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.attempts = 0
+
+    def __call__(self, tool, tool_args):
+        outcome = self.outcomes[min(self.attempts, len(self.outcomes) - 1)]
+        self.attempts += 1
+        if outcome == "ok":
+            return ToolResult("found 3 flights")
+        return ToolResult.failure(f"{tool.name} failed", outcome, retryable=outcome == "unavailable")
+
+
+def executor(**kwargs):
+    kwargs.setdefault("policy", RetryPolicy(max_attempts=3, base_delay=0.0))
+    return ResilientExecutor(**kwargs)
+
+
+def test_retries_until_success():
+    backend, retries = Backend("unavailable", "unavailable", "ok"), []
+    result = executor().execute(TOOL, {}, backend, on_retry=lambda result, attempt, delay: retries.append(attempt))
+    assert result.ok and result.attempts == 3 and retries == [2, 3]
+
+
+def test_errors_that_wont_go_away_are_not_retried():
+    tools = executor()
+    result = tools.execute(TOOL, {}, Backend("invalid_arguments"))
+    assert not result.ok and result.attempts == 1
+    assert tools.stats()["search_flights"]["retries"] == 0
+
+
+def test_retry_budget_caps_retries_across_calls():
+    # No budget earned per call, so only the three starting retries are ever made
+    tools = executor(policy=RetryPolicy(max_attempts=5, base_delay=0.0), budget_ratio=0.0)
+    first = tools.execute(TOOL, {}, Backend("unavailable"))
+    second = tools.execute(TOOL, {}, Backend("unavailable"))
+    assert (first.attempts, second.attempts) == (4, 1)
+    stats = tools.stats()["search_flights"]
+    assert (stats["retries"], stats["budget_exhausted"]) == (3, 2)
+
+
+def test_breaker_opens_on_failures_and_closes_after_a_successful_probe():
+    tools = executor(policy=RetryPolicy(max_attempts=1), reset_timeout=0.05)
+    for _ in range(10):
+        tools.execute(TOOL, {}, Backend("unavailable"))
+    assert tools.stats()["search_flights"]["circuit"] == CircuitBreaker.OPEN
+
+    backend = Backend("ok")
+    result = tools.execute(TOOL, {}, backend)
+    assert result.error == "circuit_open" and backend.attempts == 0
+
+    time.sleep(0.06)
+    assert tools.execute(TOOL, {}, backend).ok
+    assert tools.stats()["search_flights"]["circuit"] == CircuitBreaker.CLOSED
+
+
+def test_half_open_breaker_lets_one_probe_through():
+    breaker = CircuitBreaker(min_calls=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.allow() and not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_cancelled_half_open_probe_lets_the_next_one_through():
+    tools = executor(policy=RetryPolicy(max_attempts=1), reset_timeout=0.0)
+    for _ in range(10):
+        tools.execute(TOOL, {}, Backend("unavailable"))
+    context = RequestContext()
+
+    def cancelled_mid_call(tool, tool_args):
+        context.cancel("superseded by a new message")
+        context.check()
+
+    with pytest.raises(RequestCancelled):
+        tools.execute(TOOL, {}, cancelled_mid_call, context=context)
+    with pytest.raises(RequestCancelled):
+        tools.execute(TOOL, {}, Backend("ok"), context=context)  # Cancelled before it could take the probe
+
+    assert tools.execute(TOOL, {}, Backend("ok")).ok
+    assert tools.stats()["search_flights"]["circuit"] == CircuitBreaker.CLOSED
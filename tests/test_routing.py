@@ -0,0 +1,45 @@
+from src.agents.reasoning_agent import ReasoningAgent
+from src.agents.tool_agent import ToolAgent
+from src.core.resilience import ResilientExecutor, RetryPolicy
+from src.core.routing import ModelRouter
+
+from conftest import completion
+
+
+def test_router_sends_planning_to_the_cheap_model_unless_confidence_is_low():
+    router = ModelRouter("gpt-4o", "gpt-4o-mini")
+    assert router.is_cascade and router.model_for_synthesis() == "gpt-4o"
+    assert (router.model_for_planning(), router.model_for_planning(low_confidence=True)) == ("gpt-4o-mini", "gpt-4o")
+    assert ModelRouter("gpt-4o", "gpt-4o-mini", escalate_on_low_confidence=False).model_for_planning(True) == \
+        "gpt-4o-mini"
+    assert not ModelRouter("gpt-4o").is_cascade
+
+
+def test_tool_agent_plans_cheaply_and_answers_with_the_strong_model(fake_client):
+    client = fake_client()
+    agent = ToolAgent(model="gpt-4o", planning_model="gpt-4o-mini")
+    assert agent.process("Flights from New York to Tokyo and the weather there").endswith("Here is the plan")
+
+    assert [(call["model"], "tools" in call) for call in client.calls] == [("gpt-4o-mini", True), ("gpt-4o", False)]
+    assert set(agent.usage.by_stage) == {"planning", "synthesis"}
+    assert set(agent.usage.by_model) == {"gpt-4o-mini", "gpt-4o"}
+
+
+def test_direct_answer_from_the_planning_model_is_rewritten_by_the_strong_one(fake_client):
+    client = fake_client(lambda params: "Tokyo is lovely in November")
+    ToolAgent(model="gpt-4o", planning_model="gpt-4o-mini").process("Is Tokyo nice in November?")
+    assert [call["model"] for call in client.calls] == ["gpt-4o-mini", "gpt-4o"]
+
+
+def test_reasoning_agent_escalates_after_every_tool_failed(fake_client):
+    def script(params):
+        tried = any(message["role"] == "assistant" and message.get("tool_calls") for message in params["messages"])
+        return "Final plan" if tried else completion(None, [("get_weather", {"city": "Tokyo"})])  # No date
+
+    client = fake_client(script)
+    agent = ReasoningAgent(model="gpt-4o", planning_model="gpt-4o-mini",
+                           resilience=ResilientExecutor(RetryPolicy(base_delay=0.0)))
+    output = agent.process("Weather in Tokyo?")
+
+    assert [call["model"] for call in client.calls] == ["gpt-4o-mini", "gpt-4o"]
+    assert "escalated after failed tools" in output and output.endswith("Final plan")
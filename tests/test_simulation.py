@@ -0,0 +1,53 @@
+import time
+
+from src.backends.simulation import BackendSimulator, LatencyModel, ToolProfile
+from src.core.context import RequestContext
+
+ARGS = {"origin": "New York", "destination": "Tokyo", "date": "2026-11-02"}
+
+
+def flaky(**kwargs):
+    return BackendSimulator(default=ToolProfile(failure_rate=0.5), **kwargs)
+
+
+def outcomes(simulator, context, calls=20):
+    return [simulator.simulate("search_flights", ARGS, context) for _ in range(calls)]
+
+
+def test_a_seeded_request_sees_the_same_faults_however_calls_interleave():
+    simulator = flaky()
+    first = outcomes(simulator, RequestContext(seed=7))
+    other, again = RequestContext(seed=8), RequestContext(seed=7)
+    interleaved = []
+    for _ in range(20):
+        simulator.simulate("search_flights", ARGS, other)
+        interleaved.append(simulator.simulate("search_flights", ARGS, again))
+    assert interleaved == first
+    assert outcomes(flaky(), RequestContext(seed=7)) == first
+
+
+def test_retries_of_the_same_call_draw_fresh_outcomes():
+    results = outcomes(flaky(), RequestContext(seed=7), calls=40)
+    failures = sum(result is not None for result in results)
+    assert 5 < failures < 35 and all(result is None or result[0] == "unavailable" for result in results)
+
+
+def test_simulator_seed_applies_to_calls_without_one():
+    assert outcomes(flaky(seed=3), None) == outcomes(flaky(seed=3), RequestContext())
+
+
+def test_slow_call_times_out_after_waiting_the_timeout():
+    simulator = BackendSimulator(default=ToolProfile(latency=LatencyModel("fixed", value=1.0), timeout=0.05))
+    started = time.monotonic()
+    error, _ = simulator.simulate("get_weather", {"city": "Tokyo"}, RequestContext())
+    assert error == "timeout" and 0.05 <= time.monotonic() - started < 0.5
+
+
+def test_tool_profiles_override_only_what_differs_from_the_default():
+    simulator = BackendSimulator.from_dict({
+        "default": {"failure_rate": 0.2, "latency": {"kind": "fixed", "value": 0.01}, "timeout": 2.0},
+        "tools": {"get_weather": {"failure_rate": 0.0}},
+    })
+    weather = simulator.profile("get_weather")
+    assert (weather.failure_rate, weather.latency.value, weather.timeout) == (0.0, 0.01, 2.0)
+    assert simulator.profile("search_hotels") is simulator.default
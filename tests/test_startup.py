@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+from src.core.clients import get_openai_client
+from src.core.startup import AGENT_CLASSES, load_agent_class
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_building_an_agent_loads_neither_the_sdk_nor_the_backends():
+    # A fresh interpreter, since this one has long since imported everything
+    code = ("import sys\n"
+            "from src.core.startup import load_agent_class\n"
+            "load_agent_class('reasoning')(model='gpt-4o-mini')\n"
+            "print(sorted({'openai', 'numpy', 'src.backends.flights'} & set(sys.modules)))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True,
+                            env={**os.environ, "OPENAI_API_KEY": "sk-test"})
+    assert result.stdout.strip() == "[]"
+
+
+def test_every_agent_key_loads():
+    assert all(isinstance(load_agent_class(key), type) for key in AGENT_CLASSES)
+
+
+def test_agents_share_one_client_per_api_key():
+    assert get_openai_client("sk-one") is get_openai_client("sk-one")
+    assert get_openai_client("sk-one") is not get_openai_client("sk-two")
@@ -0,0 +1,43 @@
+from src.agents.tool_agent import ToolAgent
+from src.core.context import RequestContext
+from src.core.tools import TRAVEL_REGISTRY
+
+from conftest import completion
+
+WEATHER = ("get_weather", {"city": "Tokyo", "date": "2026-11-02"})
+
+
+def counted_weather(monkeypatch, fail_first=0):
+    tool, calls = TRAVEL_REGISTRY.get("get_weather"), []
+
+    def weather(**kwargs):
+        calls.append(kwargs)
+        if len(calls) <= fail_first:
+            raise ConnectionError("weather service unreachable")
+        return {"city": kwargs["city"], "date": kwargs["date"], "condition": "Sunny"}
+
+    monkeypatch.setattr(tool, "function", weather)
+    return tool, calls
+
+
+def test_repeated_tool_call_in_a_request_is_answered_once(fake_client, monkeypatch):
+    _, calls = counted_weather(monkeypatch)
+    fake_client(lambda params: completion(None, [WEATHER, WEATHER]) if params.get("tools") else "Sunny all day")
+    context = RequestContext()
+    output = ToolAgent().process("Weather in Tokyo on 2026-11-02, twice please", context)
+
+    assert len(calls) == 1 and "♻️ **get_weather result**" in output
+    assert context.usage.tool_calls == 2
+
+
+def test_memo_lasts_one_request_and_skips_failures(fake_client, monkeypatch):
+    tool, calls = counted_weather(monkeypatch, fail_first=1)
+    agent, memo = ToolAgent(), {}
+    first = agent._run_tool(tool, WEATHER[1], memo=memo)
+    second = agent._run_tool(tool, WEATHER[1], memo=memo)
+    third = agent._run_tool(tool, WEATHER[1], memo=memo)
+    assert (first.ok, second.ok, second.reused, third.reused) == (False, True, False, True)
+    assert third.output == second.output and len(calls) == 2
+
+    agent._run_tool(tool, WEATHER[1], memo={})
+    assert len(calls) == 3
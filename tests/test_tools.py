@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from src.backends.simulation import BackendSimulator, set_simulator
+from src.core.schema import compile_validator
+from src.core.tools import TRAVEL_REGISTRY
+
+HOTELS = TRAVEL_REGISTRY.get("search_hotels")
+STAY = {"city": "Tokyo", "checkin_date": "2026-11-02", "checkout_date": "2026-11-05"}
+
+
+@pytest.fixture
+def quiet_backends():
+    set_simulator(BackendSimulator())
+    yield
+    set_simulator(None)
+
+
+def test_null_optional_arguments_get_their_defaults(quiet_backends):
+    result = HOTELS.invoke(**STAY, limit=None, sort_by=None, amenities=None, cursor=None)
+    assert result.ok, result.output
+    assert len(json.loads(result.output)["hotels"]) == 5
+
+
+def test_null_required_argument_is_reported_missing(quiet_backends):
+    result = HOTELS.invoke(**{**STAY, "city": None})
+    assert result.error == "invalid_arguments" and "missing required argument 'city'" in result.output
+
+
+@pytest.mark.parametrize("args, error", [
+    ({"limit": "5"}, "'limit' must be a whole number, got '5'"),
+    ({"limit": True}, "'limit' must be a whole number"),
+    ({"max_price": "cheap"}, "'max_price' must be a number"),
+    ({"sort_by": "stars"}, "'sort_by' must be one of recommended, price, rating, got 'stars'"),
+    ({"amenities": ["Pool", "Helipad"]}, "got 'Helipad'"),
+    ({"min_rating": 7}, "'min_rating' must be at most 5"),
+    ({"checkin_date": "2026-02-30"}, "'checkin_date' must be a date in YYYY-MM-DD format"),
+    ({"pets": True}, "unexpected argument 'pets'"),
+])
+def test_invalid_arguments_are_explained(args, error):
+    assert error in HOTELS.validate({**STAY, **args})
+
+
+def test_every_problem_is_reported_at_once():
+    validate = compile_validator({
+        "type": "object",
+        "properties": {"origin": {"type": "string"}, "destination": {"type": "string"},
+                       "max_stops": {"type": "integer", "enum": [0, 1, 2]}},
+        "required": ["origin", "destination"],
+    })
+    assert validate({"origin": "Paris", "destination": "Rome", "max_stops": 1}) is None
+    assert validate({"max_stops": 3}) == ("missing required argument 'origin'; missing required argument "
+                                          "'destination'; 'max_stops' must be one of 0, 1, 2, got 3")
+    assert validate(["Paris", "Rome"]) == "arguments must be a JSON object"
@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+from src.agents.memory_agent import PROMPT_MESSAGES, MemoryAgent
+from src.agents.simple_agent import SimpleAgent
+from src.core.coalescing import SingleFlight
+from src.core.context import BudgetExceeded, RequestContext
+from src.core.usage import Budget, UsageTracker, estimate_cost
+
+
+def run_together(agents, stream):
+    def ask(agent):
+        context = RequestContext()
+        if stream:
+            "".join(agent.process_stream("Weather in Tokyo in November?", context))
+        else:
+            agent.process("Weather in Tokyo in November?", context)
+
+    threads = [threading.Thread(target=ask, args=(agent,)) for agent in agents]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_every_session_sharing_a_response_is_charged_for_it(fake_client, stream):
+    client = fake_client(lambda params: "Mild and mostly dry", delay=0.2)
+    coalescer = SingleFlight()
+    agents = [SimpleAgent(usage=UsageTracker(), coalescer=coalescer) for _ in range(2)]
+    run_together(agents, stream)
+
+    assert len(client.calls) == 1 and coalescer.stats["coalesced"] == 1
+    tokens = 60 if stream else 120
+    assert [agent.usage.session.total_tokens for agent in agents] == [tokens, tokens]
+    assert all(agent.usage.last_request.total_tokens == tokens for agent in agents)
+
+
+def test_budget_downgrades_then_trims_history_then_stops(fake_client):
+    client = fake_client(lambda params: "Noted")  # 120 tokens a call
+    usage = UsageTracker(Budget(max_tokens=500, downgrade_at=0.3, trim_at=0.5, keep_messages=2))
+    agent = MemoryAgent(model="gpt-4o", usage=usage)
+    for turn in range(5):
+        agent.process(f"Turn {turn}")
+    with pytest.raises(BudgetExceeded):
+        agent.process("One more")
+
+    assert [call["model"] for call in client.calls] == ["gpt-4o", "gpt-4o"] + ["gpt-4o-mini"] * 3
+    history = [len(call["messages"]) - len(PROMPT_MESSAGES) - 1 for call in client.calls]
+    assert history == [0, 2, 4, 2, 2]
+    assert usage.session.total_tokens == 600 and usage.session.calls == 5
+    assert usage.session.cost == pytest.approx(2 * estimate_cost("gpt-4o", 100, 20) +
+                                               3 * estimate_cost("gpt-4o-mini", 100, 20))
+
+
+def test_dated_snapshots_are_priced_like_their_model():
+    assert estimate_cost("gpt-4o-2024-08-06", 1_000_000, 0) == estimate_cost("gpt-4o", 1_000_000, 0) == 2.5
+    assert estimate_cost("gpt-4o-mini-2024-07-18", 0, 1_000_000) == 0.6
+    assert estimate_cost("unknown-model", 1000, 1000) == 0.0
@@ -0,0 +1,36 @@
+import pytest
+
+from src.backends.weather import MAX_CITIES, TABLE_COLUMNS, WeatherStore
+
+
+def test_table_agrees_with_single_forecasts():
+    store = WeatherStore()
+    table = store.table(["Tokyo", "Osaka"], "2026-11-02", "2026-11-04")
+    assert table["columns"] == TABLE_COLUMNS and len(table["rows"]) == 6
+    for city, date, temperature, condition, precipitation, _ in table["rows"]:
+        forecast = store.forecast(city, date)
+        assert (forecast["temperature"], forecast["condition"], forecast["precipitation_chance"]) == \
+            (temperature, condition, precipitation)
+
+
+def test_forecasts_are_deterministic_and_cached():
+    store = WeatherStore()
+    assert store.forecast("Paris", "2026-12-24") == WeatherStore().forecast("Paris", "2026-12-24")
+    store.table(["Paris"], "2026-12-20", "2026-12-26")
+    store.table(["Paris"], "2026-12-24", "2026-12-28")
+    assert store.cache_info().hits >= 4
+
+
+def test_table_without_end_date_covers_one_day():
+    assert len(WeatherStore().table(["Rome"], "2026-11-02")["rows"]) == 1
+
+
+@pytest.mark.parametrize("cities, start, end, error", [
+    ([], "2026-11-02", None, "at least one city"),
+    (["Tokyo"] * (MAX_CITIES + 1), "2026-11-02", None, f"At most {MAX_CITIES} cities"),
+    (["Tokyo"], "2026-11-02", "2026-11-30", "end_date must be"),
+    (["Tokyo"], "2026-11-02", "2026-11-01", "end_date must be"),
+])
+def test_oversized_or_empty_tables_are_refused(cities, start, end, error):
+    with pytest.raises(ValueError, match=error):
+        WeatherStore().table(cities, start, end)
@@ -0,0 +1,100 @@
+import queue
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+
+from src.core.context import BudgetExceeded, RequestContext
+from src.core.usage import Budget, UsageTracker
+from src.core.workers import HashRing, PooledAgent, WorkerDied, WorkerPool, _SessionUsage, _budget_state
+
+SESSIONS = [f"session-{number}" for number in range(5000)]
+
+
+def test_ring_spreads_sessions_and_only_moves_a_removed_workers_ones():
+    ring = HashRing([f"worker-{number}" for number in range(4)])
+    before = {session: ring.node_for(session) for session in SESSIONS}
+    assert min(Counter(before.values()).values()) > len(SESSIONS) / 4 * 0.7
+
+    ring.remove("worker-2")
+    after = {session: ring.node_for(session) for session in SESSIONS}
+    assert len(ring) == 3 and "worker-2" not in after.values()
+    assert all(after[session] == owner for session, owner in before.items() if owner != "worker-2")
+
+
+def test_empty_ring_has_no_owner():
+    assert HashRing().node_for("session-1") is None
+
+
+@pytest.fixture
+def pool():
+    """A pool whose workers are inboxes, without processes behind them"""
+    pool = WorkerPool(workers=3)
+    for number in range(pool.size):
+        name = f"worker-{number}"
+        pool._workers[name] = (SimpleNamespace(is_alive=lambda: True), queue.Queue())
+        pool.ring.add(name)
+    return pool
+
+
+def sent_to(pool, name):
+    inbox = pool._workers[name][1]
+    return [inbox.get_nowait()[1] for _ in range(inbox.qsize())]
+
+
+def test_a_sessions_requests_go_to_its_worker(pool):
+    owner = pool.ring.node_for("session-1")
+    for prompt in ("Hi", "Flights to Tokyo"):
+        pool.submit("session-1", "simple", prompt, model="gpt-4o")
+    requests = sent_to(pool, owner)
+    assert [request["prompt"] for request in requests] == ["Hi", "Flights to Tokyo"]
+    assert requests[0]["agent_kwargs"] == {"model": "gpt-4o"} and requests[0]["budget"] is None
+
+
+def test_dead_workers_unstreamed_requests_are_retried_on_the_sessions_new_worker(pool):
+    owner = pool.ring.node_for("session-1")
+    waiting = pool.submit("session-1", "simple", "Hi")
+    streaming = pool.submit("session-1", "simple", "Flights to Tokyo", stream=True)
+    streaming.streamed = True
+    elsewhere = next(session for session in SESSIONS if pool.ring.node_for(session) != owner)
+    untouched = pool.submit(elsewhere, "simple", "Hotels in Paris")
+
+    pool._handle_death(owner)
+
+    new_owner = pool.ring.node_for("session-1")
+    assert new_owner != owner and waiting.worker == new_owner
+    assert [request["id"] for request in sent_to(pool, new_owner)][-1] == waiting.id
+    with pytest.raises(WorkerDied):
+        list(streaming)
+    assert untouched.worker == pool.ring.node_for(elsewhere)
+    assert pool.stats == {"requests": 3, "retried": 1, "worker_deaths": 1}
+
+
+def test_worker_calls_are_recorded_by_model_and_stage_against_the_sessions_budget(pool):
+    usage = UsageTracker(Budget(max_tokens=1000))
+    usage.record("gpt-4o", SimpleNamespace(prompt_tokens=500, completion_tokens=250))
+    agent = PooledAgent(pool, "session-1", "tool", usage=usage, model="gpt-4o")
+    pending = agent._submit("Flights to Tokyo", None, stream=False)
+
+    # The worker starts from what the session has spent, so it downgrades and then stops like a local agent
+    worker_usage = _SessionUsage()
+    worker_usage.start(pending.request["budget"])
+    assert worker_usage.budget_action() == Budget.DOWNGRADE
+    worker_usage.record("gpt-4o-mini", SimpleNamespace(prompt_tokens=200, completion_tokens=100), "planning")
+    assert worker_usage.budget_action() == Budget.STOP
+
+    context = RequestContext()
+    pending.usage = worker_usage.report(RequestContext())
+    agent._record_usage(pending, context)
+    assert usage.by_stage["planning"].total_tokens == context.usage.total_tokens == 300
+    assert usage.by_model["gpt-4o-mini"].cost > 0 and usage.budget_action() == Budget.STOP
+    assert _budget_state(UsageTracker()) is None
+
+
+def test_budget_exceeded_in_a_worker_reaches_the_caller(pool):
+    pending = pool.submit("session-1", "simple", "Hi")
+    pool._outbox.put(("error", pending.id, ("BudgetExceeded", "token budget exhausted", None)))
+    pool._outbox.put(None)
+    pool._collect()
+    with pytest.raises(BudgetExceeded):
+        pending.result()